@@ -0,0 +1,7 @@
+from .price_history import PriceHistory, SnapshotInfo
+from .product_factory import ProductFactory
+from .product_index import IndexUpdate, ProductIndex, RangeFilter
+from .search_index import SearchIndex
+
+
+__all__ = ['IndexUpdate', 'PriceHistory', 'ProductFactory', 'ProductIndex', 'RangeFilter', 'SearchIndex', 'SnapshotInfo']
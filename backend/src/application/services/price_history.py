@@ -0,0 +1,355 @@
+"""
+История цен и наличия товаров по снимкам обходов.
+
+Каждый обход магазина - отдельный файл snapshot-<время>.npz (np.savez_compressed)
+со столбцами, отсортированными по номеру товара: номер, цена в копейках
+(-1 - нет в наличии, -2 - карточка не загрузилась и наличие неизвестно), цена за кг.
+Товара, которого не было в обходе, в снимке нет: про его наличие тоже ничего не известно. Href и названия хранятся один раз в словаре
+products.npz; номера товаров в нем не меняются, поэтому снимок занимает
+несколько байт на товар.
+
+Как в Parquet, столбцы разбиты на группы строк по ROW_GROUP товаров, каждая сжата
+отдельно, а group_first хранит первый номер товара каждой группы. История одного
+товара распаковывает из снимка только одну маленькую группу.
+
+history.json - список снимков по времени. Запросы по диапазону времени открывают
+только подходящие снимки, по одному, поэтому вся история в память не загружается
+"""
+import io
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from ...infrastructure.product_parser.magnit_parser.normalization import normalize_products, products_frame
+from .packed_strings import PackedStrings
+from .product_index import href_of
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'history.json'
+DICTIONARY = 'products.npz'
+NOT_AVAILABLE = -1  # Цена в копейках для товара без цены
+UNKNOWN = -2  # Цена в копейках для товара, карточка которого не загрузилась
+ROW_GROUP = 16384
+COLUMNS = ('product', 'price', 'price_per_kg')
+
+
+class SnapshotInfo(NamedTuple):
+    file: str
+    taken_at: float  # Время обхода, секунды Unix
+    store: str  # Магазин в формате shopCode:shopType
+    products: int
+    available: int
+    unknown: int = 0  # Товары с ошибкой загрузки карточки
+
+
+def _write_atomic(path: str, arrays: Dict[str, np.ndarray]) -> None:
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    with open(f'{path}.tmp', 'wb') as f:
+        f.write(buffer.getbuffer())
+    os.replace(f'{path}.tmp', path)
+
+
+class PriceHistory:
+    """
+    Хранилище снимков цен: write_snapshot() после каждого обхода, запросы -
+    history() по товару, changes() между двумя последними снимками магазина,
+    downsample() для графиков за длинный период и compact() для прореживания старых снимков.
+    Несколько процессов могут читать каталог, пока обход пишет в него:
+    манифест подменяется атомарно, а refresh() подхватывает новые снимки
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._manifest_version: Optional[tuple] = None
+        self._snapshots: List[SnapshotInfo] = []
+        self._ids: Dict[str, int] = {}
+        self._hrefs: List[str] = []
+        self._titles: List[str] = []
+        os.makedirs(directory, exist_ok=True)
+        self.refresh()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def refresh(self) -> None:
+        """Перечитывает манифест и словарь, если их изменил другой процесс"""
+        try:
+            stat = os.stat(self._path(MANIFEST))
+        except FileNotFoundError:
+            return
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version == self._manifest_version:
+            return
+
+        with self._lock:
+            with open(self._path(MANIFEST), encoding='utf-8') as f:
+                self._snapshots = [SnapshotInfo(**entry) for entry in json.load(f)['snapshots']]
+            try:
+                with np.load(self._path(DICTIONARY)) as data:
+                    self._hrefs = PackedStrings(data['href_data'], data['href_offsets']).tolist()
+                    self._titles = PackedStrings(data['title_data'], data['title_offsets']).tolist()
+            except FileNotFoundError:
+                # Только пустые снимки: ни одной карточки в словарь еще не попало
+                self._hrefs, self._titles = [], []
+            self._ids = {href: i for i, href in enumerate(self._hrefs)}
+            self._manifest_version = version
+
+    def _save_manifest(self) -> None:
+        path = self._path(MANIFEST)
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'snapshots': [snapshot._asdict() for snapshot in self._snapshots]}, f, ensure_ascii=False)
+        os.replace(f'{path}.tmp', path)
+        stat = os.stat(path)
+        self._manifest_version = (stat.st_mtime_ns, stat.st_size)
+
+    def write_snapshot(self, results: Iterable[Dict[str, Any]], store: str,
+                       taken_at: Optional[float] = None) -> SnapshotInfo:
+        """
+        Сохраняет цены одного обхода магазина. Карточки с ошибкой загрузки записываются
+        с ценой UNKNOWN: про их наличие ничего не известно, как и про товары не из обхода
+        """
+        self.refresh()
+        taken_at = time.time() if taken_at is None else taken_at
+        results = list(results)
+        frame = normalize_products(products_frame(results))
+        failed = {href_of(details['url']): details.get('title')
+                  for details in results if details and details.get('url') and details.get('error')}
+
+        with self._lock:
+            dictionary_changed = False
+
+            def product_id(href: str, title: Optional[str]) -> int:
+                nonlocal dictionary_changed
+                product = self._ids.get(href)
+                if product is None:
+                    product = self._ids[href] = len(self._hrefs)
+                    self._hrefs.append(href)
+                    self._titles.append(title or '')
+                    dictionary_changed = True
+                elif title and self._titles[product] != title:
+                    self._titles[product] = title
+                    dictionary_changed = True
+                return product
+
+            latest: Dict[int, int] = {}  # Номер товара -> строка frame, последняя побеждает
+            for row, (url, title) in enumerate(zip(frame['url'].tolist(), frame['title'].tolist())):
+                latest[product_id(href_of(url), title)] = row
+            # Загруженная в этом же обходе карточка важнее неудачной попытки
+            unknown = {product_id(href, title) for href, title in failed.items()} - latest.keys()
+
+            products = np.array([*latest.keys(), *unknown], dtype=np.int32)
+            rows = np.array([*latest.values()] + [-1] * len(unknown), dtype=np.int64)  # -1 - строки frame нет
+            order = np.argsort(products)
+            products, rows = products[order], rows[order]
+            known = rows >= 0
+            price = np.full(len(rows), np.nan)
+            price[known] = frame['price'].to_numpy(dtype=float)[rows[known]]
+            kopecks = np.where(np.isfinite(price), np.rint(price * 100), NOT_AVAILABLE).astype(np.int32)
+            kopecks[~known] = UNKNOWN
+            price_per_kg = np.full(len(rows), np.nan, dtype=np.float32)
+            price_per_kg[known] = frame['price_per_kg'].to_numpy(dtype=np.float32)[rows[known]]
+
+            # Словарь пишется и до первого снимка, даже пустого: иначе каталог без него не открыть
+            if dictionary_changed or not os.path.exists(self._path(DICTIONARY)):
+                hrefs, titles = PackedStrings.pack(self._hrefs), PackedStrings.pack(self._titles)
+                _write_atomic(self._path(DICTIONARY), {
+                    'href_data': hrefs.data, 'href_offsets': hrefs.offsets,
+                    'title_data': titles.data, 'title_offsets': titles.offsets,
+                })
+
+            info = SnapshotInfo(file=f'snapshot-{int(taken_at * 1000)}-{store.replace(":", "_")}.npz',
+                                taken_at=taken_at, store=store, products=len(products),
+                                available=int(np.count_nonzero(kopecks >= 0)), unknown=len(unknown))
+            columns = {
+                'product': products,
+                'price': kopecks,
+                'price_per_kg': price_per_kg,
+            }
+            arrays = {'group_first': products[::ROW_GROUP]}
+            for group, start in enumerate(range(0, len(products), ROW_GROUP)):
+                for name, values in columns.items():
+                    arrays[f'{name}_{group}'] = values[start:start + ROW_GROUP]
+            _write_atomic(self._path(info.file), arrays)
+            self._snapshots = sorted([*self._snapshots, info], key=lambda snapshot: snapshot.taken_at)
+            self._save_manifest()
+
+        logger.info("Снимок цен %s: %s товаров, в наличии %s", info.file, info.products, info.available)
+        return info
+
+    def snapshots(self, store: Optional[str] = None, start: Optional[float] = None,
+                  end: Optional[float] = None) -> List[SnapshotInfo]:
+        """Снимки по времени; start и end включительно"""
+        self.refresh()
+        return [snapshot for snapshot in self._snapshots
+                if (store is None or snapshot.store == store)
+                and (start is None or snapshot.taken_at >= start)
+                and (end is None or snapshot.taken_at <= end)]
+
+    def stores(self) -> List[str]:
+        self.refresh()
+        return sorted({snapshot.store for snapshot in self._snapshots})
+
+    def _columns(self, snapshot: SnapshotInfo, *names: str) -> List[np.ndarray]:
+        """Столбцы снимка целиком"""
+        # NpzFile распаковывает группу только при обращении к ней
+        with np.load(self._path(snapshot.file)) as data:
+            groups = len(data['group_first'])
+            return [np.concatenate([data[f'{name}_{group}'] for group in range(groups)]) if groups
+                    else np.empty(0, dtype=np.float32 if name == 'price_per_kg' else np.int32)
+                    for name in names]
+
+    def _row(self, snapshot: SnapshotInfo, product: int) -> Optional[Dict[str, Any]]:
+        """Значения товара в снимке; читается только группа строк, где он может быть"""
+        with np.load(self._path(snapshot.file)) as data:
+            group = int(np.searchsorted(data['group_first'], product, side='right')) - 1
+            if group < 0:
+                return None
+            products = data[f'product_{group}']
+            i = int(np.searchsorted(products, product))
+            if i == len(products) or products[i] != product:
+                return None
+            return {name: data[f'{name}_{group}'][i] for name in COLUMNS[1:]}
+
+    def history(self, href: str, store: Optional[str] = None, start: Optional[float] = None,
+                end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Цена товара в каждом снимке, где она известна. Снимки, в которых товара нет
+        или его карточка не загрузилась, пропускаются: отсутствие в наличии - только
+        если карточка загружена и цены в ней нет
+        """
+        snapshots = self.snapshots(store, start, end)
+        product = self._ids.get(href_of(href))
+        if product is None:
+            return []
+
+        points = []
+        for snapshot in snapshots:
+            row = self._row(snapshot, product)
+            if row is None or row['price'] == UNKNOWN:
+                continue
+            available = row['price'] != NOT_AVAILABLE
+            points.append({
+                'taken_at': snapshot.taken_at,
+                'store': snapshot.store,
+                'available': bool(available),
+                'price': int(row['price']) / 100 if available else None,
+                'price_per_kg': None if np.isnan(row['price_per_kg']) else round(float(row['price_per_kg']), 2),
+            })
+        return points
+
+    def changes(self, store: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+        """
+        Разница двух последних снимков каждого магазина: самые большие изменения цены
+        (по модулю, в процентах), сколько товаров появилось в наличии и пропало.
+        Сравниваются только товары, наличие которых известно в обоих снимках:
+        не загруженная или не обойденная карточка пропажей не считается
+        """
+        stores = [store] if store is not None else self.stores()
+        items: List[Dict[str, Any]] = []
+        summary = []
+        for store_key in stores:
+            snapshots = self.snapshots(store_key)
+            if len(snapshots) < 2:
+                continue
+            previous, current = snapshots[-2:]
+            old_products, old_prices = self._columns(previous, 'product', 'price')
+            new_products, new_prices = self._columns(current, 'product', 'price')
+
+            _, old_rows, new_rows = np.intersect1d(old_products, new_products, assume_unique=True,
+                                                   return_indices=True)
+            old_common, new_common = old_prices[old_rows], new_prices[new_rows]
+            known = (old_common != UNKNOWN) & (new_common != UNKNOWN)
+            old_available, new_available = known & (old_common >= 0), known & (new_common >= 0)
+            appeared = int(np.count_nonzero(known & new_available & ~old_available))
+            disappeared = int(np.count_nonzero(known & old_available & ~new_available))
+            priced = old_available & new_available & (old_common != new_common)
+            products = new_products[new_rows][priced]
+            old_common, new_common = old_common[priced].astype(np.int64), new_common[priced].astype(np.int64)
+            change_pct = (new_common - old_common) * 100 / np.maximum(old_common, 1)
+
+            top = np.argsort(-np.abs(change_pct), kind='stable')[:limit]
+            items.extend({
+                'href': self._hrefs[product],
+                'title': self._titles[product],
+                'store': store_key,
+                'old_price': old / 100,
+                'new_price': new / 100,
+                'change': (new - old) / 100,
+                'change_pct': round(pct, 2),
+            } for product, old, new, pct in zip(products[top].tolist(), old_common[top].tolist(),
+                                                 new_common[top].tolist(), change_pct[top].tolist()))
+            summary.append({
+                'store': store_key,
+                'from': previous.taken_at,
+                'to': current.taken_at,
+                'changed': int(len(products)),
+                'appeared': appeared,
+                'disappeared': disappeared,
+            })
+
+        items.sort(key=lambda item: -abs(item['change_pct']))
+        return {'stores': summary, 'items': items[:limit]}
+
+    def downsample(self, href: str, every: str = '1D', how: str = 'last', store: Optional[str] = None,
+                   start: Optional[float] = None, end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        История товара, сведенная к одной точке на период every (строка частоты pandas: 1h, 1D, 1W).
+        how - агрегат цены за период: last, mean, min или max. Периоды без снимков пропускаются
+        """
+        if how not in ('last', 'mean', 'min', 'max'):
+            raise ValueError(f'Неизвестный агрегат: {how}')
+        points = self.history(href, store, start, end)
+        if not points:
+            return []
+
+        frame = pd.DataFrame(points)
+        frame['taken_at'] = pd.to_datetime(frame['taken_at'], unit='s')
+        downsampled = []
+        for store_key, group in frame.groupby('store', sort=True):
+            resampled = group.set_index('taken_at').resample(every).agg(
+                {'price': how, 'price_per_kg': how, 'available': 'max'})
+            resampled = resampled[resampled['available'].notna()]
+            for period, row in resampled.iterrows():
+                downsampled.append({
+                    'period': period.timestamp(),
+                    'store': store_key,
+                    'available': bool(row['available']),
+                    'price': None if pd.isna(row['price']) else round(float(row['price']), 2),
+                    'price_per_kg': None if pd.isna(row['price_per_kg']) else round(float(row['price_per_kg']), 2),
+                })
+        return downsampled
+
+    def compact(self, every: float, before: float) -> int:
+        """
+        Прореживает снимки старше before: в каждом магазине остается последний снимок
+        из каждого интервала every секунд. Возвращает число удаленных снимков
+        """
+        self.refresh()
+        with self._lock:
+            kept: Dict[tuple, SnapshotInfo] = {}
+            recent = []
+            for snapshot in self._snapshots:
+                if snapshot.taken_at < before:
+                    kept[(snapshot.store, int(snapshot.taken_at // every))] = snapshot
+                else:
+                    recent.append(snapshot)
+            snapshots = sorted([*kept.values(), *recent], key=lambda snapshot: snapshot.taken_at)
+            removed = [snapshot for snapshot in self._snapshots if snapshot not in snapshots]
+            self._snapshots = snapshots
+            self._save_manifest()
+
+        for snapshot in removed:
+            try:
+                os.remove(self._path(snapshot.file))
+            except FileNotFoundError:
+                pass
+        return len(removed)
@@ -0,0 +1,44 @@
+import json
+from decimal import Decimal
+from typing import Any, Dict, Optional, Union
+
+from ...infrastructure.database.models import BulkProduct, FixedWeightProduct
+from ...infrastructure.product_parser.magnit_parser.schemas.utils import TextUtils
+
+
+StoredProduct = Union[FixedWeightProduct, BulkProduct]
+
+
+class ProductFactory:
+    """Собирает модели таблиц из словарей, которые возвращает ProductService"""
+
+    NUTRITION_FIELDS = ('kilocalories', 'proteins', 'fats', 'carbohydrates')
+
+    def create(self, details: Dict[str, Any]) -> Optional[StoredProduct]:
+        """Модель товара или None, если карточку не удалось загрузить или разобрать"""
+        if not details or not details.get('success') or not details.get('url'):
+            return None
+
+        characteristics: Dict[str, str] = details.get('characteristics') or {}
+        common = {
+            'url': details['url'],
+            'title': details['title'],
+            'product_type': characteristics.get('Тип продукта'),
+            'brand': characteristics.get('Бренд'),
+            **self._nutrition(details.get('nutrition_facts')),
+            'characteristics': json.dumps(characteristics, ensure_ascii=False),
+        }
+
+        if details.get('is_food_by_weight'):
+            return BulkProduct(**common)
+        return FixedWeightProduct(weight_kg=self._to_float(TextUtils.normalize_weight(characteristics.get('Вес'))),
+                                  **common)
+
+    def _nutrition(self, facts: Optional[Dict[str, str]]) -> Dict[str, Optional[float]]:
+        facts = facts or {}
+        return {name: self._to_float(TextUtils.extract_number(facts.get(name) or ''))
+                for name in self.NUTRITION_FIELDS}
+
+    @staticmethod
+    def _to_float(value: Optional[Decimal]) -> Optional[float]:
+        return float(value) if value is not None else None
@@ -0,0 +1,381 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from ...infrastructure.product_parser.magnit_parser.normalization import (
+    NUTRITION_FIELDS,
+    normalize_products,
+    products_frame,
+)
+
+
+# Сколько граммов белка (жиров, углеводов) или килокалорий дает один рубль
+PER_RUBLE_FIELDS = tuple(f'{name}_per_ruble' for name in NUTRITION_FIELDS)
+NUMERIC_FIELDS = ('price', 'weight_kg', 'price_per_kg', *NUTRITION_FIELDS, *PER_RUBLE_FIELDS)
+
+
+# Параметры магазина в url карточки (ProductRef.for_store): магазин хранится отдельно от ключа товара
+STORE_PARAMS = frozenset({'shopCode', 'shopType'})
+
+
+def href_of(url: str) -> str:
+    """
+    Ключ товара - путь без хоста и без параметров магазина,
+    поэтому одинаков для magnit.ru и тестового стенда и для всех магазинов
+    """
+    parts = urlsplit(url)
+    query = urlencode([(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                       if key not in STORE_PARAMS])
+    return parts.path + (f'?{query}' if query else '')
+
+
+@dataclass(frozen=True)
+class RangeFilter:
+    """Условие low <= field <= high; товары без значения поля не проходят"""
+    field: str
+    low: Optional[float] = None
+    high: Optional[float] = None
+
+
+class IndexUpdate(NamedTuple):
+    added: int
+    changed: int
+    removed: int
+    total: int
+    seconds: float
+
+
+class _Snapshot:
+    """
+    Неизменяемый набор индексов одной версии данных. Запросы работают со ссылкой
+    на снимок, поэтому обновление индекса никогда не блокирует чтение.
+
+    Номер строки товара не меняется между версиями: измененный товар обновляется
+    на месте, новый добавляется в конец, удаленный остается мертвой строкой
+    до уплотнения (compacted)
+    """
+
+    def __init__(self, version: int, hrefs: np.ndarray, urls: np.ndarray, titles: np.ndarray,
+                 by_weight: np.ndarray, alive: np.ndarray, category_codes: np.ndarray, categories: List[str],
+                 columns: Dict[str, np.ndarray], positions: Dict[str, int],
+                 orders: Optional[Dict[str, np.ndarray]] = None,
+                 sorted_values: Optional[Dict[str, np.ndarray]] = None):
+        self.version = version
+        self.built_at = time.time()
+        self.hrefs = hrefs
+        self.urls = urls
+        self.titles = titles
+        self.by_weight = by_weight
+        self.alive = alive
+        self.rows = np.flatnonzero(alive)
+        self.size = len(self.rows)
+        self.positions = positions
+
+        # Категория - тип продукта из характеристик; у мертвых строк и товаров без типа код -1
+        self.category_codes = category_codes
+        self.categories = categories
+        self.category_lookup = {category.casefold(): code for code, category in enumerate(categories)}
+        order = np.argsort(category_codes, kind='stable')
+        bounds = np.searchsorted(category_codes[order], np.arange(len(categories) + 1))
+        self.category_rows = [order[bounds[i]:bounds[i + 1]] for i in range(len(categories))]
+
+        # Для каждого числового поля - номера живых строк по возрастанию значения, без пропусков
+        self.columns = columns
+        if orders is None:
+            orders, sorted_values = {}, {}
+            for name, values in columns.items():
+                order = np.argsort(values, kind='stable')  # NaN уходят в конец
+                orders[name] = order[:np.count_nonzero(~np.isnan(values))]
+                sorted_values[name] = values[orders[name]]
+        self.orders = orders
+        self.sorted_values = sorted_values
+
+    @classmethod
+    def build(cls, frame: pd.DataFrame, version: int) -> '_Snapshot':
+        """Снимок с нуля из нормализованных товаров; индекс frame - href"""
+        hrefs = frame.index.to_numpy(dtype=object)
+        codes, categories = pd.factorize(frame['product_type'])
+        return cls(version, hrefs,
+                   urls=frame['url'].to_numpy(dtype=object),
+                   titles=frame['title'].to_numpy(dtype=object),
+                   by_weight=frame['is_food_by_weight'].to_numpy(dtype=bool),
+                   alive=np.ones(len(frame), dtype=bool),
+                   category_codes=codes.astype(np.intp),
+                   categories=list(categories),
+                   columns={name: frame[name].to_numpy(dtype=float) for name in NUMERIC_FIELDS},
+                   positions={href: i for i, href in enumerate(hrefs)})
+
+    def apply(self, frame: pd.DataFrame, removed: Sequence[str], version: int) -> '_Snapshot':
+        """
+        Новый снимок с учетом изменений: frame - новые и изменившиеся товары (индекс - href),
+        removed - href удаленных. Отсортированные порядки не пересортировываются:
+        из них убираются затронутые строки, а новые значения вставляются бинарным поиском
+        """
+        positions = dict(self.positions)
+        capacity = len(self.hrefs)
+        ids = np.empty(len(frame), dtype=np.intp)
+        touched = []
+        for k, href in enumerate(frame.index):
+            i = positions.get(href)
+            if i is None:
+                i = positions[href] = capacity + k - len(touched)
+            else:
+                touched.append(i)
+            ids[k] = i
+        removed_ids = [positions.pop(href) for href in removed if href in positions]
+        touched.extend(removed_ids)
+        grow = len(frame) - (len(touched) - len(removed_ids))
+
+        def extended(array: np.ndarray, fill: Any) -> np.ndarray:
+            return np.concatenate([array, np.full(grow, fill, dtype=array.dtype)])
+
+        hrefs, urls, titles = extended(self.hrefs, None), extended(self.urls, None), extended(self.titles, None)
+        hrefs[ids] = frame.index.to_numpy(dtype=object)
+        urls[ids] = frame['url'].to_numpy(dtype=object)
+        titles[ids] = frame['title'].to_numpy(dtype=object)
+        by_weight = extended(self.by_weight, False)
+        by_weight[ids] = frame['is_food_by_weight'].to_numpy(dtype=bool)
+        alive = extended(self.alive, True)
+        alive[removed_ids] = False
+
+        categories = list(self.categories)
+        codes_by_name = {category: code for code, category in enumerate(categories)}
+        category_codes = extended(self.category_codes, -1)
+        for i, category in zip(ids, frame['product_type']):
+            if category is None or category != category:  # None или NaN
+                category_codes[i] = -1
+                continue
+            if category not in codes_by_name:
+                codes_by_name[category] = len(categories)
+                categories.append(category)
+            category_codes[i] = codes_by_name[category]
+        category_codes[removed_ids] = -1
+
+        stale = np.zeros(capacity, dtype=bool)
+        stale[touched] = True
+        columns, orders, sorted_values = {}, {}, {}
+        for name, old_values in self.columns.items():
+            values = extended(old_values, np.nan)
+            values[ids] = frame[name].to_numpy(dtype=float)
+            values[removed_ids] = np.nan
+            columns[name] = values
+
+            keep = ~stale[self.orders[name]]
+            order, ordered_values = self.orders[name][keep], self.sorted_values[name][keep]
+            new_values = values[ids]
+            valid = ~np.isnan(new_values)
+            by_value = np.argsort(new_values[valid], kind='stable')
+            new_ids, new_values = ids[valid][by_value], new_values[valid][by_value]
+            at = np.searchsorted(ordered_values, new_values, side='right')
+            orders[name] = np.insert(order, at, new_ids)
+            sorted_values[name] = np.insert(ordered_values, at, new_values)
+
+        snapshot = _Snapshot(version, hrefs, urls, titles, by_weight, alive, category_codes, categories,
+                             columns, positions, orders, sorted_values)
+        # Мертвые строки занимают память и замедляют фильтры по маске - время от времени уплотняем
+        if len(hrefs) - snapshot.size > max(1024, snapshot.size // 4):
+            return snapshot.compacted()
+        return snapshot
+
+    def compacted(self) -> '_Snapshot':
+        """Снимок без мертвых строк; номера строк меняются, порядки строятся заново"""
+        rows = self.rows
+        hrefs = self.hrefs[rows]
+        return _Snapshot(self.version, hrefs, self.urls[rows], self.titles[rows], self.by_weight[rows],
+                         np.ones(len(rows), dtype=bool), self.category_codes[rows], list(self.categories),
+                         {name: values[rows] for name, values in self.columns.items()},
+                         {href: i for i, href in enumerate(hrefs)})
+
+    def range_bounds(self, condition: RangeFilter) -> Tuple[int, int]:
+        """Отрезок orders[field], попадающий в условие, двумя бинарными поисками"""
+        values = self.sorted_values[condition.field]
+        start = 0 if condition.low is None else int(np.searchsorted(values, condition.low, side='left'))
+        end = len(values) if condition.high is None else int(np.searchsorted(values, condition.high, side='right'))
+        return start, max(start, end)
+
+    def rows_at(self, ids: np.ndarray) -> List[Dict[str, Any]]:
+        """Строки результата; значения собираются по столбцам сразу для всей страницы"""
+        ids = np.asarray(ids, dtype=np.intp)
+        codes = self.category_codes[ids].tolist()
+        columns = {
+            'href': self.hrefs[ids].tolist(),
+            'url': self.urls[ids].tolist(),
+            'title': self.titles[ids].tolist(),
+            'category': [self.categories[code] if code >= 0 else None for code in codes],
+            'is_food_by_weight': self.by_weight[ids].tolist(),
+        }
+        for name in NUMERIC_FIELDS:
+            values = self.columns[name][ids]
+            columns[name] = [None if value != value else value for value in values.tolist()]
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+class ProductIndex:
+    """
+    Индексы последних результатов обхода для API запросов.
+
+    Данные хранятся столбцами NumPy. Для каждого числового поля заранее
+    отсортированы номера строк, поэтому диапазонный запрос - два бинарных поиска,
+    а сортировка без фильтров - срез готового порядка. Категории (тип продукта)
+    и признак весового товара - готовые списки строк и маска.
+
+    update() нормализует только новые и изменившиеся карточки и вливает их
+    в готовые индексы, не пересортировывая весь каталог. Результат - новый снимок;
+    запросы до его подмены продолжают работать со старым
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._raw: Dict[str, tuple] = {}  # Исходные тексты карточек по href, чтобы находить изменения
+        self._snapshot = _Snapshot.build(self._with_derived(normalize_products(products_frame([]))), version=0)
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def update(self, results: Iterable[Dict[str, Any]], replace: bool = False) -> IndexUpdate:
+        """
+        Добавляет и обновляет товары из результатов обхода.
+        replace=True - results содержат весь каталог: товары, которых в нем нет, удаляются
+        """
+        started = time.perf_counter()
+        raw = products_frame(results)
+        records = list(raw.itertuples(index=False, name=None))
+        latest = {href_of(url): position for position, url in enumerate(raw['url'])}
+
+        with self._lock:
+            delta_hrefs, delta_positions = [], []
+            added = 0
+            for href, position in latest.items():
+                previous = self._raw.get(href)
+                if previous != records[position]:
+                    added += previous is None
+                    delta_hrefs.append(href)
+                    delta_positions.append(position)
+                    self._raw[href] = records[position]
+
+            removed = [href for href in self._raw if href not in latest] if replace else []
+            for href in removed:
+                del self._raw[href]
+
+            delta = self._with_derived(normalize_products(raw.iloc[delta_positions].reset_index(drop=True)))
+            delta.index = pd.Index(delta_hrefs, dtype=object)
+            snapshot = self._snapshot
+            self._snapshot = snapshot.apply(delta, removed, version=snapshot.version + 1)
+
+        return IndexUpdate(added=added, changed=len(delta_hrefs) - added, removed=len(removed),
+                           total=self._snapshot.size, seconds=time.perf_counter() - started)
+
+    @staticmethod
+    def _with_derived(frame: pd.DataFrame) -> pd.DataFrame:
+        # У весового товара цена указана за килограмм, а веса в характеристиках обычно нет
+        by_weight = frame['is_food_by_weight'].to_numpy(dtype=bool)
+        price_per_kg = frame['price_per_kg'].to_numpy(dtype=float)
+        price_per_kg = np.where(np.isnan(price_per_kg) & by_weight, frame['price'].to_numpy(dtype=float), price_per_kg)
+        frame['price_per_kg'] = price_per_kg
+        # КБЖУ указаны на 100 г, цена - за килограмм
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for name, per_ruble in zip(NUTRITION_FIELDS, PER_RUBLE_FIELDS):
+                per_ruble_values = frame[name].to_numpy(dtype=float) * 10 / price_per_kg
+                frame[per_ruble] = np.where(np.isfinite(per_ruble_values), per_ruble_values, np.nan)
+        return frame
+
+    def get(self, href_or_url: str) -> Optional[Dict[str, Any]]:
+        snapshot = self._snapshot
+        position = snapshot.positions.get(href_of(href_or_url))
+        return snapshot.rows_at([position])[0] if position is not None else None
+
+    def categories(self) -> List[Dict[str, Any]]:
+        snapshot = self._snapshot
+        return sorted(({'category': category, 'count': len(rows)}
+                       for category, rows in zip(snapshot.categories, snapshot.category_rows) if len(rows)),
+                      key=lambda item: -item['count'])
+
+    def query(self, category: Optional[str] = None,
+              by_weight: Optional[bool] = None,
+              ranges: Sequence[RangeFilter] = (),
+              sort: Optional[str] = None,
+              descending: bool = False,
+              limit: int = 50,
+              offset: int = 0) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Товары, прошедшие все фильтры: (сколько всего нашлось, страница результатов).
+        sort - числовое поле из NUMERIC_FIELDS; товары без его значения в сортированную выдачу не попадают
+        """
+        snapshot = self._snapshot
+        for name in [condition.field for condition in ranges] + ([sort] if sort else []):
+            if name not in snapshot.columns:
+                raise ValueError(f'Неизвестное поле: {name}')
+
+        rows = self._filter(snapshot, category, by_weight, ranges)
+        if sort is None:
+            # Без сортировки - в порядке строк, чтобы страницы были стабильны между запросами
+            if rows is None:
+                return snapshot.size, snapshot.rows_at(snapshot.rows[offset:offset + limit])
+            rows = np.sort(rows)
+            return len(rows), snapshot.rows_at(rows[offset:offset + limit])
+
+        if rows is None:
+            # Без фильтров сортировка уже готова
+            order = snapshot.orders[sort]
+            page = order[::-1][offset:offset + limit] if descending else order[offset:offset + limit]
+            return len(order), snapshot.rows_at(page)
+
+        values = snapshot.columns[sort][rows]
+        valid = ~np.isnan(values)
+        rows, values = rows[valid], values[valid]
+        keys = -values if descending else values
+        wanted = offset + limit
+        if wanted < len(rows):
+            # Частичная сортировка: полностью упорядочиваются только первые offset + limit
+            top = np.argpartition(keys, wanted - 1)[:wanted]
+            top = top[np.lexsort((rows[top], keys[top]))]
+        else:
+            top = np.lexsort((rows, keys))
+        return len(rows), snapshot.rows_at(rows[top[offset:offset + limit]])
+
+    @staticmethod
+    def _filter(snapshot: _Snapshot, category: Optional[str], by_weight: Optional[bool],
+                ranges: Sequence[RangeFilter]) -> Optional[np.ndarray]:
+        """Номера подходящих строк; None - фильтров нет, подходят все"""
+        candidates: List[np.ndarray] = []
+        if category is not None:
+            code = snapshot.category_lookup.get(category.casefold())
+            candidates.append(snapshot.category_rows[code] if code is not None else np.empty(0, dtype=np.intp))
+
+        for condition in ranges:
+            start, end = snapshot.range_bounds(condition)
+            candidates.append(snapshot.orders[condition.field][start:end])
+
+        if not candidates and by_weight is None:
+            return None
+
+        # Начинаем с самого узкого набора строк, остальные условия проверяем по столбцам
+        rows = min(candidates, key=len) if candidates else snapshot.rows
+        mask = np.ones(len(rows), dtype=bool)
+        if category is not None:
+            mask &= snapshot.category_codes[rows] == snapshot.category_lookup.get(category.casefold(), -2)
+        if by_weight is not None:
+            mask &= snapshot.by_weight[rows] == by_weight
+        for condition in ranges:
+            values = snapshot.columns[condition.field][rows]
+            if condition.low is not None:
+                mask &= values >= condition.low
+            if condition.high is not None:
+                mask &= values <= condition.high
+        return rows[mask]
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            'version': snapshot.version,
+            'products': snapshot.size,
+            'categories': sum(1 for rows in snapshot.category_rows if len(rows)),
+            'by_weight': int(snapshot.by_weight[snapshot.rows].sum()),
+            'built_at': snapshot.built_at,
+        }
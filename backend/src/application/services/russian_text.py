@@ -0,0 +1,61 @@
+"""
+Токенизация и легкий стемминг для поиска по названиям и характеристикам товаров.
+
+Стеммер - упрощенный Snowball для русского: отрезается самое длинное окончание
+прилагательного, существительного или причастия, но только после первой гласной
+(область RV), поэтому короткие основы вроде "сыр" и "рис" не портятся.
+Глагольные окончания не отрезаются - в названиях товаров глаголов почти нет
+"""
+import re
+from functools import lru_cache
+from typing import List
+
+_TOKEN = re.compile(r'[0-9]+|[a-zа-я]+')
+_VOWELS = frozenset('аеиоуыэюя')
+_CYRILLIC = re.compile(r'[а-я]')
+
+STOP_WORDS = frozenset({'и', 'в', 'во', 'с', 'со', 'на', 'для', 'по', 'из', 'без', 'от', 'до', 'не', 'к', 'у', 'о', 'а'})
+
+_REFLEXIVE = ('ся', 'сь')
+_ENDINGS = tuple(sorted({
+    # Прилагательные и причастия
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым',
+    'ом', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+    'ивш', 'ывш', 'ующ', 'ем', 'нн', 'вш', 'ющ', 'щ',
+    # Существительные
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ье', 'еи', 'ии', 'ям', 'ам', 'ах', 'ях',
+    'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю', 'я',
+}, key=len, reverse=True))
+
+MIN_STEM = 2
+
+
+def tokenize(text: str) -> List[str]:
+    """Слова и числа в нижнем регистре, ё заменена на е; однобуквенные слова и предлоги отбрасываются"""
+    tokens = _TOKEN.findall(text.casefold().replace('ё', 'е'))
+    return [token for token in tokens if token not in STOP_WORDS and (len(token) > 1 or token.isdigit())]
+
+
+@lru_cache(maxsize=200_000)
+def stem(word: str) -> str:
+    if len(word) <= 3 or not _CYRILLIC.match(word):
+        return word
+
+    rv = next((i + 1 for i, char in enumerate(word) if char in _VOWELS), len(word))
+    lower_bound = max(rv, MIN_STEM)
+    for ending in _REFLEXIVE:
+        if word.endswith(ending) and len(word) - len(ending) >= lower_bound:
+            word = word[:-len(ending)]
+            break
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= lower_bound:
+            word = word[:-len(ending)]
+            break
+    if word.endswith('ь') and len(word) - 1 >= lower_bound:
+        word = word[:-1]
+    return word
+
+
+def analyze(text: str) -> List[str]:
+    """Основы слов текста в порядке следования"""
+    return [stem(token) for token in tokenize(text)]
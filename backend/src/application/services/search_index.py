@@ -0,0 +1,439 @@
+"""
+Полнотекстовый поиск товаров по названию и значениям характеристик.
+
+Индекс устроен как набор неизменяемых сегментов (как в Lucene): в каждом -
+отсортированный словарь основ и списки вхождений (номера документов и веса) одним
+массивом NumPy на все термины. Сохраненный сегмент - каталог файлов .npy,
+при открытии они отображаются в память (mmap) и не читаются целиком.
+
+Новые и изменившиеся карточки попадают в новый маленький сегмент, старые версии
+помечаются удаленными в своих сегментах. Когда сегментов становится много или
+удаленных документов слишком много, все сегменты сливаются в один
+"""
+import bisect
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .packed_strings import PackedStrings
+from .product_index import IndexUpdate, href_of
+from .russian_text import analyze, stem, tokenize
+
+logger = logging.getLogger(__name__)
+
+TITLE_WEIGHT = 2.0  # Совпадение в названии весит больше, чем в характеристиках
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_TERMS = 64  # Сколько терминов подставлять вместо префикса в одном сегменте
+MANIFEST = 'manifest.json'
+
+
+class _Document(NamedTuple):
+    href: str
+    title: str
+    fingerprint: int  # Хеш названия и характеристик - по нему находятся изменившиеся карточки
+    stems: Dict[str, float]  # Основа -> вес (вхождения в названии весят TITLE_WEIGHT)
+
+
+def _document_text(details: Dict[str, Any]) -> Tuple[str, List[str]]:
+    characteristics = details.get('characteristics') or {}
+    return details.get('title') or '', [str(value) for value in characteristics.values() if value]
+
+
+@lru_cache(maxsize=100_000)
+def _value_terms(value: str) -> Tuple[str, ...]:
+    """Значения характеристик (бренд, страна, тип продукта) сильно повторяются между товарами"""
+    return tuple(analyze(value))
+
+
+def _document(href: str, title: str, values: List[str], fingerprint: int) -> _Document:
+    stems: Dict[str, float] = {}
+    for term in analyze(title):
+        stems[term] = stems.get(term, 0.0) + TITLE_WEIGHT
+    for value in values:
+        for term in _value_terms(value):
+            stems[term] = stems.get(term, 0.0) + 1.0
+    return _Document(href, title, fingerprint, stems)
+
+
+def _fingerprint(title: str, values: List[str]) -> int:
+    digest = hashlib.blake2b('\x1f'.join([title, *values]).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class _Segment:
+    """
+    Неизменяемый сегмент. Вхождения термина terms[t] - doc_ids/weights
+    в отрезке [posting_offsets[t], posting_offsets[t + 1]). Изменяется только
+    маска удаленных, и то копированием (without)
+    """
+
+    ARRAYS = ('term_data', 'term_offsets', 'posting_offsets', 'doc_ids', 'weights', 'doc_lengths',
+              'href_data', 'href_offsets', 'title_data', 'title_offsets', 'fingerprints')
+
+    def __init__(self, name: str, arrays: Dict[str, np.ndarray], deleted: np.ndarray):
+        self.name = name
+        self.arrays = arrays
+        self.terms = PackedStrings(arrays['term_data'], arrays['term_offsets'])
+        self.hrefs = PackedStrings(arrays['href_data'], arrays['href_offsets'])
+        self.titles = PackedStrings(arrays['title_data'], arrays['title_offsets'])
+        self.posting_offsets = arrays['posting_offsets']
+        self.doc_ids = arrays['doc_ids']
+        self.weights = arrays['weights']
+        self.doc_lengths = arrays['doc_lengths']
+        self.fingerprints = arrays['fingerprints']
+        self.deleted = deleted
+        self.live = int(len(deleted) - np.count_nonzero(deleted))
+        self.live_length = float(self.doc_lengths[~deleted].sum(dtype=np.float64))
+
+    @property
+    def size(self) -> int:
+        return len(self.deleted)
+
+    @classmethod
+    def from_postings(cls, name: str, vocabulary: List[str], term_ids: np.ndarray, doc_ids: np.ndarray,
+                      weights: np.ndarray, hrefs: List[str], titles: List[str],
+                      fingerprints: np.ndarray, doc_lengths: np.ndarray) -> '_Segment':
+        """Сегмент из троек (термин, документ, вес); vocabulary отсортирован"""
+        order = np.lexsort((doc_ids, term_ids))
+        posting_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocabulary)), out=posting_offsets[1:])
+        terms, hrefs, titles = PackedStrings.pack(vocabulary), PackedStrings.pack(hrefs), PackedStrings.pack(titles)
+        arrays = {
+            'term_data': terms.data, 'term_offsets': terms.offsets,
+            'posting_offsets': posting_offsets,
+            'doc_ids': doc_ids[order].astype(np.uint32),
+            'weights': weights[order].astype(np.float32),
+            'doc_lengths': doc_lengths.astype(np.float32),
+            'href_data': hrefs.data, 'href_offsets': hrefs.offsets,
+            'title_data': titles.data, 'title_offsets': titles.offsets,
+            'fingerprints': fingerprints.astype(np.uint64),
+        }
+        return cls(name, arrays, np.zeros(len(hrefs), dtype=bool))
+
+    @classmethod
+    def build(cls, name: str, documents: List[_Document]) -> '_Segment':
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        weights: List[float] = []
+        counts = np.zeros(len(documents), dtype=np.int64)
+        doc_lengths = np.zeros(len(documents), dtype=np.float32)
+        for doc, document in enumerate(documents):
+            term_ids.extend([vocabulary.setdefault(term, len(vocabulary)) for term in document.stems])
+            weights.extend(document.stems.values())
+            counts[doc] = len(document.stems)
+            doc_lengths[doc] = sum(document.stems.values())
+        doc_ids = np.repeat(np.arange(len(documents), dtype=np.int64), counts)
+
+        # Номера терминов в порядке появления -> номера в отсортированном словаре
+        sorted_terms = sorted(vocabulary)
+        rank = np.empty(len(vocabulary), dtype=np.int64)
+        rank[[vocabulary[term] for term in sorted_terms]] = np.arange(len(vocabulary))
+        return cls.from_postings(name, sorted_terms, rank[np.asarray(term_ids, dtype=np.int64)],
+                                 doc_ids, np.asarray(weights, dtype=np.float32),
+                                 [document.href for document in documents], [document.title for document in documents],
+                                 np.array([document.fingerprint for document in documents], dtype=np.uint64),
+                                 doc_lengths)
+
+    @classmethod
+    def merge(cls, name: str, segments: List['_Segment']) -> '_Segment':
+        """Один сегмент из живых документов нескольких"""
+        segment_terms = [segment.terms.tolist() for segment in segments]
+        vocabulary = sorted(set().union(*segment_terms))
+        position = {term: i for i, term in enumerate(vocabulary)}
+
+        term_parts, doc_parts, weight_parts, length_parts, fingerprint_parts = [], [], [], [], []
+        hrefs: List[str] = []
+        titles: List[str] = []
+        base = 0
+        for segment, terms in zip(segments, segment_terms):
+            alive = ~segment.deleted
+            new_ids = np.cumsum(alive) - 1 + base
+            term_of_posting = np.repeat(np.array([position[term] for term in terms], dtype=np.int64),
+                                        np.diff(segment.posting_offsets))
+            doc_ids = np.asarray(segment.doc_ids, dtype=np.int64)
+            keep = alive[doc_ids]
+            term_parts.append(term_of_posting[keep])
+            doc_parts.append(new_ids[doc_ids[keep]])
+            weight_parts.append(segment.weights[keep])
+            length_parts.append(segment.doc_lengths[alive])
+            fingerprint_parts.append(segment.fingerprints[alive])
+            segment_hrefs, segment_titles = segment.hrefs.tolist(), segment.titles.tolist()
+            for doc in np.flatnonzero(alive).tolist():
+                hrefs.append(segment_hrefs[doc])
+                titles.append(segment_titles[doc])
+            base += segment.live
+
+        term_ids = np.concatenate(term_parts) if term_parts else np.empty(0, dtype=np.int64)
+        # Термины, оставшиеся только у удаленных документов, в словарь не попадают
+        used = np.bincount(term_ids, minlength=len(vocabulary)) > 0
+        new_term_ids = np.cumsum(used) - 1
+        vocabulary = [term for term, is_used in zip(vocabulary, used.tolist()) if is_used]
+        return cls.from_postings(name, vocabulary, new_term_ids[term_ids],
+                                 np.concatenate(doc_parts), np.concatenate(weight_parts), hrefs, titles,
+                                 np.concatenate(fingerprint_parts), np.concatenate(length_parts))
+
+    def without(self, doc_ids: Iterable[int]) -> '_Segment':
+        deleted = self.deleted.copy()
+        deleted[list(doc_ids)] = True
+        return _Segment(self.name, self.arrays, deleted)
+
+    def find(self, term: str) -> int:
+        i = bisect.bisect_left(self.terms, term)
+        return i if i < len(self.terms) and self.terms[i] == term else -1
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        return (bisect.bisect_left(self.terms, prefix),
+                bisect.bisect_left(self.terms, prefix + chr(0x10FFFF)))
+
+    def document_frequency(self, t: int) -> int:
+        """Сколько живых документов содержат термин: вхождения удаленных не считаются"""
+        start, end = self.posting_offsets[t], self.posting_offsets[t + 1]
+        if self.live == self.size:
+            return int(end - start)
+        return int(np.count_nonzero(~self.deleted[self.doc_ids[start:end]]))
+
+    def postings(self, t: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.posting_offsets[t], self.posting_offsets[t + 1]
+        return self.doc_ids[start:end], self.weights[start:end]
+
+    def save(self, directory: str) -> None:
+        path = os.path.join(directory, self.name)
+        if not os.path.isdir(path):
+            tmp_path = f'{path}.tmp'
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(tmp_path)
+            for array_name in self.ARRAYS:
+                np.save(os.path.join(tmp_path, f'{array_name}.npy'), self.arrays[array_name])
+            os.replace(tmp_path, path)
+        # Маска удаленных меняется между версиями, поэтому пишется всегда
+        tmp_deleted = os.path.join(path, 'deleted.tmp.npy')
+        np.save(tmp_deleted, self.deleted)
+        os.replace(tmp_deleted, os.path.join(path, 'deleted.npy'))
+
+    @classmethod
+    def load(cls, directory: str, name: str) -> '_Segment':
+        path = os.path.join(directory, name)
+        arrays = {array_name: np.load(os.path.join(path, f'{array_name}.npy'), mmap_mode='r')
+                  for array_name in cls.ARRAYS}
+        return cls(name, arrays, np.load(os.path.join(path, 'deleted.npy')))
+
+
+class SearchIndex:
+    """
+    Поиск товаров по названию и характеристикам с ранжированием BM25.
+
+    update() принимает результаты обхода и индексирует только новые и изменившиеся
+    карточки; save() сохраняет сегменты в directory, open() открывает их через mmap.
+    Запросы работают со списком сегментов, взятым в начале запроса,
+    поэтому обновление не блокирует поиск
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_segments: int = 8, max_deleted_ratio: float = 0.3):
+        self.directory = directory
+        self.max_segments = max_segments
+        self.max_deleted_ratio = max_deleted_ratio
+        self._lock = threading.Lock()
+        self._segments: List[_Segment] = []
+        self._generation = 0
+        # href -> (сегмент, номер документа, отпечаток текста) для живых документов
+        self._live: Dict[str, Tuple[str, int, int]] = {}
+
+    @classmethod
+    def open(cls, directory: str, **kwargs) -> 'SearchIndex':
+        """Индекс из каталога; если индекса там еще нет - пустой"""
+        index = cls(directory, **kwargs)
+        manifest_path = os.path.join(directory, MANIFEST)
+        if not os.path.exists(manifest_path):
+            return index
+
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        index._generation = manifest['generation']
+        index._segments = [_Segment.load(directory, name) for name in manifest['segments']]
+        for segment in index._segments:
+            index._register(segment)
+        logger.info("Поисковый индекс %s: %s сегментов, %s товаров", directory, len(index._segments), len(index))
+        return index
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def _register(self, segment: _Segment) -> None:
+        hrefs, fingerprints = segment.hrefs.tolist(), segment.fingerprints.tolist()
+        for doc in np.flatnonzero(~segment.deleted).tolist():
+            self._live[hrefs[doc]] = (segment.name, doc, fingerprints[doc])
+
+    def _next_name(self) -> str:
+        self._generation += 1
+        return f'segment-{self._generation:06d}'
+
+    def update(self, results: Iterable[Dict[str, Any]], replace: bool = False) -> IndexUpdate:
+        """
+        Индексирует новые и изменившиеся карточки.
+        replace=True - results содержат весь каталог: товары, которых в нем нет, удаляются
+        """
+        started = time.perf_counter()
+        latest: Dict[str, Dict[str, Any]] = {}
+        for details in results:
+            if details.get('url') and not details.get('error'):
+                latest[href_of(details['url'])] = details
+
+        with self._lock:
+            documents: List[_Document] = []
+            deletes: Dict[str, List[int]] = {}
+            added = 0
+            for href, details in latest.items():
+                title, values = _document_text(details)
+                fingerprint = _fingerprint(title, values)
+                live = self._live.get(href)
+                if live is not None and live[2] == fingerprint:
+                    continue
+                if live is None:
+                    added += 1
+                else:
+                    deletes.setdefault(live[0], []).append(live[1])
+
+                documents.append(_document(href, title, values, fingerprint))
+
+            removed = [href for href in self._live if href not in latest] if replace else []
+            for href in removed:
+                name, doc, _ = self._live.pop(href)
+                deletes.setdefault(name, []).append(doc)
+
+            segments = [segment.without(deletes[segment.name]) if segment.name in deletes else segment
+                        for segment in self._segments]
+            if documents:
+                segment = _Segment.build(self._next_name(), documents)
+                segments.append(segment)
+                self._register(segment)
+
+            if self._needs_merge(segments):
+                segment = _Segment.merge(self._next_name(), segments)
+                segments = [segment]
+                self._live = {}
+                self._register(segment)
+            self._segments = segments
+
+        return IndexUpdate(added=added, changed=len(documents) - added, removed=len(removed),
+                           total=len(self._live), seconds=time.perf_counter() - started)
+
+    def _needs_merge(self, segments: List[_Segment]) -> bool:
+        size = sum(segment.size for segment in segments)
+        deleted = size - sum(segment.live for segment in segments)
+        return len(segments) > self.max_segments or (size > 0 and deleted / size > self.max_deleted_ratio)
+
+    def save(self) -> None:
+        """Записывает новые сегменты и маски удаленных, затем атомарно подменяет manifest.json"""
+        if self.directory is None:
+            raise ValueError('Не задан каталог индекса')
+
+        with self._lock:
+            segments, generation = self._segments, self._generation
+            os.makedirs(self.directory, exist_ok=True)
+            for segment in segments:
+                segment.save(self.directory)
+
+            manifest_path = os.path.join(self.directory, MANIFEST)
+            with open(f'{manifest_path}.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'generation': generation, 'segments': [segment.name for segment in segments]}, f)
+            os.replace(f'{manifest_path}.tmp', manifest_path)
+
+            # Сегменты, слитые в другие, больше не нужны
+            names = {segment.name for segment in segments}
+            for entry in os.listdir(self.directory):
+                if entry.startswith('segment-') and entry not in names:
+                    shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+
+    def search(self, query: str, limit: int = 20, offset: int = 0,
+               prefix: bool = False) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Товары по убыванию BM25: (сколько всего нашлось, страница результатов).
+        prefix=True - последнее слово запроса считается началом слова (поиск по мере набора)
+        """
+        segments = self._segments
+        tokens = tokenize(query)
+        if not tokens or not segments:
+            return 0, []
+
+        terms = {stem(token) for token in (tokens[:-1] if prefix else tokens)}
+        prefix_stem = stem(tokens[-1]) if prefix else None
+
+        # Термины запроса в каждом сегменте и их общая документная частота по живым документам,
+        # как и число документов: иначе после обновлений df может превысить N
+        matches: List[Dict[str, int]] = []
+        frequencies: Counter = Counter()
+        for segment in segments:
+            found = {}
+            for term in terms:
+                t = segment.find(term)
+                if t >= 0:
+                    found[term] = t
+            if prefix_stem is not None:
+                start, end = segment.prefix_range(prefix_stem)
+                for t in range(start, min(end, start + MAX_PREFIX_TERMS)):
+                    found.setdefault(segment.terms[t], t)
+            for term, t in found.items():
+                frequencies[term] += segment.document_frequency(t)
+            matches.append(found)
+
+        documents = sum(segment.live for segment in segments)
+        if documents == 0:
+            return 0, []
+        average_length = sum(segment.live_length for segment in segments) / documents
+        idf = {term: np.log1p((documents - df + 0.5) / (df + 0.5)) for term, df in frequencies.items()}
+
+        wanted = offset + limit
+        total = 0
+        candidates: List[Tuple[float, int, int]] = []
+        for position, (segment, found) in enumerate(zip(segments, matches)):
+            if not found:
+                continue
+            doc_parts, score_parts = [], []
+            for term, t in found.items():
+                if frequencies[term] == 0:
+                    continue  # Термин остался только у удаленных документов
+                doc_ids, weights = segment.postings(t)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * segment.doc_lengths[doc_ids] / average_length)
+                doc_parts.append(doc_ids)
+                score_parts.append(idf[term] * weights * (BM25_K1 + 1) / (weights + norm))
+            if not doc_parts:
+                continue
+            doc_ids = np.concatenate(doc_parts)
+            scores = np.bincount(doc_ids, weights=np.concatenate(score_parts), minlength=segment.size)
+            # Найден документ, у которого есть вхождение термина запроса, а не ненулевой балл
+            hit = np.bincount(doc_ids, minlength=segment.size) > 0
+            matched = np.flatnonzero(hit & ~segment.deleted)
+            total += len(matched)
+            if len(matched) > wanted:
+                # Баллы выше k-го плюс недостающие из равных k-му в порядке номеров документов,
+                # чтобы при равных баллах выдача не зависела от argpartition
+                matched_scores = scores[matched]
+                threshold = np.partition(matched_scores, len(matched) - wanted)[len(matched) - wanted]
+                above = matched[matched_scores > threshold]
+                tied = matched[matched_scores == threshold][:wanted - len(above)]
+                matched = np.concatenate([above, tied])
+            candidates.extend((float(scores[doc]), position, doc) for doc in matched.tolist())
+
+        candidates.sort(key=lambda item: (-item[0], item[1], item[2]))
+        return total, [{'href': segments[position].hrefs[doc], 'title': segments[position].titles[doc], 'score': score}
+                       for score, position, doc in candidates[offset:wanted]]
+
+    def stats(self) -> Dict[str, Any]:
+        segments = self._segments
+        return {
+            'products': len(self._live),
+            'segments': len(segments),
+            'deleted': sum(segment.size - segment.live for segment in segments),
+            'terms': sum(len(segment.terms) for segment in segments),
+            'postings': sum(len(segment.doc_ids) for segment in segments),
+        }
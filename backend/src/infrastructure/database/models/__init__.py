@@ -0,0 +1,6 @@
+from .base import TableModel
+from .bulk_product import BulkProduct
+from .fixed_weight_product import FixedWeightProduct
+
+
+__all__ = ['TableModel', 'BulkProduct', 'FixedWeightProduct']
@@ -0,0 +1,31 @@
+from dataclasses import astuple, fields
+from typing import ClassVar, Tuple
+
+
+class TableModel:
+    """
+    Общая часть моделей таблиц: имя таблицы, DDL и upsert по первичному ключу url.
+    Поля dataclass-наследника совпадают с колонками таблицы и идут в том же порядке
+    """
+    __tablename__: ClassVar[str]
+    __ddl__: ClassVar[str]
+
+    @classmethod
+    def columns(cls) -> Tuple[str, ...]:
+        return tuple(field.name for field in fields(cls))
+
+    @classmethod
+    def upsert_sql(cls) -> str:
+        """INSERT ... ON CONFLICT DO UPDATE - повторный разбор обновляет строку, а не дублирует ее"""
+        columns = cls.columns()
+        updates = ', '.join(f'{column} = excluded.{column}' for column in columns if column != 'url')
+        return (f'INSERT INTO {cls.__tablename__} ({", ".join(columns)}) '
+                f'VALUES ({", ".join("?" for _ in columns)}) '
+                f'ON CONFLICT(url) DO UPDATE SET {updates}')
+
+    @classmethod
+    def delete_sql(cls) -> str:
+        return f'DELETE FROM {cls.__tablename__} WHERE url = ?'
+
+    def as_row(self) -> tuple:
+        return astuple(self)
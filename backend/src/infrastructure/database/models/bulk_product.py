@@ -0,0 +1,36 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from .base import TableModel
+
+
+@dataclass
+class BulkProduct(TableModel):
+    """Товар на развес: вес не фиксирован, цена указывается за килограмм"""
+    __tablename__ = 'bulk_products'
+    __ddl__ = """
+        CREATE TABLE IF NOT EXISTS bulk_products (
+            url TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            product_type TEXT,
+            brand TEXT,
+            kilocalories REAL,
+            proteins REAL,
+            fats REAL,
+            carbohydrates REAL,
+            characteristics TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """
+
+    url: str
+    title: str
+    product_type: Optional[str] = None
+    brand: Optional[str] = None
+    kilocalories: Optional[float] = None
+    proteins: Optional[float] = None
+    fats: Optional[float] = None
+    carbohydrates: Optional[float] = None
+    characteristics: str = '{}'  # JSON со всеми характеристиками со страницы
+    updated_at: str = field(default_factory=lambda: datetime.now().isoformat())
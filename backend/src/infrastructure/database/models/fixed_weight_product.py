@@ -0,0 +1,38 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from .base import TableModel
+
+
+@dataclass
+class FixedWeightProduct(TableModel):
+    """Товар фиксированного веса (в упаковке)"""
+    __tablename__ = 'fixed_weight_products'
+    __ddl__ = """
+        CREATE TABLE IF NOT EXISTS fixed_weight_products (
+            url TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            product_type TEXT,
+            brand TEXT,
+            weight_kg REAL,
+            kilocalories REAL,
+            proteins REAL,
+            fats REAL,
+            carbohydrates REAL,
+            characteristics TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """
+
+    url: str
+    title: str
+    product_type: Optional[str] = None
+    brand: Optional[str] = None
+    weight_kg: Optional[float] = None
+    kilocalories: Optional[float] = None
+    proteins: Optional[float] = None
+    fats: Optional[float] = None
+    carbohydrates: Optional[float] = None
+    characteristics: str = '{}'  # JSON со всеми характеристиками со страницы
+    updated_at: str = field(default_factory=lambda: datetime.now().isoformat())
@@ -1,6 +1,12 @@
-from .session_config import session
+from .session_config import session, TransportConfig
+from .transport import create_transport, TransportError
 from .client import RequestHttpClient
 from .client import PoliteHttpClient
+from .rate_limiter import RateLimiter
+from .retry import FailureKind, FetchResult, RetryEngine, RetryPolicy
+from .cache import CacheBackend, CachePolicy, MemoryCache, SqliteCache
 
 
-__all__ = ['session', 'RequestHttpClient', 'PoliteHttpClient']
+__all__ = ['session', 'TransportConfig', 'create_transport', 'TransportError', 'RequestHttpClient', 'PoliteHttpClient', 'RateLimiter',
+           'FailureKind', 'FetchResult', 'RetryEngine', 'RetryPolicy',
+           'CacheBackend', 'CachePolicy', 'MemoryCache', 'SqliteCache']
@@ -1,41 +1,151 @@
-import aiohttp
 import asyncio
+import time
+from dataclasses import replace
 from typing import Dict, Optional, Any
-import json
+from urllib.parse import urlsplit
 import logging
 
+from .cache import CacheBackend, CachePolicy, CachedResponse, MemoryCache, DEFAULT_CACHE_POLICY, make_cache_key
+from .rate_limiter import RateLimiter, THROTTLE_STATUSES, is_blocked_page, parse_retry_after
+from .retry import NO_RETRY_POLICY, FetchResult, RetryEngine, classify_error, classify_status
+from .async_transport import AsyncTransport, create_async_transport
+from .session_config import DEFAULT_TRANSPORT_CONFIG, TransportConfig
+from .transport import TransportError
+from ..metrics import CrawlMetrics
+
 logger = logging.getLogger(__name__)
 
 
 class AsyncHttpClient:
-    def __init__(self, max_concurrent: int = 10):
-        self.session = None
+    """
+    Асинхронный http клиент на основе aiohttp.
+    max_concurrent ограничивает общее число одновременных запросов,
+    per_host_limit - число одновременных запросов к одному хосту,
+    delay - пауза вежливости после каждого запроса в рамках слота хоста,
+    rate_limiter - общий с синхронным клиентом лимит запросов в секунду,
+    cache, cache_policy и metrics работают так же, как в RequestHttpClient,
+    transport_config - пул соединений и HTTP/2 (лимиты пула не меньше max_concurrent и per_host_limit),
+    retry - повторы и предохранители хостов, общие с синхронным клиентом (по умолчанию без повторов).
+    """
+
+    def __init__(self, max_concurrent: int = 10, per_host_limit: int = 4, delay: float = 0.0,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[CacheBackend] = None,
+                 cache_policy: CachePolicy = DEFAULT_CACHE_POLICY,
+                 metrics: Optional[CrawlMetrics] = None,
+                 transport_config: TransportConfig = DEFAULT_TRANSPORT_CONFIG,
+                 retry: Optional[RetryEngine] = None):
+        # Иначе запросы, прошедшие семафоры, ждали бы свободного соединения в пуле
+        self.transport_config = replace(transport_config,
+                                        max_connections=max(transport_config.max_connections, max_concurrent),
+                                        pool_maxsize=max(transport_config.pool_maxsize, per_host_limit))
+        self.transport: AsyncTransport = create_async_transport(self.transport_config)
+        self.rate_limiter = rate_limiter
+        self.max_concurrent = max_concurrent
+        self.per_host_limit = per_host_limit
+        self.delay = delay
         self.semaphore = asyncio.Semaphore(max_concurrent)
-        self._cache: Dict[str, str] = {}
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.cache = cache if cache is not None else MemoryCache()
+        self.cache_policy = cache_policy
+        self.metrics = metrics
+        self.retry = retry if retry is not None else RetryEngine(NO_RETRY_POLICY, metrics)
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_semaphores[host]
 
     async def get(self, url: str, params: Optional[Dict] = None) -> Optional[str]:
-        cache_key = f'{url}_{json.dumps(params, sort_keys=True) if params else ""}'
+        """Текст ответа (в том числе капчи) или None; вид ошибки и число попыток отдает fetch"""
+        return (await self.fetch(url, params)).content
+
+    async def fetch(self, url: str, params: Optional[Dict] = None) -> FetchResult:
+        """Асинхронный аналог RequestHttpClient.fetch; на время паузы перед повтором слоты освобождаются"""
+        cache_key = make_cache_key(url, params)
+        cached = self.cache.get(cache_key)
+        if cached is not None and self.cache_policy.is_fresh(url, cached):
+            if self.metrics:
+                self.metrics.cache_hit(url)
+            return FetchResult(url, cached.content, attempts=0)
 
-        if cache_key in self._cache:
-            return self._cache[cache_key]
+        attempt = 0
+        while True:
+            attempt += 1
+            rejected = self.retry.allow(url, attempt)
+            if rejected is not None:
+                return rejected
+            async with self.semaphore, self._host_semaphore(url):
+                result = await self._attempt(url, params, cache_key, cached, attempt)
+            delay = self.retry.backoff(result)
+            if delay is None:
+                return result
+            await asyncio.sleep(delay)
 
-        async with self.semaphore:
-            try:
-                if not self.session:
-                    self.session = aiohttp.ClientSession()
+    async def _attempt(self, url: str, params: Optional[Dict], cache_key: str, cached: Optional[CachedResponse],
+                       attempt: int) -> FetchResult:
+        wait_started = time.perf_counter()
+        if self.rate_limiter:
+            await self.rate_limiter.acquire_async(url)
+        waited = time.perf_counter() - wait_started
 
-                async with self.session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    response.raise_for_status()
-                    content = await response.text()
-                    self._cache[cache_key] = content
-                    return content
-            except Exception as e:
-                logger.error(f"Async HTTP error: {e}")
-                return None
+        status = None
+        retry_after = None
+        blocked = False
+        size = 0
+        started = time.perf_counter()
+        try:
+            response = await self.transport.get(url, params=params,
+                                                headers=cached.conditional_headers() if cached else None)
+            status = response.status
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+            if status == 304 and cached is not None:
+                self.cache.set(cache_key, cached.refreshed())
+                return FetchResult(url, cached.content, status, attempts=attempt)
+
+            if status >= 400:
+                logger.debug("Async HTTP error: %s для %s", status, url)
+                return FetchResult(url, status=status, failure=classify_status(status), attempts=attempt)
+            size = len(response.body)
+            content = response.text
+            blocked = is_blocked_page(content)
+            if not blocked:
+                self.cache.set(cache_key, CachedResponse(content,
+                                                         etag=response.headers.get('ETag'),
+                                                         last_modified=response.headers.get('Last-Modified')))
+            return FetchResult(url, content, status, failure=classify_status(status, blocked), attempts=attempt)
+        except TransportError as e:
+            logger.debug("Async HTTP error: %s", e)
+            return FetchResult(url, failure=classify_error(e), error=str(e), attempts=attempt)
+        finally:
+            if self.rate_limiter:
+                self.rate_limiter.feedback(url, status, blocked=blocked, retry_after=retry_after)
+            if self.metrics:
+                self._record(url, time.perf_counter() - started, status, size, blocked, waited)
+            # Слот хоста освобождается только после паузы
+            if self.delay:
+                await asyncio.sleep(self.delay)
+
+    def _record(self, url: str, seconds: float, status: Optional[int], size: int, blocked: bool,
+                waited: float) -> None:
+        self.metrics.observe_request(url, seconds, status, size, waited)
+        if blocked:
+            self.metrics.event('captcha', url)
+        if status in THROTTLE_STATUSES:
+            self.metrics.event('throttled', url)
 
     async def close(self):
-        if self.session:
-            await self.session.close()
+        await self.transport.close()
+        # Семафоры и сессия привязываются к event loop, поэтому после закрытия создаются заново,
+        # чтобы клиент можно было использовать в следующем asyncio.run()
+        self.semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._host_semaphores.clear()
+
+    def cached_response(self, url: str, params: Optional[Dict] = None) -> Optional[CachedResponse]:
+        """Запись кэша для url вместе с ETag/Last-Modified"""
+        return self.cache.get(make_cache_key(url, params))
 
     def clear_cache(self):
-        self._cache.clear()
\ No newline at end of file
+        self.cache.clear()
@@ -0,0 +1,116 @@
+import aiohttp
+import asyncio
+import logging
+from typing import AsyncIterable, Dict, Optional, Protocol
+
+from .session_config import DEFAULT_HEADERS, DEFAULT_TRANSPORT_CONFIG, TransportConfig
+from .transport import HttpResponse, TransportError, http2_available, httpx
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTransport(Protocol):
+    async def get(self, url: str, params: Optional[Dict] = None,
+                  headers: Optional[Dict[str, str]] = None) -> HttpResponse: ...
+
+    async def close(self) -> None: ...
+
+
+async def aread_limited(chunks: AsyncIterable[bytes], limit: int) -> bytes:
+    """Асинхронный аналог read_limited"""
+    body = bytearray()
+    async for chunk in chunks:
+        body += chunk
+        if len(body) > limit:
+            raise TransportError(f'Ответ больше {limit} байт', too_large=True)
+    return bytes(body)
+
+
+class AiohttpTransport:
+    """
+    HTTP/1.1 через aiohttp: TCPConnector с лимитами соединений всего и на хост,
+    keep-alive и кэшем DNS. Сессия создается при первом запросе внутри event loop
+    и пересоздается после close(), потому что привязана к циклу
+    """
+
+    def __init__(self, config: TransportConfig = DEFAULT_TRANSPORT_CONFIG):
+        self.config = config
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    def _session(self) -> aiohttp.ClientSession:
+        # Между проверкой и созданием нет await, поэтому две корутины не создадут две сессии
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.config.max_connections,
+                                             limit_per_host=self.config.pool_maxsize,
+                                             keepalive_timeout=self.config.keepalive_timeout,
+                                             ttl_dns_cache=self.config.dns_cache_ttl)
+            self.session = aiohttp.ClientSession(
+                headers=DEFAULT_HEADERS,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(connect=self.config.connect_timeout,
+                                              sock_read=self.config.read_timeout),
+            )
+        return self.session
+
+    async def get(self, url: str, params: Optional[Dict] = None,
+                  headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+        try:
+            async with self._session().get(url, params=params, headers=headers) as response:
+                body = await aread_limited(response.content.iter_chunked(self.config.chunk_size),
+                                           self.config.max_body_size)
+                return HttpResponse(response.status, response.headers, body, response.charset)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise TransportError(str(e) or type(e).__name__, timeout=isinstance(e, asyncio.TimeoutError)) from e
+
+    async def close(self) -> None:
+        if self.session:
+            await self.session.close()
+        self.session = None
+
+
+class AsyncHttpxTransport:
+    """HTTP/2 через httpx.AsyncClient: запросы к хосту мультиплексируются в одном соединении"""
+
+    def __init__(self, config: TransportConfig = DEFAULT_TRANSPORT_CONFIG):
+        if not http2_available():
+            raise RuntimeError('Для HTTP/2 нужны httpx и h2')
+        self.config = config
+        self.client: Optional['httpx.AsyncClient'] = None
+
+    def _client(self) -> 'httpx.AsyncClient':
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                http2=True,
+                headers=DEFAULT_HEADERS,
+                follow_redirects=True,
+                timeout=httpx.Timeout(self.config.read_timeout, connect=self.config.connect_timeout),
+                limits=httpx.Limits(max_connections=self.config.max_connections,
+                                    max_keepalive_connections=self.config.pool_maxsize,
+                                    keepalive_expiry=self.config.keepalive_timeout),
+            )
+        return self.client
+
+    async def get(self, url: str, params: Optional[Dict] = None,
+                  headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+        try:
+            async with self._client().stream('GET', url, params=params, headers=headers) as response:
+                body = await aread_limited(response.aiter_bytes(self.config.chunk_size),
+                                           self.config.max_body_size)
+                return HttpResponse(response.status_code, response.headers, body, response.charset_encoding)
+        except httpx.HTTPError as e:
+            raise TransportError(str(e), timeout=isinstance(e, httpx.TimeoutException)) from e
+
+    async def close(self) -> None:
+        if self.client:
+            await self.client.aclose()
+        self.client = None
+
+
+def create_async_transport(config: TransportConfig = DEFAULT_TRANSPORT_CONFIG) -> AsyncTransport:
+    """Транспорт по настройкам: HTTP/2, если он запрошен и доступен, иначе aiohttp"""
+    if config.http2:
+        if http2_available():
+            return AsyncHttpxTransport(config)
+        logger.warning("HTTP/2 недоступен (нужны httpx и h2), используется HTTP/1.1")
+    return AiohttpTransport(config)
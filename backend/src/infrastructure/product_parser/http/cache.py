@@ -0,0 +1,214 @@
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Dict, Optional, Protocol, Sequence, Tuple
+
+
+def make_cache_key(url: str, params: Optional[Dict] = None) -> str:
+    # Параметр sort_keys задаёт, будут ли ключи в результирующем JSON отсортированы в алфавитном порядке.
+    # Сериализация питон словаря в json объект
+    return f'{url}_{json.dumps(params, sort_keys=True) if params else ''}'
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """Закэшированный ответ вместе с валидаторами для условного GET"""
+    content: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    stored_at: float = field(default_factory=time.time)
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def refreshed(self) -> 'CachedResponse':
+        """Копия с обновленным временем - сервер ответил 304, содержимое не изменилось"""
+        return replace(self, stored_at=time.time())
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[CachedResponse]: ...
+
+    def set(self, key: str, entry: CachedResponse) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class CachePolicy:
+    """
+    Время жизни записей по шаблонам URL.
+    rules - пары (регулярное выражение, ttl в секундах), побеждает первое совпадение.
+    Устаревшая запись не удаляется: по ее ETag/Last-Modified делается условный запрос
+    """
+
+    def __init__(self, rules: Sequence[Tuple[str, float]] = (), default_ttl: float = 3600.0):
+        self.rules = [(re.compile(pattern), ttl) for pattern, ttl in rules]
+        self.default_ttl = default_ttl
+
+    def ttl(self, url: str) -> float:
+        for pattern, ttl in self.rules:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def is_fresh(self, url: str, entry: CachedResponse) -> bool:
+        return time.time() - entry.stored_at < self.ttl(url)
+
+
+DEFAULT_CACHE_POLICY = CachePolicy(
+    rules=[
+        (r'/(promo-)?product/', 24 * 3600.0),  # Карточки товаров меняются редко
+        (r'/catalog', 3600.0),  # Каталог и листинги категорий
+        (r'/sitemap[^/]*\.xml', 6 * 3600.0),  # Карты сайта обновляются раз в сутки
+    ],
+    default_ttl=3600.0,
+)
+
+
+class MemoryCache(CacheBackend):
+    """LRU кэш в памяти, ограниченный по суммарному размеру ответов в байтах"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry_size(entry: CachedResponse) -> int:
+        return sys.getsizeof(entry.content)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CachedResponse) -> None:
+        size = self._entry_size(entry)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= self._entry_size(old)
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= self._entry_size(evicted)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= self._entry_size(entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+
+class SqliteCache(CacheBackend):
+    """
+    Кэш на диске в SQLite: ответы хранятся сжатыми zlib и переживают перезапуск.
+    Когда сжатый объем превышает max_bytes, удаляются давно не читанные записи
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            content BLOB NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            stored_at REAL NOT NULL,
+            accessed_at REAL NOT NULL,
+            size INTEGER NOT NULL
+        )
+    """
+
+    def __init__(self, path: str, max_bytes: int = 2 * 1024 * 1024 * 1024, compression_level: int = 6):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(self._SCHEMA)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+        self._size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT content, etag, last_modified, stored_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (time.time(), key))
+        content, etag, last_modified, stored_at = row
+        return CachedResponse(zlib.decompress(content).decode('utf-8'), etag, last_modified, stored_at)
+
+    def set(self, key: str, entry: CachedResponse) -> None:
+        blob = zlib.compress(entry.content.encode('utf-8'), self.compression_level)
+        with self._lock:
+            old = self._conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, blob, entry.etag, entry.last_modified, entry.stored_at, time.time(), len(blob)),
+            )
+            self._size += len(blob) - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Освобождаем с запасом, чтобы не чистить на каждой записи
+        target = int(self.max_bytes * 0.9)
+        evicted = []
+        for key, size in self._conn.execute('SELECT key, size FROM responses ORDER BY accessed_at'):
+            if self._size <= target:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            old = self._conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            if old:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._size -= old[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._size = 0
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
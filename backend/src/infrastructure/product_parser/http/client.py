@@ -1,16 +1,24 @@
-import json
-import random
 import time
-from typing import Protocol, Optional, Dict, Any
-
-import requests
+from contextlib import ExitStack, contextmanager
+from typing import Protocol, Optional, Dict, Any, Iterator, Tuple
 
+from .cache import CacheBackend, CachePolicy, CachedResponse, MemoryCache, DEFAULT_CACHE_POLICY, make_cache_key
+from .rate_limiter import RateLimiter, THROTTLE_STATUSES, is_blocked_page, parse_retry_after
+from .retry import NO_RETRY_POLICY, FetchResult, RetryEngine, classify_error, classify_status
 from .session_config import session
+from .transport import SyncTransport, RequestsTransport, TransportError
+from ..metrics import CrawlMetrics
 
 
 class HttpClient(Protocol):
     def get(self, url: str, params: Optional[Dict] = None) -> Optional[str]: ...
 
+    def fetch(self, url: str, params: Optional[Dict] = None) -> FetchResult: ...
+
+    def cached_response(self, url: str, params: Optional[Dict] = None) -> Optional[CachedResponse]:
+        """Запись кэша для url вместе с ETag/Last-Modified"""
+        return self.cache.get(make_cache_key(url, params))
+
     def clear_cache(self, content: str) -> Any: ...
 
 
@@ -19,35 +27,185 @@ class RequestHttpClient(HttpClient):
     Http клиент на основе requests, библиотеки для работы с HTTP-запросами в Python.
     Она обеспечивает интерфейс для выполнения операций с REST API, загрузки данных с веб-страниц,
     а также отправки файлов и авторизации.
+
+    Ответы хранятся в cache (по умолчанию MemoryCache). Свежие по cache_policy записи
+    отдаются без запроса, для устаревших делается условный GET с ETag/Last-Modified.
+    В metrics записываются задержки, объем ответов, попадания в кэш и капчи.
+    transport - через что идут запросы (по умолчанию общая сессия requests, см. create_transport).
+    retry - повторы при таймаутах, обрывах, 5xx, 429 и капче и предохранители хостов
+    (по умолчанию одна попытка без повторов).
     """
 
-    def __init__(self):
-        self.session = session
-        self._cache: Dict[str, str] = {}
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[CacheBackend] = None,
+                 cache_policy: CachePolicy = DEFAULT_CACHE_POLICY,
+                 metrics: Optional[CrawlMetrics] = None,
+                 transport: Optional[SyncTransport] = None,
+                 retry: Optional[RetryEngine] = None):
+        self.transport = transport if transport is not None else RequestsTransport(session=session)
+        self.rate_limiter = rate_limiter
+        self.cache = cache if cache is not None else MemoryCache()
+        self.cache_policy = cache_policy
+        self.metrics = metrics
+        self.retry = retry if retry is not None else RetryEngine(NO_RETRY_POLICY, metrics)
 
     def get(self, url: str, params: Optional[Dict] = None) -> Optional[str]:
-        cache_key = f'{url}_{json.dumps(params, sort_keys=True) if params else ''}'
-        # Параметр sort_keys задаёт, будут ли ключи в результирующем JSON отсортированы в алфавитном порядке.
-        # Сериализация питон словаря в json объект
-        if cache_key in self._cache:
-            return self._cache[cache_key]
+        """Текст ответа (в том числе капчи) или None; вид ошибки и число попыток отдает fetch"""
+        return self.fetch(url, params).content
+
+    def fetch(self, url: str, params: Optional[Dict] = None) -> FetchResult:
+        """Загрузка с повторами по retry; ошибки возвращаются в FetchResult, а не исключением"""
+        cache_key = make_cache_key(url, params)
+        cached = self.cache.get(cache_key)
+        if cached is not None and self.cache_policy.is_fresh(url, cached):
+            if self.metrics:
+                self.metrics.cache_hit(url)
+            return FetchResult(url, cached.content, attempts=0)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            rejected = self.retry.allow(url, attempt)
+            if rejected is not None:
+                return rejected
+            result = self._attempt(url, params, cache_key, cached, attempt)
+            delay = self.retry.backoff(result)
+            if delay is None:
+                return result
+            time.sleep(delay)
 
+    def _attempt(self, url: str, params: Optional[Dict], cache_key: str, cached: Optional[CachedResponse],
+                 attempt: int) -> FetchResult:
+        # Лимит расходуется только на реальные запросы, попадания в кэш бесплатны
+        wait_started = time.perf_counter()
+        if self.rate_limiter:
+            self.rate_limiter.acquire(url)
+        waited = time.perf_counter() - wait_started
+
+        status = None
+        retry_after = None
+        blocked = False
+        size = 0
+        started = time.perf_counter()
         try:
-            response = self.session.get(url=url, params=params, timeout=(5, 10))
-            response.raise_for_status()
+            response = self.transport.get(url, params=params,
+                                          headers=cached.conditional_headers() if cached else None)
+            status = response.status
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+            if status == 304 and cached is not None:
+                self.cache.set(cache_key, cached.refreshed())
+                return FetchResult(url, cached.content, status, attempts=attempt)
+
+            if status >= 400:
+                return FetchResult(url, status=status, failure=classify_status(status), attempts=attempt)
+            size = len(response.body)
             content = response.text
-            self._cache[cache_key] = content
-            return content
-        except requests.RequestException as e:
-            # logger.error(f"HTTP error: {e}")
-            return None
+            blocked = is_blocked_page(content)
+            if not blocked:  # Капчу не кэшируем, иначе повторный запрос ее же и вернет
+                self.cache.set(cache_key, CachedResponse(content,
+                                                         etag=response.headers.get('ETag'),
+                                                         last_modified=response.headers.get('Last-Modified')))
+            return FetchResult(url, content, status, failure=classify_status(status, blocked), attempts=attempt)
+        except TransportError as e:
+            return FetchResult(url, failure=classify_error(e), error=str(e), attempts=attempt)
+        finally:
+            if self.rate_limiter:
+                self.rate_limiter.feedback(url, status, blocked=blocked, retry_after=retry_after)
+            if self.metrics:
+                self._record(url, time.perf_counter() - started, status, size, blocked, waited)
+
+    def _record(self, url: str, seconds: float, status: Optional[int], size: int, blocked: bool,
+                waited: float) -> None:
+        self.metrics.observe_request(url, seconds, status, size, waited)
+        if blocked:
+            self.metrics.event('captcha', url)
+        if status in THROTTLE_STATUSES:
+            self.metrics.event('throttled', url)
+
+    @contextmanager
+    def stream(self, url: str, params: Optional[Dict] = None) -> Iterator[Tuple[FetchResult, Iterator[bytes]]]:
+        """
+        Потоковая загрузка большого документа (sitemap.xml): тело отдается распакованными блоками
+        по мере чтения и целиком в памяти не собирается, поэтому в кэш не попадает.
+        Повторы по retry - только пока тело не начали читать; обрыв посреди чтения - TransportError.
+        Неудачный ответ приходит с пустым итератором блоков
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            rejected = self.retry.allow(url, attempt)
+            if rejected is not None:
+                yield rejected, iter(())
+                return
+
+            with ExitStack() as stack:
+                result, chunks = self._open_stream(stack, url, params, attempt)
+                if result.ok:
+                    self.retry.backoff(result)  # Хост ответил: сбрасывает счетчик ошибок предохранителя
+                    yield result, chunks
+                    return
+            delay = self.retry.backoff(result)
+            if delay is None:
+                yield result, iter(())
+                return
+            time.sleep(delay)
+
+    def _open_stream(self, stack: ExitStack, url: str, params: Optional[Dict],
+                     attempt: int) -> Tuple[FetchResult, Iterator[bytes]]:
+        wait_started = time.perf_counter()
+        if self.rate_limiter:
+            self.rate_limiter.acquire(url)
+        waited = time.perf_counter() - wait_started
+
+        status = None
+        retry_after = None
+        started = time.perf_counter()
+        try:
+            response = stack.enter_context(self.transport.stream(url, params=params))
+            status = response.status
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            result = FetchResult(url, status=status, failure=classify_status(status), attempts=attempt)
+        except TransportError as e:
+            result = FetchResult(url, failure=classify_error(e), error=str(e), attempts=attempt)
+        if self.rate_limiter:
+            self.rate_limiter.feedback(url, status, retry_after=retry_after)
+        if not result.ok:
+            if self.metrics:
+                self._record(url, time.perf_counter() - started, status, 0, False, waited)
+            return result, iter(())
+
+        size = 0
+
+        def counted() -> Iterator[bytes]:
+            nonlocal size
+            for chunk in response.chunks:
+                size += len(chunk)
+                yield chunk
+
+        if self.metrics:
+            # Запрос учитывается, когда тело дочитано или чтение брошено
+            stack.callback(lambda: self._record(url, time.perf_counter() - started, status, size, False, waited))
+        return result, counted()
 
     def clear_cache(self, content: Optional[str] = None):
-        self._cache.clear()
+        self.cache.clear()
+
+    def close(self) -> None:
+        self.transport.close()
 
 
 class PoliteHttpClient(RequestHttpClient):
-    def get(self, url: str, params=None):
-        # Случайная пауза между 1 и 3 секундами
-        time.sleep(random.uniform(1.0, 3.0))
-        return super().get(url, params)
+    """
+    Клиент, который не превышает лимит запросов к хосту и сам замедляется,
+    когда сайт отвечает 429/503 или капчей (см. RateLimiter)
+    """
+
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[CacheBackend] = None,
+                 cache_policy: CachePolicy = DEFAULT_CACHE_POLICY,
+                 metrics: Optional[CrawlMetrics] = None,
+                 transport: Optional[SyncTransport] = None,
+                 retry: Optional[RetryEngine] = None):
+        super().__init__(rate_limiter=rate_limiter or RateLimiter(), cache=cache, cache_policy=cache_policy,
+                         metrics=metrics, transport=transport, retry=retry)
@@ -0,0 +1,144 @@
+import asyncio
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+# Признаки страницы-заглушки: капча или защита Cloudflare
+_BLOCK_MARKERS = re.compile(r'captcha|cloudflare', re.IGNORECASE)
+# Заглушки короткие, полноценные страницы каталога весят сотни килобайт
+_BLOCK_PAGE_MAX_LENGTH = 50_000
+
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+def has_block_markers(content: Optional[str]) -> bool:
+    """Есть ли в ответе упоминание капчи или Cloudflare, без учета размера страницы"""
+    return bool(content) and _BLOCK_MARKERS.search(content) is not None
+
+
+def is_blocked_page(content: Optional[str]) -> bool:
+    """Похож ли ответ на капчу или заглушку защиты от ботов"""
+    if not content or len(content) > _BLOCK_PAGE_MAX_LENGTH:
+        return False
+    return has_block_markers(content)
+
+
+class TokenBucket:
+    """
+    Корзина токенов: пополняется со скоростью rate токенов в секунду
+    и накапливает не больше burst токенов.
+    Токены можно занимать вперед - тогда reserve вернет время ожидания
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Забирает токен и возвращает, сколько секунд нужно подождать перед запросом"""
+        self._refill(time.monotonic())
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Откладывает следующий запрос минимум на seconds секунд"""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def set_rate(self, rate: float) -> None:
+        self._refill(time.monotonic())
+        self.rate = rate
+
+
+class RateLimiter:
+    """
+    Общий для sync и async клиентов ограничитель частоты запросов по хостам.
+
+    Для каждого хоста своя корзина токенов (rate запросов в секунду, пачка до burst).
+    При 429/503 или капче скорость хоста умножается на backoff_factor (но не ниже min_rate),
+    после каждого успешного ответа возвращается к исходной на recovery_step * rate.
+    host_limits переопределяет (rate, burst) для отдельных хостов
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 3,
+                 min_rate: float = 0.05,
+                 backoff_factor: float = 0.5,
+                 recovery_step: float = 0.05,
+                 host_limits: Optional[Dict[str, Tuple[float, int]]] = None):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.backoff_factor = backoff_factor
+        self.recovery_step = recovery_step
+        self.host_limits = host_limits or {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlsplit(url).netloc
+
+    def _target_rate(self, host: str) -> float:
+        return self.host_limits.get(host, (self.rate, self.burst))[0]
+
+    def _bucket(self, host: str) -> TokenBucket:
+        if host not in self._buckets:
+            rate, burst = self.host_limits.get(host, (self.rate, self.burst))
+            self._buckets[host] = TokenBucket(rate, burst)
+        return self._buckets[host]
+
+    def _reserve(self, url: str) -> float:
+        with self._lock:
+            return self._bucket(self._host(url)).reserve()
+
+    def acquire(self, url: str) -> None:
+        """Блокирует поток, пока для хоста не появится свободный токен"""
+        wait = self._reserve(url)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, url: str) -> None:
+        wait = self._reserve(url)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def feedback(self, url: str, status: Optional[int],
+                 blocked: bool = False,
+                 retry_after: Optional[float] = None) -> None:
+        """
+        Подстраивает скорость хоста по результату запроса.
+        blocked - ответ оказался капчей (см. is_blocked_page)
+        """
+        host = self._host(url)
+        with self._lock:
+            bucket = self._bucket(host)
+            if status in THROTTLE_STATUSES or blocked:
+                bucket.set_rate(max(self.min_rate, bucket.rate * self.backoff_factor))
+                bucket.pause(retry_after if retry_after is not None else 1 / bucket.rate)
+            elif status is not None and status < 400:
+                target = self._target_rate(host)
+                if bucket.rate < target:
+                    bucket.set_rate(min(target, bucket.rate + target * self.recovery_step))
+
+    def current_rate(self, url: str) -> float:
+        with self._lock:
+            return self._bucket(self._host(url)).rate
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After в секундах; формат с датой не поддерживаем"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
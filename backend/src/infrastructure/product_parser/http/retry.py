@@ -0,0 +1,238 @@
+import enum
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Optional
+from urllib.parse import urlsplit
+
+from .transport import TransportError
+from ..metrics import CrawlMetrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class FailureKind(enum.Enum):
+    TIMEOUT = 'timeout'
+    CONNECTION = 'connection'  # Сброс или отказ соединения, ошибка DNS
+    SERVER_ERROR = 'server_error'  # 5xx, кроме 503
+    THROTTLED = 'throttled'  # 429 и 503
+    BLOCKED = 'blocked'  # Капча или заглушка защиты от ботов
+    CLIENT_ERROR = 'client_error'  # Остальные 4xx: повтор не поможет
+    TOO_LARGE = 'too_large'  # Ответ больше TransportConfig.max_body_size
+    CIRCUIT_OPEN = 'circuit_open'  # Хост отключен предохранителем, запрос не отправлялся
+
+
+RETRYABLE = frozenset({FailureKind.TIMEOUT, FailureKind.CONNECTION, FailureKind.SERVER_ERROR,
+                       FailureKind.THROTTLED, FailureKind.BLOCKED})
+
+
+def classify_error(error: TransportError) -> FailureKind:
+    if error.too_large:
+        return FailureKind.TOO_LARGE
+    return FailureKind.TIMEOUT if error.timeout else FailureKind.CONNECTION
+
+
+def classify_status(status: int, blocked: bool = False) -> Optional[FailureKind]:
+    """Вид ошибки по коду ответа; None - ответ пригоден"""
+    if status in (429, 503):
+        return FailureKind.THROTTLED
+    if status >= 500:
+        return FailureKind.SERVER_ERROR
+    if status >= 400:
+        return FailureKind.CLIENT_ERROR
+    if blocked:
+        return FailureKind.BLOCKED
+    return None
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    """
+    Итог загрузки страницы вместе со всеми повторами.
+    content есть у успешного ответа и у капчи (BLOCKED), чтобы ее можно было сохранить для разбора
+    """
+    url: str
+    content: Optional[str] = None
+    status: Optional[int] = None
+    failure: Optional[FailureKind] = None
+    error: Optional[str] = None
+    attempts: int = 1
+
+    @property
+    def ok(self) -> bool:
+        return self.failure is None
+
+    def describe(self) -> str:
+        if self.ok:
+            return f'OK ({self.status})'
+        detail = self.error or (f'HTTP {self.status}' if self.status is not None else '')
+        return f'{self.failure.value}: {detail}, попыток {self.attempts}' if detail else \
+            f'{self.failure.value}, попыток {self.attempts}'
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    max_attempts - попыток на один запрос вместе с первой.
+    Пауза перед повтором n - случайная в [0, min(max_delay, base_delay * 2 ** (n - 1))]
+    ("full jitter": одновременно упавшие запросы не повторяются одной волной).
+    Retry-After и замедление хоста после 429/503 дополнительно учитывает RateLimiter.
+    budget_ratio и min_budget - сколько повторов допускается за запуск:
+    min_budget + budget_ratio * число первых попыток, чтобы при массовых сбоях
+    повторы не умножали нагрузку на сайт.
+    После breaker_threshold ошибок подряд хост отключается на breaker_cooldown секунд,
+    затем пропускается один пробный запрос
+    """
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    retry_on: FrozenSet[FailureKind] = RETRYABLE
+    budget_ratio: float = 0.2
+    min_budget: int = 20
+    breaker_threshold: int = 8
+    breaker_cooldown: float = 60.0
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+# Одна попытка без повторов и без предохранителя - прежнее поведение клиентов
+NO_RETRY_POLICY = RetryPolicy(max_attempts=1, breaker_threshold=0)
+
+
+class RetryBudget:
+    """Ограничение числа повторов за запуск пропорционально числу запросов"""
+
+    def __init__(self, ratio: float, minimum: int):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.requests = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.retries >= self.minimum + self.ratio * self.requests:
+                return False
+            self.retries += 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    Предохранитель по хостам: closed -> (threshold ошибок подряд) -> open -> (cooldown) -> half-open.
+    В half-open проходит один пробный запрос: успех закрывает предохранитель, ошибка снова открывает
+    """
+
+    def __init__(self, threshold: int, cooldown: float, clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._probing: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, host: str) -> bool:
+        if self.threshold <= 0:
+            return True
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return True
+            if self._clock() - opened_at < self.cooldown or self._probing.get(host):
+                return False
+            self._probing[host] = True
+            return True
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._probing.pop(host, None)
+
+    def record_failure(self, host: str) -> bool:
+        """Учитывает ошибку; True - предохранитель хоста только что открылся"""
+        if self.threshold <= 0:
+            return False
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if self._probing.pop(host, None) or (host not in self._opened_at and failures >= self.threshold):
+                self._opened_at[host] = self._clock()
+                return True
+            return False
+
+    def state(self, host: str) -> str:
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return 'closed'
+            return 'open' if self._clock() - opened_at < self.cooldown else 'half-open'
+
+
+class RetryEngine:
+    """
+    Решения о повторах, общие для синхронного и асинхронного клиентов:
+    бюджет повторов и предохранители хостов у них общие, как и RateLimiter.
+    Сам цикл повторов и ожидание - в клиентах (time.sleep или asyncio.sleep)
+    """
+
+    def __init__(self, policy: RetryPolicy = DEFAULT_RETRY_POLICY, metrics: Optional[CrawlMetrics] = None,
+                 rng: Optional[random.Random] = None, clock: Callable[[], float] = time.monotonic):
+        self.policy = policy
+        self.metrics = metrics
+        self.budget = RetryBudget(policy.budget_ratio, policy.min_budget)
+        self.breaker = CircuitBreaker(policy.breaker_threshold, policy.breaker_cooldown, clock)
+        self._random = rng or random.Random()
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlsplit(url).netloc
+
+    def allow(self, url: str, attempt: int) -> Optional[FetchResult]:
+        """Перед попыткой: None - можно отправлять, иначе готовый отказ (хост отключен)"""
+        if not self.breaker.allow(self._host(url)):
+            self._event('circuit_rejected', url)
+            return FetchResult(url, failure=FailureKind.CIRCUIT_OPEN, error='хост временно отключен',
+                               attempts=attempt - 1)
+        if attempt == 1:
+            self.budget.record_request()
+        return None
+
+    def backoff(self, result: FetchResult) -> Optional[float]:
+        """
+        После попытки: учитывает результат в предохранителе и возвращает паузу
+        перед следующей попыткой или None, если повторять не нужно
+        """
+        host = self._host(result.url)
+        if result.ok or result.failure not in RETRYABLE:
+            # Ответ получен (пусть и 404) - хост жив
+            self.breaker.record_success(host)
+            return None
+
+        if self.breaker.record_failure(host):
+            self._event('circuit_open', result.url)
+            logger.warning("Хост %s отключен на %.0f с после ошибок подряд: %s",
+                           host, self.policy.breaker_cooldown, result.describe())
+        if result.failure not in self.policy.retry_on or result.attempts >= self.policy.max_attempts:
+            return None
+        if self.breaker.state(host) != 'closed':
+            return None
+        if not self.budget.try_spend():
+            self._event('retry_budget_exhausted', result.url)
+            return None
+
+        self._event('retry', result.url)
+        ceiling = min(self.policy.max_delay, self.policy.base_delay * 2 ** (result.attempts - 1))
+        return self._random.uniform(0, ceiling)
+
+    def _event(self, name: str, url: str) -> None:
+        if self.metrics:
+            self.metrics.event(name, url)
+
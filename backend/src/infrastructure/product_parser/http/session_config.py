@@ -1,30 +1,78 @@
-from typing import Dict
+import importlib.util
+from dataclasses import dataclass
+from typing import Dict, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 
 
+def accept_encoding() -> str:
+    """
+    Сжатия, которые клиент умеет распаковать. br объявляется, только если установлен
+    brotli или brotlicffi: без них urllib3 и aiohttp не распакуют ответ
+    """
+    encodings = ['gzip', 'deflate']
+    if importlib.util.find_spec('brotli') or importlib.util.find_spec('brotlicffi'):
+        encodings.append('br')
+    return ', '.join(encodings)
+
+
+DEFAULT_HEADERS: Dict[str, str] = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Accept-Encoding': accept_encoding(),
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Cache-Control': 'max-age=0',
+    'Referer': 'https://magnit.ru/',
+
+}
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """
+    Настройки соединений, общие для sync и async клиентов.
+    Соединения держатся открытыми (keep-alive) и переиспользуются, поэтому TLS рукопожатие
+    и DNS запрос делаются один раз на соединение, а не на каждый запрос
+    """
+    pool_connections: int = 10  # Сколько хостов держат свой пул соединений (requests)
+    pool_maxsize: int = 10  # Соединений к одному хосту
+    max_connections: int = 100  # Соединений всего (aiohttp, httpx)
+    keepalive_timeout: float = 30.0  # Сколько простаивающее соединение остается открытым
+    dns_cache_ttl: int = 300  # Время жизни кэша DNS, секунды (aiohttp)
+    connect_timeout: float = 5.0
+    read_timeout: float = 10.0
+    max_body_size: int = 20 * 1024 * 1024  # Ответ больше этого размера обрывается при чтении
+    chunk_size: int = 64 * 1024  # Размер блока при потоковом чтении и распаковке ответа
+    http2: bool = False  # HTTP/2 через httpx, если установлены httpx и h2
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return self.connect_timeout, self.read_timeout
+
+
+DEFAULT_TRANSPORT_CONFIG = TransportConfig()
+
+
 class Session:
-    def __init__(self):
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Cache-Control': 'max-age=0',
-            'Referer': 'https://magnit.ru/',
-
-        }
+    def __init__(self, config: TransportConfig = DEFAULT_TRANSPORT_CONFIG):
+        self.headers = dict(DEFAULT_HEADERS)
         self.session = requests.Session()
         self.session.headers.update(self.headers)
 
+        # По умолчанию пул на хост - 10 соединений, лишние закрываются после запроса
+        adapter = HTTPAdapter(pool_connections=config.pool_connections, pool_maxsize=config.pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
     def headers_update(self, headers: Dict[str, str] | None) -> None:
         try:
             self.session.headers.update(headers)
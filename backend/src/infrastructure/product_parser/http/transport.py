@@ -0,0 +1,180 @@
+import importlib.util
+import logging
+from contextlib import contextmanager
+from typing import ContextManager, Iterable, Iterator, Mapping, NamedTuple, Optional, Dict, Protocol
+
+import requests
+
+from .session_config import DEFAULT_HEADERS, DEFAULT_TRANSPORT_CONFIG, Session, TransportConfig
+
+try:
+    import httpx
+except ImportError:  # httpx не установлен - HTTP/2 недоступен
+    httpx = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class HttpResponse(NamedTuple):
+    """Прочитанный и распакованный ответ, одинаковый для всех транспортов"""
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+    encoding: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding or 'utf-8', errors='replace')
+
+
+class StreamedResponse(NamedTuple):
+    """Ответ, тело которого читается блоками по мере разбора (распакованными, как в HttpResponse)"""
+    status: int
+    headers: Mapping[str, str]
+    chunks: Iterator[bytes]
+
+
+class TransportError(Exception):
+    """Ошибка соединения, таймаут или слишком большой ответ"""
+
+    def __init__(self, message: str, timeout: bool = False, too_large: bool = False):
+        super().__init__(message)
+        self.timeout = timeout
+        self.too_large = too_large
+
+
+class SyncTransport(Protocol):
+    def get(self, url: str, params: Optional[Dict] = None,
+            headers: Optional[Dict[str, str]] = None) -> HttpResponse: ...
+
+    def stream(self, url: str, params: Optional[Dict] = None,
+               headers: Optional[Dict[str, str]] = None) -> ContextManager[StreamedResponse]:
+        """
+        Ответ без чтения тела целиком; соединение занято, пока открыт контекст.
+        Ошибки при открытии и при чтении блоков - TransportError
+        """
+
+    def close(self) -> None: ...
+
+
+def http2_available() -> bool:
+    return httpx is not None and importlib.util.find_spec('h2') is not None
+
+
+def read_limited(chunks: Iterable[bytes], limit: int) -> bytes:
+    """Собирает распакованные блоки ответа, обрывая чтение, если ответ больше limit"""
+    body = bytearray()
+    for chunk in chunks:
+        body += chunk
+        if len(body) > limit:
+            raise TransportError(f'Ответ больше {limit} байт', too_large=True)
+    return bytes(body)
+
+
+class RequestsTransport:
+    """HTTP/1.1 через requests: пул keep-alive соединений на хост (см. TransportConfig)"""
+
+    def __init__(self, config: TransportConfig = DEFAULT_TRANSPORT_CONFIG,
+                 session: Optional[requests.Session] = None):
+        self.config = config
+        self.session = session if session is not None else Session(config).get_session()
+
+    def get(self, url: str, params: Optional[Dict] = None,
+            headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+        try:
+            # stream=True: тело распаковывается и читается блоками, а соединение
+            # возвращается в пул только после чтения, поэтому ответ закрывается явно
+            response = self.session.get(url=url, params=params, headers=headers,
+                                        timeout=self.config.timeout, stream=True)
+            try:
+                body = read_limited(response.iter_content(self.config.chunk_size), self.config.max_body_size)
+            finally:
+                response.close()
+        except requests.RequestException as e:
+            raise TransportError(str(e), timeout=isinstance(e, requests.Timeout)) from e
+        return HttpResponse(response.status_code, response.headers, body, response.encoding)
+
+    @contextmanager
+    def stream(self, url: str, params: Optional[Dict] = None,
+               headers: Optional[Dict[str, str]] = None) -> Iterator[StreamedResponse]:
+        try:
+            response = self.session.get(url=url, params=params, headers=headers,
+                                        timeout=self.config.timeout, stream=True)
+        except requests.RequestException as e:
+            raise TransportError(str(e), timeout=isinstance(e, requests.Timeout)) from e
+        try:
+            yield StreamedResponse(response.status_code, response.headers,
+                                   self._guarded(response.iter_content(self.config.chunk_size)))
+        finally:
+            response.close()
+
+    @staticmethod
+    def _guarded(chunks: Iterable[bytes]) -> Iterator[bytes]:
+        try:
+            yield from chunks
+        except requests.RequestException as e:
+            raise TransportError(str(e), timeout=isinstance(e, requests.Timeout)) from e
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class HttpxTransport:
+    """HTTP/2 через httpx: запросы к хосту мультиплексируются в одном соединении"""
+
+    def __init__(self, config: TransportConfig = DEFAULT_TRANSPORT_CONFIG):
+        if not http2_available():
+            raise RuntimeError('Для HTTP/2 нужны httpx и h2')
+        self.config = config
+        self.client = httpx.Client(
+            http2=True,
+            headers=DEFAULT_HEADERS,
+            follow_redirects=True,
+            timeout=httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+            limits=httpx.Limits(max_connections=config.max_connections,
+                                max_keepalive_connections=config.pool_maxsize,
+                                keepalive_expiry=config.keepalive_timeout),
+        )
+
+    def get(self, url: str, params: Optional[Dict] = None,
+            headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+        try:
+            with self.client.stream('GET', url, params=params, headers=headers) as response:
+                body = read_limited(response.iter_bytes(self.config.chunk_size), self.config.max_body_size)
+        except httpx.HTTPError as e:
+            raise TransportError(str(e), timeout=isinstance(e, httpx.TimeoutException)) from e
+        return HttpResponse(response.status_code, response.headers, body, response.charset_encoding)
+
+    @contextmanager
+    def stream(self, url: str, params: Optional[Dict] = None,
+               headers: Optional[Dict[str, str]] = None) -> Iterator[StreamedResponse]:
+        try:
+            context = self.client.stream('GET', url, params=params, headers=headers)
+            response = context.__enter__()
+        except httpx.HTTPError as e:
+            raise TransportError(str(e), timeout=isinstance(e, httpx.TimeoutException)) from e
+        try:
+            yield StreamedResponse(response.status_code, response.headers,
+                                   self._guarded(response.iter_bytes(self.config.chunk_size)))
+        finally:
+            context.__exit__(None, None, None)
+
+    @staticmethod
+    def _guarded(chunks: Iterable[bytes]) -> Iterator[bytes]:
+        try:
+            yield from chunks
+        except httpx.HTTPError as e:
+            raise TransportError(str(e), timeout=isinstance(e, httpx.TimeoutException)) from e
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def create_transport(config: TransportConfig = DEFAULT_TRANSPORT_CONFIG) -> SyncTransport:
+    """Транспорт по настройкам: HTTP/2, если он запрошен и доступен, иначе requests"""
+    if config.http2:
+        if http2_available():
+            return HttpxTransport(config)
+        logger.warning("HTTP/2 недоступен (нужны httpx и h2), используется HTTP/1.1")
+    return RequestsTransport(config)
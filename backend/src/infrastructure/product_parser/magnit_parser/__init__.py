@@ -1,4 +1,6 @@
+from .category_scheduler import CategoryScheduler, ScheduleReport
 from .facade import MagnitParser
+from .store_scheduler import MultiStoreScheduler, StoreTarget
 
 
-__all__ = ['MagnitParser']
\ No newline at end of file
+__all__ = ['CategoryScheduler', 'MagnitParser', 'MultiStoreScheduler', 'ScheduleReport', 'StoreTarget']
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+Диагностические копии страниц обхода.
+
+capture() только кладет страницу в ограниченную очередь и никогда не ждет диск:
+сжатие и запись выполняет фоновый поток, а если он не успевает и очередь полна,
+страница отбрасывается (stats.dropped). Сохраняются страницы с ошибками
+(капча, пустая первая страница категории) и случайная выборка обычных страниц
+с долей sample_rate. Файлы сжимаются gzip; каталог ограничен по размеру
+и числу файлов - при превышении удаляются самые старые
+"""
+import gzip
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = '.html.gz'
+_UNSAFE = re.compile(r'[^\w.-]+')
+
+
+@dataclass(frozen=True)
+class ArtifactConfig:
+    directory: str = 'crawl_artifacts'
+    sample_rate: float = 0.0  # Доля обычных страниц, которые сохраняются для сравнения
+    capture_failures: bool = True
+    max_bytes: int = 50 * 1024 * 1024  # Предел размера каталога (сжатые файлы)
+    max_files: int = 500
+    max_page_chars: int = 2_000_000  # Более длинные страницы обрезаются
+    queue_size: int = 64
+
+
+DEFAULT_ARTIFACT_CONFIG = ArtifactConfig()
+
+
+@dataclass
+class ArtifactStats:
+    captured: int = 0
+    written: int = 0
+    dropped: int = 0  # Очередь была полна или запись не удалась
+    removed: int = 0  # Удалено при ротации
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class ArtifactWriter:
+    """Фоновая запись диагностических копий страниц; поток запускается при первой странице"""
+
+    def __init__(self, config: ArtifactConfig = DEFAULT_ARTIFACT_CONFIG, rng: Optional[random.Random] = None):
+        self.config = config
+        self.stats = ArtifactStats()
+        self._random = rng or random.Random()
+        self._queue: 'queue.Queue[Optional[Tuple[str, str, str]]]' = queue.Queue(maxsize=config.queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # captured и dropped меняют и вызывающие потоки, и фоновый; written и removed - только фоновый
+        self._stats_lock = threading.Lock()
+        self._files: Deque[Tuple[str, int]] = deque()  # (путь, размер) от старых к новым
+        self._total_bytes = 0
+
+    def sample(self, name: str, content: str) -> bool:
+        """Сохраняет обычную страницу с вероятностью sample_rate"""
+        if self.config.sample_rate <= 0 or self._random.random() >= self.config.sample_rate:
+            return False
+        return self.capture('sample', name, content)
+
+    def failure(self, reason: str, name: str, content: str) -> bool:
+        """Сохраняет страницу, на которой обход остановился (капча, пустая первая страница)"""
+        if not self.config.capture_failures:
+            return False
+        return self.capture(reason, name, content)
+
+    def capture(self, reason: str, name: str, content: str) -> bool:
+        if not content:
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((reason, name, content[:self.config.max_page_chars]))
+        except queue.Full:
+            self._count_dropped()
+            return False
+        with self._stats_lock:
+            self.stats.captured += 1
+        return True
+
+    def _count_dropped(self) -> None:
+        with self._stats_lock:
+            self.stats.dropped += 1
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='artifact-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        os.makedirs(self.config.directory, exist_ok=True)
+        self._scan()
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except OSError as e:
+                self._count_dropped()
+                logger.warning("Не удалось сохранить страницу для отладки: %s", e)
+            finally:
+                self._queue.task_done()
+
+    def _scan(self) -> None:
+        """Файлы, оставшиеся от прошлых запусков, тоже учитываются в пределах"""
+        entries = []
+        for entry in os.scandir(self.config.directory):
+            if entry.name.endswith(SUFFIX) and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        for _, path, size in sorted(entries):
+            self._files.append((path, size))
+            self._total_bytes += size
+        self._rotate()
+
+    def _write(self, reason: str, name: str, content: str) -> None:
+        safe_name = _UNSAFE.sub('_', name).strip('_')[:80] or 'page'
+        path = os.path.join(self.config.directory, f'{time.time_ns()}-{reason}-{safe_name}{SUFFIX}')
+        data = gzip.compress(content.encode('utf-8'), compresslevel=6)
+        with open(f'{path}.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(f'{path}.tmp', path)
+
+        self._files.append((path, len(data)))
+        self._total_bytes += len(data)
+        self.stats.written += 1
+        self._rotate()
+
+    def _rotate(self) -> None:
+        while self._files and (self._total_bytes > self.config.max_bytes or len(self._files) > self.config.max_files):
+            path, size = self._files.popleft()
+            self._total_bytes -= size
+            try:
+                os.remove(path)
+                self.stats.removed += 1
+            except FileNotFoundError:
+                pass
+
+    def flush(self) -> None:
+        """Ждет, пока фоновый поток запишет все принятые страницы"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if any(self.stats.as_dict().values()):
+            logger.info("Страницы для отладки (%s): %s", self.config.directory, self.stats.as_dict())
+
+
+def read_artifact(path: str) -> str:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple,
+                    TYPE_CHECKING)
+
+from .category_stats import CategoryRecord, CategoryStatsStore
+from .schemas import CatalogCategory, ProductRef
+from .store_scheduler import StoreTarget
+from ..progress import ProgressReporter
+
+if TYPE_CHECKING:
+    from .facade import MagnitParser
+
+
+logger = logging.getLogger(__name__)
+
+# Порядок обхода категорий: как в каталоге, сначала давно не обновленные, сначала самые "урожайные"
+CATEGORY_PRIORITIES = ('catalog', 'stale', 'yield')
+
+CategoryPage = Tuple[CatalogCategory, List[ProductRef]]
+
+
+class CrawlBudget:
+    """Общий на запуск лимит страниц категорий и времени; None - без ограничения"""
+
+    def __init__(self, max_pages: Optional[int] = None, max_seconds: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_pages = max_pages
+        self.max_seconds = max_seconds
+        self.pages = 0
+        self._clock = clock
+        self._started = clock()
+
+    @property
+    def exhausted(self) -> Optional[str]:
+        """Чем исчерпан бюджет: 'pages', 'time' или None"""
+        if self.max_pages is not None and self.pages >= self.max_pages:
+            return 'pages'
+        if self.max_seconds is not None and self._clock() - self._started >= self.max_seconds:
+            return 'time'
+        return None
+
+    def take_page(self) -> bool:
+        if self.exhausted:
+            return False
+        self.pages += 1
+        return True
+
+
+@dataclass
+class ScheduleReport:
+    """
+    Итог запуска CategoryScheduler. Если бюджет кончился, собранное все равно отдается,
+    а unfinished и skipped - что осталось: их можно передать следующему запуску
+    """
+    pages: int = 0
+    products: int = 0
+    completed: List[CatalogCategory] = field(default_factory=list)
+    unfinished: List[CatalogCategory] = field(default_factory=list)  # Начаты, но остановлены бюджетом
+    failed: List[CatalogCategory] = field(default_factory=list)  # Страница не загрузилась и после повторов
+    skipped: List[CatalogCategory] = field(default_factory=list)  # Не начаты
+    stopped_by: Optional[str] = None  # 'pages', 'time' или None - обойдено все
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.unfinished or self.skipped)
+
+
+@dataclass
+class _CategoryRun:
+    category: CatalogCategory
+    page: int = 0
+    products: int = 0
+
+
+class CategoryScheduler:
+    """
+    Обход категорий с общим на запуск бюджетом страниц (page_budget) и времени (time_budget).
+
+    Одновременно обходятся до max_parallel категорий, у каждой в работе не больше одной
+    страницы: медленная или длинная категория не задерживает остальные. Порядок задает
+    priority из CATEGORY_PRIORITIES по статистике прошлых запусков (stats): 'stale' -
+    сначала категории, которые дольше всех не обходились целиком, 'yield' - сначала те,
+    где больше товаров на страницу. Категории без статистики идут первыми.
+    Когда бюджет исчерпан, новые страницы не запрашиваются, уже найденные товары
+    отдаются, а итог с незавершенными категориями - в report
+    """
+
+    def __init__(self, parser: 'MagnitParser', max_parallel: int = 4, max_pages: int = 5,
+                 page_budget: Optional[int] = None, time_budget: Optional[float] = None,
+                 priority: str = 'stale', stats: Optional[CategoryStatsStore] = None,
+                 target: StoreTarget = StoreTarget(784507)):
+        if priority not in CATEGORY_PRIORITIES:
+            raise ValueError(f'Неизвестный порядок обхода категорий: {priority}')
+        if max_parallel < 1:
+            raise ValueError('max_parallel должен быть положительным')
+        self.parser = parser
+        self.max_parallel = max_parallel
+        self.max_pages = max_pages
+        self.page_budget = page_budget
+        self.time_budget = time_budget
+        self.priority = priority
+        self.stats = stats
+        self.target = StoreTarget(*target)
+        self.report = ScheduleReport()
+
+    def prioritize(self, categories: Sequence[CatalogCategory]) -> List[CatalogCategory]:
+        if self.priority == 'catalog' or self.stats is None:
+            return list(categories)
+        records = self.stats.load(self.target.shop_code, self.target.shop_type)
+
+        def stale(category: CatalogCategory) -> float:
+            record = records.get(category.url)
+            return record.crawled_at if record else float('-inf')
+
+        def productive(category: CatalogCategory) -> float:
+            record: Optional[CategoryRecord] = records.get(category.url)
+            return -record.products_per_page if record else float('-inf')
+
+        # sorted устойчив: при равенстве сохраняется порядок каталога
+        return sorted(categories, key=stale if self.priority == 'stale' else productive)
+
+    def iter_pages(self, categories: Optional[List[CatalogCategory]] = None) -> Iterator[CategoryPage]:
+        """Страницы категорий по мере загрузки: по одной странице каждой из max_parallel категорий за круг"""
+        waiting, budget, progress = self._start(categories)
+        active: Deque[_CategoryRun] = deque()
+        service = self.parser.category_service
+        try:
+            while waiting or active:
+                while waiting and len(active) < self.max_parallel:
+                    active.append(_CategoryRun(waiting.popleft()))
+                if not budget.take_page():
+                    break
+                run = active.popleft()
+                try:
+                    page_products = service.fetch_category_page(run.category, self.target.shop_code,
+                                                                self.target.shop_type, run.page, self.max_pages)
+                except Exception as e:
+                    logger.error("✗ Ошибка обработки '%s': %s", run.category.title, e)
+                    page_products = None
+                if self._advance(run, page_products, progress):
+                    active.append(run)
+                if page_products:
+                    yield run.category, self._for_store(page_products)
+        finally:
+            self._finish(active, waiting, budget, progress)
+
+    def iter_products(self, categories: Optional[List[CatalogCategory]] = None) -> Iterator[ProductRef]:
+        for _, page_products in self.iter_pages(categories):
+            yield from page_products
+
+    async def aiter_pages(self, categories: Optional[List[CatalogCategory]] = None) -> AsyncIterator[CategoryPage]:
+        """
+        Асинхронная версия iter_pages: страницы max_parallel категорий загружаются одновременно.
+        Асинхронный клиент парсера не закрывается: им распоряжается владелец парсера
+        """
+        if categories is None:
+            categories = await self.parser.catalog_service.afetch_categories(self.target.shop_code,
+                                                                             self.target.shop_type)
+        waiting, budget, progress = self._start(categories)
+        service = self.parser.category_service
+        running: Dict[asyncio.Task, _CategoryRun] = {}
+        stopped: List[_CategoryRun] = []
+
+        def start(run: _CategoryRun) -> None:
+            if not budget.take_page():
+                stopped.append(run)
+                return
+            running[asyncio.ensure_future(service.afetch_category_page(
+                run.category, self.target.shop_code, self.target.shop_type, run.page, self.max_pages))] = run
+
+        try:
+            while waiting and len(running) < self.max_parallel and not budget.exhausted:
+                start(_CategoryRun(waiting.popleft()))
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    run = running.pop(task)
+                    try:
+                        page_products = task.result()
+                    except Exception as e:
+                        logger.error("✗ Ошибка обработки '%s': %s", run.category.title, e)
+                        page_products = None
+                    if self._advance(run, page_products, progress):
+                        start(run)
+                    elif waiting and not budget.exhausted:
+                        start(_CategoryRun(waiting.popleft()))
+                    if page_products:
+                        yield run.category, self._for_store(page_products)
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            self._finish([*running.values(), *stopped], waiting, budget, progress)
+
+    async def aiter_products(self, categories: Optional[List[CatalogCategory]] = None
+                             ) -> AsyncIterator[ProductRef]:
+        async for _, page_products in self.aiter_pages(categories):
+            for product in page_products:
+                yield product
+
+    def _for_store(self, page_products: List[ProductRef]) -> List[ProductRef]:
+        """Ссылки на карточки в магазине target: с его ценами и ключами кэша и отпечатков"""
+        return [product.for_store(self.target.shop_code, self.target.shop_type) for product in page_products]
+
+    def _start(self, categories: Optional[List[CatalogCategory]]
+               ) -> Tuple[Deque[CatalogCategory], CrawlBudget, ProgressReporter]:
+        categories = self.prioritize(categories if categories is not None else self.parser.catalog_categories)
+        self.report = ScheduleReport()
+        progress = ProgressReporter('Категории', total=len(categories), log=logger)
+        return deque(categories), CrawlBudget(self.page_budget, self.time_budget), progress
+
+    def _advance(self, run: _CategoryRun, page_products: Optional[List[ProductRef]],
+                 progress: ProgressReporter) -> bool:
+        """Учитывает загруженную страницу; True - у категории есть следующая страница"""
+        if page_products is None:
+            self.report.failed.append(run.category)
+            self.parser.category_service.record_failure(run.category)
+            self._record(run, complete=False)
+            progress.advance(failed=1)
+            return False
+
+        if page_products:
+            run.page += 1
+            run.products += len(page_products)
+            self.report.products += len(page_products)
+            progress.count(pages=1, products=len(page_products))
+            if run.page < self.max_pages:
+                return True
+
+        self.report.completed.append(run.category)
+        self._record(run, complete=True)
+        progress.advance()
+        return False
+
+    def _record(self, run: _CategoryRun, complete: bool) -> None:
+        if self.stats is not None:
+            self.stats.record(run.category.url, self.target.shop_code, self.target.shop_type,
+                              run.page, run.products, complete)
+
+    def _finish(self, runs: Sequence[_CategoryRun], waiting: Deque[CatalogCategory], budget: CrawlBudget,
+                progress: ProgressReporter) -> None:
+        report = self.report
+        for run in runs:
+            if run.page:
+                report.unfinished.append(run.category)
+                self._record(run, complete=False)
+            else:
+                report.skipped.append(run.category)
+        report.skipped.extend(waiting)
+        report.pages = budget.pages
+        report.stopped_by = budget.exhausted if report.partial else None
+        progress.finish()
+        if report.partial:
+            logger.warning("Обход категорий остановлен (%s): завершено %d, прервано %d, не начато %d",
+                           report.stopped_by or 'остановлен потребителем', len(report.completed),
+                           len(report.unfinished), len(report.skipped))
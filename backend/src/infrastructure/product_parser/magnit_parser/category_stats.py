@@ -0,0 +1,79 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+
+class CategoryRecord(NamedTuple):
+    """Итог последнего обхода категории в магазине"""
+    pages: int
+    products: int
+    complete: bool  # Пагинация пройдена до конца (или до max_pages), а не прервана бюджетом или ошибкой
+    crawled_at: float  # Когда категория последний раз была обойдена полностью, 0 - ни разу
+    visited_at: float
+
+    @property
+    def products_per_page(self) -> float:
+        return self.products / self.pages if self.pages else 0.0
+
+
+class CategoryStatsStore:
+    """
+    Статистика обхода категорий между запусками (SQLite) для CategoryScheduler:
+    сколько товаров приносит страница категории и как давно категория обходилась целиком
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS categories (
+            category_url TEXT NOT NULL,
+            shop_code INTEGER NOT NULL,
+            shop_type INTEGER NOT NULL,
+            pages INTEGER NOT NULL,
+            products INTEGER NOT NULL,
+            complete INTEGER NOT NULL,
+            crawled_at REAL NOT NULL,
+            visited_at REAL NOT NULL,
+            PRIMARY KEY (category_url, shop_code, shop_type)
+        )
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(self._SCHEMA)
+
+    def load(self, shop_code: int, shop_type: int) -> Dict[str, CategoryRecord]:
+        """Записи магазина по url категории"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT category_url, pages, products, complete, crawled_at, visited_at FROM categories '
+                'WHERE shop_code = ? AND shop_type = ?',
+                (shop_code, shop_type),
+            ).fetchall()
+        return {url: CategoryRecord(pages, products, bool(complete), crawled_at, visited_at)
+                for url, pages, products, complete, crawled_at, visited_at in rows}
+
+    def record(self, category_url: str, shop_code: int, shop_type: int, pages: int, products: int,
+               complete: bool, at: Optional[float] = None) -> None:
+        """
+        Фиксирует обход категории. Прерванный обход не сдвигает crawled_at,
+        поэтому в следующем запуске категория остается в числе давно не обновленных
+        """
+        at = at if at is not None else time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO categories '
+                '(category_url, shop_code, shop_type, pages, products, complete, crawled_at, visited_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (category_url, shop_code, shop_type) DO UPDATE SET '
+                'pages = excluded.pages, products = excluded.products, complete = excluded.complete, '
+                'crawled_at = CASE WHEN excluded.complete THEN excluded.crawled_at ELSE crawled_at END, '
+                'visited_at = excluded.visited_at',
+                (category_url, shop_code, shop_type, pages, products, int(complete), at if complete else 0.0, at),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,128 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .schemas import ProductRef
+
+
+logger = logging.getLogger(__name__)
+
+# Записи старше суток не восстанавливаются: цены и ассортимент в них уже устарели
+DEFAULT_MAX_AGE = 24 * 3600.0
+
+
+class CheckpointJournal:
+    """
+    Журнал прогресса обхода в SQLite: завершенные страницы категорий с найденными
+    товарами и загруженные карточки товаров.
+
+    Каждая запись фиксируется сразу, поэтому после падения (капча, сеть, OOM)
+    перезапущенный MagnitParser продолжает с того же места и не загружает
+    готовое заново. Успешно завершенный обход вызывает complete(), и журнал
+    очищается: следующий запуск обходит сайт заново, а продолжается только прерванный.
+    Записи старше max_age секунд (None - без ограничения) при открытии удаляются
+    """
+
+    _SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS category_pages (
+            category_url TEXT NOT NULL,
+            shop_code INTEGER NOT NULL,
+            shop_type INTEGER NOT NULL,
+            page INTEGER NOT NULL,
+            products TEXT NOT NULL,
+            is_last INTEGER NOT NULL DEFAULT 0,
+            recorded_at REAL NOT NULL,
+            PRIMARY KEY (category_url, shop_code, shop_type, page)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS products (
+            url TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            recorded_at REAL NOT NULL
+        )
+        """,
+    )
+
+    def __init__(self, path: str, max_age: Optional[float] = DEFAULT_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in self._SCHEMA:
+            self._conn.execute(statement)
+        if max_age is not None:
+            self.expire(time.time() - max_age)
+
+    def category_page(self, category_url: str, shop_code: int, shop_type: int,
+                      page: int) -> Optional[Tuple[List[ProductRef], bool]]:
+        """
+        Сохраненная страница категории: (товары, была ли она последней) или None,
+        если страница еще не обработана
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT products, is_last FROM category_pages '
+                'WHERE category_url = ? AND shop_code = ? AND shop_type = ? AND page = ?',
+                (category_url, shop_code, shop_type, page),
+            ).fetchone()
+        if row is None:
+            return None
+        products = [ProductRef(title, href) for title, href in json.loads(row[0])]
+        return products, bool(row[1])
+
+    def record_page(self, category_url: str, shop_code: int, shop_type: int, page: int,
+                    products: List[ProductRef], is_last: bool = False) -> None:
+        """Фиксирует обработанную страницу; is_last - на ней закончилась пагинация"""
+        payload = json.dumps([(product.title, product.href) for product in products], ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO category_pages VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (category_url, shop_code, shop_type, page, payload, int(is_last), time.time()),
+            )
+
+    def product_result(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute('SELECT result FROM products WHERE url = ?', (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record_product(self, url: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO products VALUES (?, ?, ?)',
+                (url, json.dumps(result, ensure_ascii=False), time.time()),
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pages = self._conn.execute('SELECT COUNT(*) FROM category_pages').fetchone()[0]
+            products = self._conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+        return {'category_pages': pages, 'products': products}
+
+    def expire(self, before: float) -> int:
+        """Удаляет записи, сделанные раньше before; возвращает их число"""
+        with self._lock:
+            removed = self._conn.execute('DELETE FROM category_pages WHERE recorded_at < ?', (before,)).rowcount
+            removed += self._conn.execute('DELETE FROM products WHERE recorded_at < ?', (before,)).rowcount
+        if removed:
+            logger.info("Из журнала удалено устаревших записей: %d", removed)
+        return removed
+
+    def reset(self) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM category_pages')
+            self._conn.execute('DELETE FROM products')
+
+    def complete(self) -> None:
+        """Обход завершен: продолжать нечего, следующий запуск начнет с нуля"""
+        self.reset()
+        logger.debug("Обход завершен, журнал %s очищен", self.path)
+
+    def close(self) -> None:
+        self._conn.close()
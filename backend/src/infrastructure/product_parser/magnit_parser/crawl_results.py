@@ -0,0 +1,27 @@
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator
+
+
+def write_results(results: Iterable[Dict[str, Any]], path: str) -> int:
+    """
+    Сохраняет результаты обхода в JSON Lines, по товару на строку.
+    Файл пишется рядом и подменяется целиком, поэтому читатели (API)
+    никогда не видят недописанный файл. Возвращает число записанных товаров
+    """
+    tmp_path = f'{path}.tmp'
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for details in results:
+            f.write(json.dumps(details, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def read_results(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
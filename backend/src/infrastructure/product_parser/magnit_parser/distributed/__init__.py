@@ -0,0 +1,7 @@
+from .task_queue import Task, TaskQueue, SqliteTaskQueue
+from .redis_queue import RedisTaskQueue
+from .coordinator import Coordinator, CATEGORY_PAGE, PRODUCT
+from .worker import Worker
+
+
+__all__ = ['Task', 'TaskQueue', 'SqliteTaskQueue', 'RedisTaskQueue', 'Coordinator', 'Worker', 'CATEGORY_PAGE', 'PRODUCT']
@@ -0,0 +1,77 @@
+"""
+Распределенный обход.
+
+Координатор (один):
+    python -m backend.src.infrastructure.product_parser.magnit_parser.distributed coordinator --queue crawl.db
+Воркеры (сколько угодно процессов на той же машине: файл очереди SQLite должен быть на локальном диске):
+    python -m backend.src.infrastructure.product_parser.magnit_parser.distributed worker --queue crawl.db
+
+Воркеры на нескольких машинах используют общую очередь в Redis:
+    python -m backend.src.infrastructure.product_parser.magnit_parser.distributed coordinator --redis redis://host:6379/0
+    python -m backend.src.infrastructure.product_parser.magnit_parser.distributed worker --redis redis://host:6379/0
+"""
+import argparse
+import logging
+
+from ..facade import MagnitParser
+from ..fill_bd import fill_database
+from ..store_scheduler import parse_store
+from .coordinator import Coordinator, DEFAULT_STORE
+from .redis_queue import RedisTaskQueue
+from .task_queue import SqliteTaskQueue
+from .worker import Worker
+
+
+logger = logging.getLogger(__name__)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('role', choices=['coordinator', 'worker'])
+    arg_parser.add_argument('--queue', default='crawl_queue.db', help='файл очереди SQLite')
+    arg_parser.add_argument('--redis', default=None, help='URL Redis: очередь для воркеров на нескольких машинах')
+    arg_parser.add_argument('--redis-prefix', default='crawl', help='префикс ключей очереди в Redis')
+    arg_parser.add_argument('--max-attempts', type=int, default=3)
+
+    coordinator = arg_parser.add_argument_group('координатор')
+    coordinator.add_argument('--store', type=parse_store, action='append',
+                             help='магазин shopCode[:shopType], можно указать несколько раз')
+    coordinator.add_argument('--categories', type=int, default=None, help='только первые N категорий')
+    coordinator.add_argument('--max-pages', type=int, default=5)
+    coordinator.add_argument('--db', default=None, help='по окончании записать товары в эту базу SQLite')
+
+    worker = arg_parser.add_argument_group('воркер')
+    worker.add_argument('--batch-size', type=int, default=4)
+    worker.add_argument('--lease-seconds', type=float, default=120.0)
+    worker.add_argument('--idle-timeout', type=float, default=30.0)
+    worker.add_argument('--rps', type=float, default=1.0, help='запросов в секунду на воркер')
+    return arg_parser
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    args = build_arg_parser().parse_args()
+    if args.redis:
+        queue = RedisTaskQueue(args.redis, prefix=args.redis_prefix, max_attempts=args.max_attempts)
+    else:
+        queue = SqliteTaskQueue(args.queue, max_attempts=args.max_attempts)
+
+    try:
+        if args.role == 'coordinator':
+            parser = MagnitParser()
+            categories = parser.catalog_categories[:args.categories]
+            coordinator = Coordinator(queue, max_pages=args.max_pages)
+            coordinator.seed(categories, args.store or [DEFAULT_STORE])
+            logger.info("Обход завершен: %s", coordinator.run())
+            if args.db:
+                logger.info("Записано в базу: %s", fill_database(coordinator.iter_results(), args.db))
+        else:
+            parser = MagnitParser(requests_per_second=args.rps)
+            worker = Worker(queue, parser, batch_size=args.batch_size, lease_seconds=args.lease_seconds)
+            worker.run(idle_timeout=args.idle_timeout)
+    finally:
+        queue.close()
+
+
+if __name__ == '__main__':
+    main()
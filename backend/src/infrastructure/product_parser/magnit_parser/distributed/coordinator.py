@@ -0,0 +1,88 @@
+import logging
+import time
+from typing import Any, Dict, Iterator, List, Sequence
+
+from ..schemas import CatalogCategory, ProductRef
+from ..store_scheduler import StoreTarget
+from .task_queue import TaskQueue
+
+
+logger = logging.getLogger(__name__)
+
+
+CATEGORY_PAGE = 'category_page'
+PRODUCT = 'product'
+
+DEFAULT_STORE = StoreTarget(784507, 1)
+
+
+def category_page_key(href: str, shop_code: int, shop_type: int, page: int) -> str:
+    return f'{href}?shopCode={shop_code}&shopType={shop_type}&page={page}'
+
+
+class Coordinator:
+    """
+    Ставит задачи распределенного обхода и следит за их выполнением.
+
+    Сначала в очередь попадают первые страницы категорий для каждого магазина.
+    Когда воркер сообщает товары страницы, координатор ставит следующую страницу
+    этой категории и карточки найденных товаров. Карточка ставится по URL с параметрами
+    магазина (ProductRef.for_store): цены у магазинов разные, поэтому товар загружается
+    один раз на магазин, даже если найден в нескольких категориях
+    """
+
+    def __init__(self, queue: TaskQueue, max_pages: int = 5):
+        self.queue = queue
+        self.max_pages = max_pages
+
+    def seed(self, categories: List[CatalogCategory],
+             targets: Sequence[StoreTarget] = (DEFAULT_STORE,)) -> int:
+        tasks = [
+            (category_page_key(category.href, target.shop_code, target.shop_type, 0),
+             {'title': category.title, 'href': category.href,
+              'shop_code': target.shop_code, 'shop_type': target.shop_type,
+              'page': 0, 'max_pages': self.max_pages})
+            for target in targets
+            for category in categories
+        ]
+        added = self.queue.put_many(CATEGORY_PAGE, tasks)
+        logger.info("В очередь поставлено страниц категорий: %s", added)
+        return added
+
+    def expand(self) -> int:
+        """Ставит задачи по завершенным страницам категорий; возвращает число новых задач"""
+        added = 0
+        for task, result in self.queue.collect(CATEGORY_PAGE):
+            products = result['products']
+            payload = task.payload
+
+            next_page = payload['page'] + 1
+            if products and next_page < self.max_pages:
+                added += self.queue.put_many(CATEGORY_PAGE, [(
+                    category_page_key(payload['href'], payload['shop_code'], payload['shop_type'], next_page),
+                    {**payload, 'page': next_page},
+                )])
+
+            added += self.queue.put_many(PRODUCT, (
+                (ProductRef(title, href).for_store(payload['shop_code'], payload['shop_type']).url,
+                 {'title': title, 'href': href, 'shop_code': payload['shop_code'], 'shop_type': payload['shop_type']})
+                for title, href in products
+            ))
+        return added
+
+    def run(self, poll_interval: float = 1.0) -> Dict[str, int]:
+        """Ждет, пока воркеры не выполнят все задачи, и ставит новые по мере обхода"""
+        while True:
+            added = self.expand()
+            counts = self.queue.counts()
+            logger.info("Очередь: %s", counts)
+            if not added and not counts['pending'] and not counts['leased']:
+                # Последняя страница могла завершиться между expand() и counts()
+                if not self.expand():
+                    return self.queue.counts()
+            time.sleep(poll_interval if not added else 0)
+
+    def iter_results(self) -> Iterator[Dict[str, Any]]:
+        """Результаты загрузки карточек в формате ProductService; магазин - в параметрах url"""
+        for _, details in self.queue.results(PRODUCT):
+            yield details
@@ -0,0 +1,199 @@
+import json
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .task_queue import DONE, FAILED, LEASED, PENDING, Task, TaskQueue
+
+try:
+    import redis
+except ImportError:  # redis не установлен - доступна только очередь SQLite
+    redis = None
+
+
+# Возврат просроченных аренд: общий пролог скриптов lease и counts.
+# Как и в SqliteTaskQueue, просроченная аренда считается попыткой
+_EXPIRE = """
+local p, now, max_attempts = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', p .. ':leased', '-inf', '(' .. ARGV[2])) do
+    local task = p .. ':task:' .. id
+    redis.call('ZREM', p .. ':leased', id)
+    redis.call('HDEL', task, 'owner')
+    redis.call('HSETNX', task, 'error', 'lease expired')
+    if tonumber(redis.call('HGET', task, 'attempts')) >= max_attempts then
+        redis.call('HSET', task, 'status', 'failed')
+        redis.call('ZADD', p .. ':failed', id, id)
+    else
+        redis.call('HSET', task, 'status', 'pending')
+        redis.call('ZADD', p .. ':pending', id, id)
+    end
+end
+"""
+
+_PUT = """
+local p, kind, added = ARGV[1], ARGV[2], 0
+for i = 3, #ARGV, 2 do
+    if redis.call('HSETNX', p .. ':keys', ARGV[i], 0) == 1 then
+        local id = redis.call('INCR', p .. ':seq')
+        redis.call('HSET', p .. ':keys', ARGV[i], id)
+        redis.call('HSET', p .. ':task:' .. id, 'kind', kind, 'key', ARGV[i], 'payload', ARGV[i + 1],
+                   'status', 'pending', 'attempts', 0)
+        redis.call('ZADD', p .. ':pending', id, id)
+        added = added + 1
+    end
+end
+return added
+"""
+
+_LEASE = _EXPIRE + """
+local worker, limit, expires = ARGV[4], tonumber(ARGV[5]), now + tonumber(ARGV[6])
+local tasks = {}
+for _, id in ipairs(redis.call('ZRANGE', p .. ':pending', 0, limit - 1)) do
+    local task = p .. ':task:' .. id
+    redis.call('ZREM', p .. ':pending', id)
+    local attempts = redis.call('HINCRBY', task, 'attempts', 1)
+    redis.call('HSET', task, 'status', 'leased', 'owner', worker)
+    redis.call('ZADD', p .. ':leased', expires, id)
+    local fields = redis.call('HMGET', task, 'kind', 'key', 'payload')
+    table.insert(tasks, {id, fields[1], fields[2], fields[3], attempts})
+end
+return tasks
+"""
+
+_COUNTS = _EXPIRE + """
+return {redis.call('ZCARD', p .. ':pending'), redis.call('ZCARD', p .. ':leased'),
+        redis.call('ZCARD', p .. ':done'), redis.call('ZCARD', p .. ':failed')}
+"""
+
+# Завершение аренды: только если задача все еще выдана этому воркеру
+_COMPLETE = """
+local p, id, worker = ARGV[1], ARGV[2], ARGV[3]
+local task = p .. ':task:' .. id
+local fields = redis.call('HMGET', task, 'status', 'owner', 'kind')
+if fields[1] ~= 'leased' or fields[2] ~= worker then
+    return 0
+end
+redis.call('ZREM', p .. ':leased', id)
+redis.call('HDEL', task, 'owner', 'error')
+redis.call('HSET', task, 'status', 'done', 'result', ARGV[4])
+redis.call('ZADD', p .. ':done', id, id)
+redis.call('ZADD', p .. ':done:' .. fields[3], id, id)
+redis.call('ZADD', p .. ':uncollected:' .. fields[3], id, id)
+return 1
+"""
+
+_FAIL = """
+local p, id, worker, status = ARGV[1], ARGV[2], ARGV[3], ARGV[4]
+local task = p .. ':task:' .. id
+local fields = redis.call('HMGET', task, 'status', 'owner')
+if fields[1] ~= 'leased' or fields[2] ~= worker then
+    return 0
+end
+redis.call('ZREM', p .. ':leased', id)
+redis.call('HDEL', task, 'owner')
+redis.call('HSET', task, 'status', status, 'error', ARGV[5])
+redis.call('ZADD', p .. ':' .. status, id, id)
+return 1
+"""
+
+_COLLECT = """
+local p, kind, limit = ARGV[1], ARGV[2], tonumber(ARGV[3])
+local rows = {}
+for _, id in ipairs(redis.call('ZRANGE', p .. ':uncollected:' .. kind, 0, limit - 1)) do
+    redis.call('ZREM', p .. ':uncollected:' .. kind, id)
+    local fields = redis.call('HMGET', p .. ':task:' .. id, 'key', 'payload', 'attempts', 'result')
+    table.insert(rows, {id, fields[1], fields[2], fields[3], fields[4]})
+end
+return rows
+"""
+
+
+class RedisTaskQueue(TaskQueue):
+    """
+    Очередь в Redis для воркеров на разных машинах. Каждая операция - Lua-скрипт,
+    который Redis выполняет атомарно, поэтому одну задачу не получат два воркера.
+    Семантика та же, что у SqliteTaskQueue: дедупликация по ключу, аренда на lease_seconds,
+    возврат просроченных аренд и проваленных задач до max_attempts попыток.
+
+    Сроки аренды считаются по часам воркера, поэтому часы машин нужно синхронизировать (NTP).
+    Все ключи очереди начинаются с prefix: разные обходы в одной базе Redis
+    должны использовать разные префиксы
+    """
+
+    def __init__(self, url: str = 'redis://localhost:6379/0', prefix: str = 'crawl', max_attempts: int = 3,
+                 client: Optional['redis.Redis'] = None):
+        if client is None:
+            if redis is None:
+                raise RuntimeError('Для очереди в Redis нужен пакет redis')
+            client = redis.Redis.from_url(url, decode_responses=True)
+            self._owns_client = True
+        else:
+            # Чужой клиент (должен быть создан с decode_responses=True) закрывает его владелец
+            self._owns_client = False
+        self.client = client
+        self.prefix = prefix
+        self.max_attempts = max_attempts
+        self._put = client.register_script(_PUT)
+        self._lease = client.register_script(_LEASE)
+        self._counts = client.register_script(_COUNTS)
+        self._complete = client.register_script(_COMPLETE)
+        self._fail = client.register_script(_FAIL)
+        self._collect = client.register_script(_COLLECT)
+
+    def put(self, kind: str, key: str, payload: Dict[str, Any]) -> bool:
+        return self.put_many(kind, [(key, payload)]) == 1
+
+    def put_many(self, kind: str, items: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """Ставит задачи в очередь; возвращает, сколько из них новые"""
+        args = [self.prefix, kind]
+        for key, payload in items:
+            args.extend((key, json.dumps(payload, ensure_ascii=False)))
+        return self._put(args=args)
+
+    def lease(self, worker_id: str, limit: int = 1, lease_seconds: float = 120.0) -> List[Task]:
+        rows = self._lease(args=[self.prefix, time.time(), self.max_attempts, worker_id, limit, lease_seconds])
+        return [Task(int(id), kind, key, json.loads(payload), int(attempts))
+                for id, kind, key, payload, attempts in rows]
+
+    def complete(self, task: Task, worker_id: str, result: Any) -> bool:
+        """
+        Сохраняет результат. False - аренда уже истекла и задача передана другому воркеру,
+        результат отброшен
+        """
+        return self._complete(args=[self.prefix, task.id, worker_id, json.dumps(result, ensure_ascii=False)]) == 1
+
+    def fail(self, task: Task, worker_id: str, error: str) -> bool:
+        """Возвращает задачу в очередь или помечает ее проваленной после max_attempts попыток"""
+        status = FAILED if task.attempts >= self.max_attempts else PENDING
+        return self._fail(args=[self.prefix, task.id, worker_id, status, error]) == 1
+
+    def collect(self, kind: str, limit: int = 1000) -> List[Tuple[Task, Any]]:
+        """Завершенные задачи, которые еще не забирали; каждая отдается один раз"""
+        rows = self._collect(args=[self.prefix, kind, limit])
+        return [(Task(int(id), kind, key, json.loads(payload), int(attempts)), json.loads(result))
+                for id, key, payload, attempts, result in rows]
+
+    def results(self, kind: str) -> Iterator[Tuple[str, Any]]:
+        """Все результаты задач вида kind: (ключ, результат)"""
+        for id, key, result in self._tasks(f'{self.prefix}:done:{kind}', 'key', 'result'):
+            yield key, json.loads(result)
+
+    def counts(self) -> Dict[str, int]:
+        counts = self._counts(args=[self.prefix, time.time(), self.max_attempts])
+        return dict(zip((PENDING, LEASED, DONE, FAILED), counts))
+
+    def failed(self, kinds: Optional[Sequence[str]] = None) -> List[Tuple[str, str]]:
+        """Проваленные задачи: (ключ, последняя ошибка)"""
+        rows = self._tasks(f'{self.prefix}:failed', 'kind', 'key', 'error')
+        return [(key, error) for id, kind, key, error in rows if kinds is None or kind in kinds]
+
+    def _tasks(self, index: str, *fields: str) -> List[Tuple[str, ...]]:
+        """Поля задач из индекса (sorted set идентификаторов) в порядке постановки"""
+        ids = self.client.zrange(index, 0, -1)
+        pipeline = self.client.pipeline(transaction=False)
+        for id in ids:
+            pipeline.hmget(f'{self.prefix}:task:{id}', *fields)
+        return [(id, *values) for id, values in zip(ids, pipeline.execute())]
+
+    def close(self) -> None:
+        if self._owns_client:
+            self.client.close()
@@ -0,0 +1,197 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol, Sequence, Tuple
+
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+@dataclass(frozen=True)
+class Task:
+    id: int
+    kind: str
+    key: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class TaskQueue(Protocol):
+    """
+    Очередь задач распределенного обхода. Задача идентифицируется ключом (обычно URL):
+    повторная постановка того же ключа игнорируется, поэтому один URL
+    не обрабатывается двумя воркерами. SqliteTaskQueue - для процессов на одной машине,
+    RedisTaskQueue - для воркеров на нескольких машинах
+    """
+
+    def put_many(self, kind: str, items: Iterable[Tuple[str, Dict[str, Any]]]) -> int: ...
+
+    def lease(self, worker_id: str, limit: int = 1, lease_seconds: float = 120.0) -> List[Task]: ...
+
+    def complete(self, task: Task, worker_id: str, result: Any) -> bool: ...
+
+    def fail(self, task: Task, worker_id: str, error: str) -> bool: ...
+
+    def collect(self, kind: str, limit: int = 1000) -> List[Tuple[Task, Any]]: ...
+
+    def counts(self) -> Dict[str, int]: ...
+
+
+class SqliteTaskQueue(TaskQueue):
+    """
+    Очередь в файле SQLite для процессов на одной машине. Каждый процесс открывает
+    свое соединение, выдача задач идет в транзакции BEGIN IMMEDIATE, поэтому одну задачу
+    не получат два воркера. Режим WAL использует разделяемую память, поэтому файл очереди
+    должен лежать на локальном диске: по NFS или SMB блокировки SQLite ненадежны.
+
+    Задача выдается в аренду на lease_seconds. Не подтвержденная вовремя аренда
+    (воркер упал или завис) и задача, завершившаяся ошибкой, возвращаются в очередь,
+    пока не исчерпано max_attempts попыток
+    """
+
+    _SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL UNIQUE,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires REAL,
+            result TEXT,
+            error TEXT,
+            collected INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL
+        )
+        """,
+        'CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, id)',
+        'CREATE INDEX IF NOT EXISTS tasks_collect ON tasks (kind, status, collected)',
+    )
+
+    def __init__(self, path: str, max_attempts: int = 3, timeout: float = 30.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in self._SCHEMA:
+            self._conn.execute(statement)
+
+    def put(self, kind: str, key: str, payload: Dict[str, Any]) -> bool:
+        return self.put_many(kind, [(key, payload)]) == 1
+
+    def put_many(self, kind: str, items: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """Ставит задачи в очередь; возвращает, сколько из них новые"""
+        now = time.time()
+        rows = [(kind, key, json.dumps(payload, ensure_ascii=False), now) for key, payload in items]
+        with self._lock, self._transaction():
+            before = self._conn.total_changes
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO tasks (kind, key, payload, updated_at) VALUES (?, ?, ?, ?)', rows
+            )
+            return self._conn.total_changes - before
+
+    def lease(self, worker_id: str, limit: int = 1, lease_seconds: float = 120.0) -> List[Task]:
+        now = time.time()
+        with self._lock, self._transaction():
+            self._expire_leases(now)
+            rows = self._conn.execute(
+                'SELECT id, kind, key, payload, attempts FROM tasks WHERE status = ? ORDER BY id LIMIT ?',
+                (PENDING, limit),
+            ).fetchall()
+            self._conn.executemany(
+                'UPDATE tasks SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?, '
+                'updated_at = ? WHERE id = ?',
+                [(LEASED, worker_id, now + lease_seconds, now, row[0]) for row in rows],
+            )
+        return [Task(id, kind, key, json.loads(payload), attempts + 1) for id, kind, key, payload, attempts in rows]
+
+    def _expire_leases(self, now: float) -> None:
+        self._conn.execute(
+            'UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, '
+            "error = COALESCE(error, 'lease expired'), lease_owner = NULL, updated_at = ? "
+            'WHERE status = ? AND lease_expires < ?',
+            (self.max_attempts, FAILED, PENDING, now, LEASED, now),
+        )
+
+    def complete(self, task: Task, worker_id: str, result: Any) -> bool:
+        """
+        Сохраняет результат. False - аренда уже истекла и задача передана другому воркеру,
+        результат отброшен
+        """
+        with self._lock, self._transaction():
+            cursor = self._conn.execute(
+                'UPDATE tasks SET status = ?, result = ?, error = NULL, lease_owner = NULL, updated_at = ? '
+                'WHERE id = ? AND status = ? AND lease_owner = ?',
+                (DONE, json.dumps(result, ensure_ascii=False), time.time(), task.id, LEASED, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, task: Task, worker_id: str, error: str) -> bool:
+        """Возвращает задачу в очередь или помечает ее проваленной после max_attempts попыток"""
+        status = FAILED if task.attempts >= self.max_attempts else PENDING
+        with self._lock, self._transaction():
+            cursor = self._conn.execute(
+                'UPDATE tasks SET status = ?, error = ?, lease_owner = NULL, updated_at = ? '
+                'WHERE id = ? AND status = ? AND lease_owner = ?',
+                (status, error, time.time(), task.id, LEASED, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def collect(self, kind: str, limit: int = 1000) -> List[Tuple[Task, Any]]:
+        """Завершенные задачи, которые еще не забирали; каждая отдается один раз"""
+        with self._lock, self._transaction():
+            rows = self._conn.execute(
+                'SELECT id, kind, key, payload, attempts, result FROM tasks '
+                'WHERE kind = ? AND status = ? AND collected = 0 ORDER BY id LIMIT ?',
+                (kind, DONE, limit),
+            ).fetchall()
+            self._conn.executemany('UPDATE tasks SET collected = 1 WHERE id = ?', [(row[0],) for row in rows])
+        return [(Task(id, kind, key, json.loads(payload), attempts), json.loads(result))
+                for id, kind, key, payload, attempts, result in rows]
+
+    def results(self, kind: str) -> Iterator[Tuple[str, Any]]:
+        """Все результаты задач вида kind: (ключ, результат)"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT key, result FROM tasks WHERE kind = ? AND status = ? ORDER BY id', (kind, DONE)
+            ).fetchall()
+        for key, result in rows:
+            yield key, json.loads(result)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            self._expire_leases(time.time())
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM tasks GROUP BY status').fetchall()
+        counts = {status: 0 for status in (PENDING, LEASED, DONE, FAILED)}
+        counts.update(dict(rows))
+        return counts
+
+    def failed(self, kinds: Optional[Sequence[str]] = None) -> List[Tuple[str, str]]:
+        """Проваленные задачи: (ключ, последняя ошибка)"""
+        with self._lock:
+            rows = self._conn.execute('SELECT kind, key, error FROM tasks WHERE status = ?', (FAILED,)).fetchall()
+        return [(key, error) for kind, key, error in rows if kinds is None or kind in kinds]
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """BEGIN IMMEDIATE: блокировка на запись берется сразу, а не при первом UPDATE"""
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+    def close(self) -> None:
+        self._conn.close()
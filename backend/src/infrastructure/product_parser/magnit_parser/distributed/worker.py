@@ -0,0 +1,90 @@
+import logging
+import os
+import socket
+import time
+from typing import Any, Optional, TYPE_CHECKING
+
+from ..schemas import CatalogCategory, ProductRef
+from .coordinator import CATEGORY_PAGE, PRODUCT
+from .task_queue import Task, TaskQueue
+
+if TYPE_CHECKING:
+    from ..facade import MagnitParser
+
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Воркер распределенного обхода: берет задачи из очереди в аренду, выполняет их
+    через CategoryService/ProductService своего MagnitParser и сообщает результат.
+    Воркеров может быть сколько угодно с общей очередью (с SqliteTaskQueue - процессы одной
+    машины); у каждого свой ограничитель скорости, поэтому пропускная способность растет с их числом
+    """
+
+    def __init__(self, queue: TaskQueue, parser: 'MagnitParser', worker_id: Optional[str] = None,
+                 batch_size: int = 4, lease_seconds: float = 120.0):
+        self.queue = queue
+        self.parser = parser
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.processed = 0
+
+    def run_once(self) -> int:
+        """Выполняет одну порцию задач; 0 - очередь пуста"""
+        tasks = self.queue.lease(self.worker_id, limit=self.batch_size, lease_seconds=self.lease_seconds)
+        for task in tasks:
+            try:
+                result = self._execute(task)
+            except Exception as e:
+                logger.warning("Задача %s (попытка %s) не выполнена: %s", task.key, task.attempts, e)
+                self.queue.fail(task, self.worker_id, str(e))
+                continue
+
+            if not self.queue.complete(task, self.worker_id, result):
+                logger.warning("Аренда задачи %s истекла, результат отброшен", task.key)
+            self.processed += 1
+        return len(tasks)
+
+    def run(self, idle_timeout: float = 30.0, poll_interval: float = 1.0) -> int:
+        """
+        Выполняет задачи, пока очередь не пустует дольше idle_timeout секунд
+        (координатор мог еще не поставить следующие страницы)
+        """
+        idle_since = None
+        while True:
+            if self.run_once():
+                idle_since = None
+                continue
+
+            idle_since = idle_since or time.monotonic()
+            if time.monotonic() - idle_since >= idle_timeout:
+                logger.info("Воркер %s: очередь пуста, выполнено задач %s", self.worker_id, self.processed)
+                return self.processed
+            time.sleep(poll_interval)
+
+    def _execute(self, task: Task) -> Any:
+        payload = task.payload
+        if task.kind == CATEGORY_PAGE:
+            category = CatalogCategory(title=payload['title'], href=payload['href'])
+            products = self.parser.category_service.fetch_category_page(
+                category, payload['shop_code'], payload['shop_type'], payload['page'], payload['max_pages']
+            )
+            if products is None:
+                raise RuntimeError("Страница категории не получена")
+            return {'products': [(product.title, product.href) for product in products]}
+
+        if task.kind == PRODUCT:
+            details = self.parser.product_service.fetch_product_details(
+                ProductRef(payload['title'], payload['href']).for_store(payload['shop_code'], payload['shop_type'])
+            )
+            if not details:
+                raise RuntimeError("Карточка товара не получена")
+            # Ошибка загрузки возвращается словарем, а не исключением: задача должна уйти на повтор
+            if details.get('error') or details.get('success') is False:
+                raise RuntimeError(details.get('error') or "Карточка товара не получена")
+            return details
+
+        raise ValueError(f"Неизвестный вид задачи: {task.kind}")
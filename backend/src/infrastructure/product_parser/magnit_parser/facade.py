@@ -1,17 +1,38 @@
 from functools import cached_property
+import asyncio
 import logging
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, Iterator, List, Optional, Dict, Any, Sequence
 
-from .schemas import CategoryProduct, CatalogCategory
-from .parsers import CatalogParser, CategoryParser, ProductDetailsParser
+from .schemas import ProductRef, CatalogCategory
+from .parsers import CatalogParser, CategoryParser, SitemapParser, TimedParser, PRODUCT_PARSER_ENGINES
 
-from .services import CatalogService, CategoryService, ProductService
-from ..http import PoliteHttpClient
+from .artifacts import DEFAULT_ARTIFACT_CONFIG, ArtifactConfig, ArtifactWriter
+from .category_scheduler import CategoryScheduler
+from .category_stats import CategoryStatsStore
+from .checkpoints import CheckpointJournal
+from .fingerprints import CrawlReport, FingerprintStore
+from .parse_pool import ParsePool, PooledCategoryParser, PooledProductParser
+from .services import CatalogService, CategoryService, ProductService, SitemapService
+from .store_scheduler import MultiStoreScheduler, StoreTarget
+from ..http import (PoliteHttpClient, RateLimiter, CacheBackend, CachePolicy, MemoryCache, RetryEngine, RetryPolicy,
+                    TransportConfig, create_transport)
+from ..http.cache import DEFAULT_CACHE_POLICY
+from ..http.retry import DEFAULT_RETRY_POLICY
+from ..http.session_config import DEFAULT_TRANSPORT_CONFIG
+from ..metrics import CrawlMetrics
+from ..progress import ProgressReporter
+
+try:
+    from ..http.async_client import AsyncHttpClient
+except ImportError:  # aiohttp не установлен - асинхронный режим недоступен
+    AsyncHttpClient = None
 
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Откуда берутся ссылки на товары: постраничный обход HTML категорий или карта сайта
+DISCOVERY_MODES = ('html', 'sitemap')
+
 
 # синтаксические соглашения(по советам дипсика):
 # Одно подчеркивание в начале = "Это внутренний атрибут, не используйте его напрямую извне класса"
@@ -22,15 +43,87 @@ logger = logging.getLogger(__name__)
 
 
 class MagnitParser:
-    def __init__(self):
-        self.http = PoliteHttpClient()
-        self.product_parser = ProductDetailsParser()
+    """
+    Фасад парсера Магнита.
+    requests_per_second и burst задают общий для sync и async режимов лимит запросов к хосту,
+    max_concurrent, per_host_limit и delay настраивают асинхронный режим (aparse_products),
+    cache - общее хранилище ответов (например, SqliteCache для кэша между запусками),
+    parser_engine - движок разбора карточек товаров из PRODUCT_PARSER_ENGINES,
+    parse_workers - число процессов для разбора HTML (0 - разбор в текущем процессе),
+    fingerprints_path - файл с отпечатками карточек для инкрементального обхода,
+    checkpoint_path - журнал прогресса: перезапуск с тем же файлом продолжает прерванный обход,
+    metrics - куда записывать метрики обхода (по умолчанию создается новый CrawlMetrics),
+    transport_config - пулы соединений, keep-alive, таймауты и HTTP/2 для обоих клиентов,
+    discovery - 'sitemap': при обходе всего каталога товары берутся из sitemap.xml без страниц
+    категорий, а если карта недоступна - обходятся категории ('html', по умолчанию),
+    artifacts - куда и сколько сохранять сжатых копий страниц для отладки (None - не сохранять),
+    retry_policy - повторы при сбоях, бюджет повторов на запуск и предохранители хостов,
+    общие для sync и async режимов,
+    category_stats_path - файл статистики категорий, по которой category_scheduler выбирает,
+    какие категории обходить первыми
+    """
+
+    def __init__(self, max_concurrent: int = 10, per_host_limit: int = 4, delay: float = 0.0,
+                 requests_per_second: float = 1.0, burst: int = 3,
+                 cache: Optional[CacheBackend] = None,
+                 cache_policy: CachePolicy = DEFAULT_CACHE_POLICY,
+                 parser_engine: str = 'bs4',
+                 parse_workers: int = 0,
+                 fingerprints_path: Optional[str] = None,
+                 checkpoint_path: Optional[str] = None,
+                 metrics: Optional[CrawlMetrics] = None,
+                 transport_config: TransportConfig = DEFAULT_TRANSPORT_CONFIG,
+                 discovery: str = 'html',
+                 artifacts: Optional[ArtifactConfig] = DEFAULT_ARTIFACT_CONFIG,
+                 retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+                 category_stats_path: Optional[str] = None):
+        if parser_engine not in PRODUCT_PARSER_ENGINES:
+            raise ValueError(f'Неизвестный движок парсера: {parser_engine}')
+        if discovery not in DISCOVERY_MODES:
+            raise ValueError(f'Неизвестный способ поиска товаров: {discovery}')
+
+        self.metrics = metrics if metrics is not None else CrawlMetrics()
+        self.rate_limiter = RateLimiter(rate=requests_per_second, burst=burst)
+        self.cache = cache if cache is not None else MemoryCache()
+        self.retry = RetryEngine(retry_policy, self.metrics)
+        self.http = PoliteHttpClient(self.rate_limiter, cache=self.cache, cache_policy=cache_policy,
+                                     metrics=self.metrics, transport=create_transport(transport_config),
+                                     retry=self.retry)
+        self.async_http = AsyncHttpClient(max_concurrent=max_concurrent,
+                                          per_host_limit=per_host_limit,
+                                          delay=delay,
+                                          rate_limiter=self.rate_limiter,
+                                          cache=self.cache,
+                                          cache_policy=cache_policy,
+                                          metrics=self.metrics,
+                                          transport_config=transport_config,
+                                          retry=self.retry) if AsyncHttpClient else None
+        self.product_parser = PRODUCT_PARSER_ENGINES[parser_engine]()
         self.catalog_parser = CatalogParser()
         self.category_parser = CategoryParser()
 
-        self.category_service = CategoryService(self.http, self.category_parser)
-        self.product_service = ProductService(self.http, self.product_parser)
-        self.catalog_service = CatalogService(self.http, self.catalog_parser)
+        self.parse_pool = ParsePool(parse_workers, parser_engine, self.metrics) if parse_workers > 0 else None
+        if self.parse_pool:
+            category_parser = PooledCategoryParser(self.parse_pool)
+            product_parser = PooledProductParser(self.parse_pool)
+        else:
+            category_parser = TimedParser(self.category_parser, self.metrics)
+            product_parser = TimedParser(self.product_parser, self.metrics)
+
+        self.journal = CheckpointJournal(checkpoint_path) if checkpoint_path else None
+        self.fingerprints = FingerprintStore(fingerprints_path) if fingerprints_path else None
+        self.category_stats = CategoryStatsStore(category_stats_path) if category_stats_path else None
+
+        self.artifacts = ArtifactWriter(artifacts) if artifacts is not None else None
+
+        self.category_service = CategoryService(self.http, category_parser, self.async_http, self.journal,
+                                                self.artifacts)
+        self.product_service = ProductService(self.http, product_parser, self.async_http,
+                                              self.fingerprints, self.journal)
+        self.catalog_service = CatalogService(self.http, TimedParser(self.catalog_parser, self.metrics),
+                                              self.async_http)
+        self.discovery = discovery
+        self.sitemap_service = SitemapService(self.http, SitemapParser())
 
         self.products: List[CatalogCategory] = []
 
@@ -38,14 +131,235 @@ class MagnitParser:
     def catalog_categories(self) -> List[CatalogCategory]:
         return self.catalog_service.fetch_categories()
 
-    def category_products(self, categories: Optional[List[CatalogCategory]] = None) -> List[CategoryProduct]:
-        categories_to_parse = categories if categories else self.catalog_categories
-        self.products = self.category_service.fetch_multiple_products(categories_to_parse)
+    def category_products(self, categories: Optional[List[CatalogCategory]] = None) -> List[ProductRef]:
+        self.products = list(self.discover_products(categories))
         return self.products
 
-    def parse_products(self, products: Optional[List[CategoryProduct]] = None) -> List[Dict[str, Any]]:
+    def discover_products(self, categories: Optional[List[CatalogCategory]] = None,
+                          max_pages: int = 5) -> Iterator[ProductRef]:
+        """
+        Ссылки на товары. В режиме discovery='sitemap' без явного списка категорий
+        они берутся из карты сайта, иначе (или если в карте нет товаров) - со страниц категорий
+        """
+        if self._use_sitemap(categories):
+            products = self.sitemap_service.iter_products()
+            first = next(products, None)
+            if first is not None:
+                yield first
+                yield from products
+                self._check_discovery(self.sitemap_service.failed_sitemaps)
+                return
+            logger.warning("В карте сайта нет товаров, переходим к обходу категорий")
+
+        categories_to_parse = categories if categories else self.catalog_categories
+        yield from self.category_service.iter_multiple_products(categories_to_parse, max_pages=max_pages)
+        self._check_discovery(len(self.category_service.failed_categories))
+
+    async def _asitemap_products(self, categories: Optional[List[CatalogCategory]]) -> Optional[List[ProductRef]]:
+        """Товары из карты сайта; None - карта не используется или пуста, нужен обход категорий"""
+        if not self._use_sitemap(categories):
+            return None
+        products = await self.sitemap_service.afetch_products()
+        if not products:
+            logger.warning("В карте сайта нет товаров, переходим к обходу категорий")
+            return None
+        self._check_discovery(self.sitemap_service.failed_sitemaps)
+        return products
+
+    def _check_discovery(self, failures: int) -> None:
+        """
+        Итог поиска товаров: если часть каталога (категории, карты сайта) не загрузилась,
+        полный обход не должен отмечать ее товары пропавшими
+        """
+        if failures and self.fingerprints:
+            logger.warning("Не загружено частей каталога: %s, пропавшие товары в этом запуске не отмечаются",
+                           failures)
+            self.fingerprints.mark_incomplete()
+
+    def _use_sitemap(self, categories: Optional[List[CatalogCategory]]) -> bool:
+        # Карта не делится на категории, поэтому для выбранных категорий нужен их обход
+        return self.discovery == 'sitemap' and not categories
+
+    def stores(self, targets: Sequence[StoreTarget], max_pages: int = 5) -> MultiStoreScheduler:
+        """Планировщик обхода нескольких магазинов с общими соединениями, кэшем и лимитом запросов"""
+        return MultiStoreScheduler(self, targets, max_pages=max_pages)
+
+    def category_scheduler(self, max_parallel: int = 4, max_pages: int = 5,
+                           page_budget: Optional[int] = None, time_budget: Optional[float] = None,
+                           priority: str = 'stale', target: StoreTarget = StoreTarget(784507)) -> CategoryScheduler:
+        """Параллельный обход категорий с общим бюджетом страниц и времени на запуск"""
+        return CategoryScheduler(self, max_parallel=max_parallel, max_pages=max_pages, page_budget=page_budget,
+                                 time_budget=time_budget, priority=priority, stats=self.category_stats,
+                                 target=target)
+
+    @property
+    def crawl_report(self) -> Optional[CrawlReport]:
+        """Отчет последнего запуска: сколько товаров новых, измененных, прежних и пропавших"""
+        return self.fingerprints.last_report if self.fingerprints else None
+
+    def parse_products(self, products: Optional[List[ProductRef]] = None,
+                       full_catalog: bool = False) -> List[Dict[str, Any]]:
+        """
+        full_catalog - вызывающий гарантирует, что обходится весь каталог: только тогда
+        товары, не встреченные за запуск, отмечаются в отчете crawl_report пропавшими
+        """
         products_to_parse = products if products else self.category_products()
-        return self.product_service.fetch_multiple_details(products_to_parse)
+        results = self.product_service.fetch_multiple_details(products_to_parse, full_catalog)
+        self._complete_crawl()
+        return results
+
+    def iter_products(self, categories: Optional[List[CatalogCategory]] = None,
+                      max_pages: int = 5, full_catalog: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Потоковый аналог parse_products: каждый товар со страницы категории сразу
+        уходит на загрузку карточки, а результаты отдаются по мере готовности
+        """
+        products = self.discover_products(categories, max_pages=max_pages)
+        yield from self.product_service.iter_multiple_details(products, full_catalog)
+        self._complete_crawl()
+
+    async def aiter_products(self, categories: Optional[List[CatalogCategory]] = None,
+                             max_pages: int = 5,
+                             workers: Optional[int] = None,
+                             queue_size: int = 100,
+                             full_catalog: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Асинхронный конвейер производитель/потребитель.
+        Категории обходятся параллельно и складывают найденные товары в ограниченную очередь,
+        workers потребителей загружают карточки и отдают результаты в порядке готовности.
+        Размер очередей ограничен, поэтому память не растет вместе с каталогом
+        """
+        if self.async_http is None:
+            raise RuntimeError('Для асинхронного режима нужен aiohttp')
+
+        workers = workers or self.async_http.max_concurrent
+        products_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        results_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        done = object()
+        progress = ProgressReporter('Товары', log=logger)
+
+        async def produce() -> None:
+            try:
+                sitemap_products = await self._asitemap_products(categories)
+                if sitemap_products is not None:
+                    for product in sitemap_products:
+                        await products_queue.put(product)
+                    return
+
+                categories_to_parse = categories if categories else await self.catalog_service.afetch_categories()
+                self.category_service.clear_processed_pages()
+                await asyncio.gather(
+                    *(self._aproduce_category(category, max_pages, products_queue)
+                      for category in categories_to_parse)
+                )
+                self._check_discovery(len(self.category_service.failed_categories))
+            finally:
+                for _ in range(workers):
+                    await products_queue.put(done)
+
+        async def consume() -> None:
+            try:
+                while (product := await products_queue.get()) is not done:
+                    await results_queue.put(await self.product_service.afetch_tracked(product, progress))
+            finally:
+                await results_queue.put(done)
+
+        with self.product_service.fingerprint_run(full_catalog), progress:
+            tasks = [asyncio.create_task(produce())]
+            tasks.extend(asyncio.create_task(consume()) for _ in range(workers))
+
+            try:
+                finished = 0
+                while finished < workers:
+                    result = await results_queue.get()
+                    if result is done:
+                        finished += 1
+                    else:
+                        yield result
+                self._complete_crawl()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await self.async_http.close()
+
+    async def _aproduce_category(self, category: CatalogCategory, max_pages: int,
+                                 products_queue: asyncio.Queue) -> None:
+        try:
+            async for page_products in self.category_service.aiter_category_pages(category, max_pages=max_pages):
+                for product in page_products:
+                    await products_queue.put(product)
+        except Exception as e:
+            logger.error("✗ Ошибка обработки '%s': %s", category.title, e)
+            self.category_service.record_failure(category)
+
+    async def aparse_products(self, categories: Optional[List[CatalogCategory]] = None,
+                              max_pages: int = 5, full_catalog: bool = False) -> List[Dict[str, Any]]:
+        """
+        Асинхронный аналог parse_products: каталог -> страницы категорий -> карточки товаров.
+        Категории обрабатываются параллельно, и карточки товаров категории начинают
+        загружаться сразу после ее страниц, не дожидаясь остальных категорий.
+        В режиме discovery='sitemap' карточки загружаются по ссылкам из карты сайта
+        """
+        if self.async_http is None:
+            raise RuntimeError('Для асинхронного режима нужен aiohttp')
+
+        try:
+            sitemap_products = await self._asitemap_products(categories)
+            if sitemap_products is not None:
+                results = await self.product_service.afetch_multiple_details(sitemap_products,
+                                                                             full_catalog=full_catalog)
+                self._complete_crawl()
+                return results
+
+            categories_to_parse = categories if categories else await self.catalog_service.afetch_categories()
+            self.category_service.clear_processed_pages()
+
+            with self.product_service.fingerprint_run(full_catalog), ProgressReporter('Товары', log=logger) as progress:
+                batches = await asyncio.gather(
+                    *(self._aparse_category(category, max_pages, progress) for category in categories_to_parse),
+                    return_exceptions=True,
+                )
+                self._check_discovery(len(self.category_service.failed_categories))
+        finally:
+            await self.async_http.close()
+
+        results: List[Dict[str, Any]] = []
+        for category, batch in zip(categories_to_parse, batches):
+            if isinstance(batch, Exception):
+                logger.error("✗ Ошибка обработки '%s': %s", category.title, batch)
+                continue
+            results.extend(batch)
+        self._complete_crawl()
+        return results
+
+    async def _aparse_category(self, category: CatalogCategory, max_pages: int,
+                               progress: ProgressReporter) -> List[Dict[str, Any]]:
+        try:
+            products = await self.category_service.afetch_category_products(category, max_pages=max_pages)
+        except Exception:
+            self.category_service.record_failure(category)
+            raise
+        return await self.product_service.afetch_multiple_details(products, progress)
+
+    def _complete_crawl(self) -> None:
+        # Журнал нужен только чтобы продолжить прерванный обход; после завершенного он очищается
+        if self.journal:
+            self.journal.complete()
 
     def clear_cache(self):
-        self.http.clear_cache()
+        self.cache.clear()
+
+    def close(self):
+        """Останавливает пул разбора, закрывает соединения и хранилища, дописывает копии страниц"""
+        self.http.close()
+        if self.parse_pool:
+            self.parse_pool.close()
+        if self.fingerprints:
+            self.fingerprints.close()
+        if self.journal:
+            self.journal.close()
+        if self.category_stats:
+            self.category_stats.close()
+        if self.artifacts:
+            self.artifacts.close()
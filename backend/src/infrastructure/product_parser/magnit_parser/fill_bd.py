@@ -0,0 +1,98 @@
+import logging
+import sqlite3
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from ....application.services import ProductFactory
+from ...database.models import BulkProduct, FixedWeightProduct, TableModel
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WriteStats:
+    written: int = 0
+    skipped: int = 0
+    batches: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class ProductWriter:
+    """
+    Пакетная запись результатов ProductService в базу.
+    Строки копятся по таблицам и сбрасываются через executemany с upsert по url,
+    по одной транзакции на batch_size строк. Товар, перешедший в другую таблицу
+    (стал продаваться на развес или в упаковке), удаляется из прежней. write() принимает
+    итератор (например, MagnitParser.iter_products), поэтому весь каталог в памяти не держится
+    """
+
+    MODELS: List[Type[TableModel]] = [FixedWeightProduct, BulkProduct]
+
+    def __init__(self, connection: sqlite3.Connection, batch_size: int = 5000,
+                 factory: Optional[ProductFactory] = None):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.factory = factory or ProductFactory()
+        self.stats = WriteStats()
+        # Строки по url: последняя версия товара в пакете вытесняет прежние, в том числе из другой таблицы
+        self._pending: Dict[Type[TableModel], Dict[str, tuple]] = {model: {} for model in self.MODELS}
+        self._pending_count = 0
+
+    def create_tables(self) -> None:
+        with self.connection:
+            for model in self.MODELS:
+                self.connection.execute(model.__ddl__)
+
+    def add(self, details: Dict[str, Any]) -> None:
+        product = self.factory.create(details)
+        if product is None:
+            self.stats.skipped += 1
+            return
+
+        for model, rows in self._pending.items():
+            if model is not type(product):
+                rows.pop(product.url, None)
+        self._pending[type(product)][product.url] = product.as_row()
+        self._pending_count += 1
+        if self._pending_count >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending_count:
+            return
+
+        with self.connection:  # Одна транзакция на пакет
+            for model, rows in self._pending.items():
+                if rows:
+                    self.connection.executemany(model.upsert_sql(), rows.values())
+                    for other in self.MODELS:
+                        if other is not model:
+                            self.connection.executemany(other.delete_sql(), ((url,) for url in rows))
+
+        self.stats.written += self._pending_count
+        self.stats.batches += 1
+        logger.info("Записано товаров: %s", self.stats.written)
+        for rows in self._pending.values():
+            rows.clear()
+        self._pending_count = 0
+
+    def write(self, results: Iterable[Dict[str, Any]]) -> WriteStats:
+        for details in results:
+            self.add(details)
+        self.flush()
+        return self.stats
+
+
+def fill_database(results: Iterable[Dict[str, Any]], path: str = 'products.db',
+                  batch_size: int = 5000) -> WriteStats:
+    """Создает таблицы в SQLite по пути path и записывает в них результаты парсинга"""
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute('PRAGMA journal_mode=WAL')
+        writer = ProductWriter(connection, batch_size=batch_size)
+        writer.create_tables()
+        return writer.write(results)
+    finally:
+        connection.close()
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from enum import Enum
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+# Значимая часть карточки - блок цены и контейнер характеристик.
+# Все, что вокруг (head со скриптами, шапка и подвал сайта, счетчики аналитики), меняется от запроса к запросу
+FINGERPRINT_MARKERS = ('product-details-price', 'unit-product-details__details-container')
+
+_TAG_NAME = re.compile(r'<([a-zA-Z][a-zA-Z0-9-]*)')
+_SCRIPT = re.compile(r'<script\b.*?</script>', re.S | re.I)
+
+
+def _element_bounds(content: str, index: int) -> Optional[Tuple[int, int]]:
+    """Начало и конец элемента, в атрибутах открывающего тега которого находится index"""
+    start = content.rfind('<', 0, index)
+    match = _TAG_NAME.match(content, start) if start >= 0 else None
+    if match is None:
+        return None
+    tags = re.compile(rf'<(/?){match.group(1)}\b', re.I)
+    depth = 0
+    for tag in tags.finditer(content, start):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            end = content.find('>', tag.end())
+            return start, len(content) if end < 0 else end + 1
+    return None
+
+
+def content_fingerprint(content: str) -> str:
+    """
+    Хэш значимой части страницы товара: от начала первого до конца последнего
+    из блоков FINGERPRINT_MARKERS, без скриптов внутри. Если блоки не найдены, хэшируется вся страница
+    """
+    body = max(content.find('<body'), 0)
+    bounds = [_element_bounds(content, pos) for pos in (content.find(marker, body) for marker in FINGERPRINT_MARKERS)
+              if pos != -1]
+    bounds = [bound for bound in bounds if bound is not None]
+    region = content[min(start for start, _ in bounds):max(end for _, end in bounds)] if bounds else content
+    return hashlib.blake2b(_SCRIPT.sub('', region).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ChangeStatus(str, Enum):
+    new = 'new'
+    changed = 'changed'
+    unchanged = 'unchanged'
+    removed = 'removed'
+
+
+@dataclass
+class CrawlReport:
+    """Сколько товаров за запуск оказались новыми, измененными, прежними и пропавшими"""
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    started_at: float = field(default_factory=time.time)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class Observation:
+    """Результат сверки загруженной страницы с прошлым запуском"""
+    href: str
+    fingerprint: str
+    etag: Optional[str]
+    status: ChangeStatus
+    previous_result: Optional[Dict[str, Any]] = None
+
+
+class FingerprintStore:
+    """
+    Отпечатки карточек товаров между запусками (SQLite).
+    Для каждого href хранится хэш значимой части страницы, ETag, время разбора
+    и результат разбора. Если страница не изменилась, ее не нужно разбирать заново
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS fingerprints (
+            href TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            etag TEXT,
+            parsed_at REAL NOT NULL,
+            result TEXT NOT NULL,
+            seen_run INTEGER NOT NULL,
+            removed INTEGER NOT NULL DEFAULT 0
+        )
+    """
+
+    def __init__(self, path: str, commit_every: int = 500):
+        self.path = path
+        self.commit_every = commit_every
+        self.report: Optional[CrawlReport] = None
+        self.last_report: Optional[CrawlReport] = None
+        self._run_id: Optional[int] = None
+        self._incomplete = False
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(self._SCHEMA)
+        self._conn.commit()
+
+    @property
+    def in_run(self) -> bool:
+        return self._run_id is not None
+
+    def start_run(self) -> CrawlReport:
+        last = self._conn.execute('SELECT COALESCE(MAX(seen_run), 0) FROM fingerprints').fetchone()[0]
+        self._run_id = last + 1
+        self.report = CrawlReport()
+        return self.report
+
+    def finish_run(self, mark_removed: bool = False) -> CrawlReport:
+        """
+        Завершает запуск. mark_removed - считать пропавшими товары, которые не встретились
+        за запуск; имеет смысл только для завершенного полного обхода каталога.
+        После mark_incomplete пропавшие не отмечаются
+        """
+        if mark_removed and self._incomplete:
+            logger.warning("Часть каталога не обойдена, товары не отмечаются пропавшими")
+            mark_removed = False
+        self._incomplete = False
+        with self._lock:
+            if mark_removed:
+                cursor = self._conn.execute(
+                    'UPDATE fingerprints SET removed = 1 WHERE seen_run < ? AND removed = 0', (self._run_id,)
+                )
+                self.report.removed = cursor.rowcount
+            self._conn.commit()
+            self._pending = 0
+
+        report, self.last_report = self.report, self.report
+        self._run_id = None
+        self.report = None
+        logger.info("Итоги запуска: новых %s, измененных %s, без изменений %s, пропавших %s",
+                    report.new, report.changed, report.unchanged, report.removed)
+        return report
+
+    def mark_incomplete(self) -> None:
+        """
+        Часть каталога не обойдена (категория или карта сайта не загрузилась): ее товары
+        в ближайшем запуске не отмечаются пропавшими. Отметка действует до конца
+        ближайшего запуска, потому что товары могут искаться и до его начала
+        """
+        self._incomplete = True
+
+    @contextmanager
+    def run(self, full_catalog: bool = False) -> Iterator[CrawlReport]:
+        """
+        Запуск как контекст; вложенные вызовы присоединяются к уже начатому запуску.
+        Пропавшими товары отмечаются, только если запуск завершился без исключения,
+        вызывающий подтвердил (full_catalog), что обошел весь каталог, и ни одна его часть
+        не отмечена mark_incomplete: частичный обход, лимит страниц, бюджет планировщика
+        или не загрузившаяся категория не должны "удалять" необойденные товары
+        """
+        if self.in_run:
+            yield self.report
+            return
+
+        report = self.start_run()
+        completed = False
+        try:
+            yield report
+            completed = True
+        finally:
+            self.finish_run(mark_removed=completed and full_catalog)
+
+    def observe(self, href: str, content: str, etag: Optional[str] = None) -> Observation:
+        """Сверяет загруженную страницу с прошлым запуском и учитывает ее в отчете"""
+        fingerprint = content_fingerprint(content)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT fingerprint, result, removed FROM fingerprints WHERE href = ?', (href,)
+            ).fetchone()
+
+            if row is None or row[2]:
+                status, previous = ChangeStatus.new, None
+            elif row[0] == fingerprint:
+                status, previous = ChangeStatus.unchanged, json.loads(row[1])
+                self._conn.execute('UPDATE fingerprints SET seen_run = ? WHERE href = ?', (self._run_id or 0, href))
+                self._maybe_commit()
+            else:
+                status, previous = ChangeStatus.changed, None
+
+        if self.report is not None:
+            setattr(self.report, status.value, getattr(self.report, status.value) + 1)
+        return Observation(href, fingerprint, etag, status, previous)
+
+    def mark_seen(self, href: str) -> None:
+        """
+        Отмечает товар встреченным в запуске без сверки страницы: результат взят из журнала
+        или карточка не загрузилась. Такой товар не считается пропавшим и не попадает в отчет
+        """
+        with self._lock:
+            self._conn.execute('UPDATE fingerprints SET seen_run = ? WHERE href = ? AND removed = 0',
+                               (self._run_id or 0, href))
+            self._maybe_commit()
+
+    def save(self, observation: Observation, result: Dict[str, Any]) -> None:
+        """Запоминает свежий результат разбора"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?, ?, 0)',
+                (observation.href, observation.fingerprint, observation.etag, time.time(),
+                 json.dumps(result, ensure_ascii=False), self._run_id or 0),
+            )
+            self._maybe_commit()
+
+    def _maybe_commit(self) -> None:
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
@@ -1,26 +1,127 @@
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
 from pprint import pprint
+from typing import List, Optional
 
-from . import MagnitParser
+from ....application.services import PriceHistory
+from . import MagnitParser, StoreTarget
+from .artifacts import ArtifactConfig
+from .crawl_results import write_results
+from .schemas import ProductRef
+from .store_scheduler import parse_store
 
 
-def main():
-    parser = MagnitParser()
-    parser.http.clear_cache()
+def build_arg_parser() -> argparse.ArgumentParser:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--profile', action='store_true',
+                            help='в конце вывести разбивку времени по этапам, запросам и парсерам')
+    arg_parser.add_argument('--metrics-out', default=None,
+                            help='сохранить метрики в файл: .prom - формат Prometheus, иначе JSON')
+    arg_parser.add_argument('--results-out', default=None,
+                            help='сохранить карточки товаров в JSON Lines (источник данных для API)')
+    arg_parser.add_argument('--history-dir', default=None,
+                            help='добавить цены обхода снимком в историю цен в этом каталоге')
+    arg_parser.add_argument('--artifact-sample-rate', type=float, default=0.0,
+                            help='доля обычных страниц категорий, сохраняемых для отладки в crawl_artifacts')
+    arg_parser.add_argument('--page-budget', type=int, default=None,
+                            help='обойти весь каталог, запросив не больше стольких страниц категорий')
+    arg_parser.add_argument('--time-budget', type=float, default=None,
+                            help='обойти весь каталог, запрашивая страницы категорий не дольше стольких секунд')
+    arg_parser.add_argument('--category-stats', default=None,
+                            help='файл статистики категорий: первыми обходятся давно не обновленные')
+    arg_parser.add_argument('--store', type=parse_store, action='append', default=None,
+                            help='магазин shopCode[:shopType] со своими ассортиментом и ценами, '
+                                 'можно указать несколько раз')
+    arg_parser.add_argument('--clear-cache', action='store_true',
+                            help='очистить кэш ответов перед обходом: все страницы загружаются заново')
+    arg_parser.add_argument('--log-level', default='INFO',
+                            help='уровень логов; DEBUG - строки по каждой странице, INFO - периодические сводки')
+    return arg_parser
 
-    # Только первые 3 категории
-    categories = parser.catalog_categories[:3]
-    pprint(categories)
-    # Только 2 страницы на категорию
-    products = parser.category_service.fetch_multiple_products(
-        categories,
-        max_pages=5
-    )
+
+def main(profile: bool = False, metrics_out: str = None, results_out: str = None, history_dir: str = None,
+         artifact_sample_rate: float = 0.0, page_budget: int = None, time_budget: float = None,
+         category_stats: str = None, stores: Optional[List[StoreTarget]] = None, clear_cache: bool = False):
+    parser = MagnitParser(artifacts=ArtifactConfig(sample_rate=artifact_sample_rate),
+                          category_stats_path=category_stats)
+    if clear_cache:
+        parser.http.clear_cache()
+    metrics = parser.metrics
+    product_stores = None  # Магазин каждого товара из products, если магазинов несколько
+
+    if stores:
+        # Магазины обходятся по кругу, карточки загружаются с параметрами своего магазина
+        scheduler = parser.stores(stores, max_pages=5)
+        with metrics.stage('catalog'):
+            categories = scheduler.categories[:3]
+        pprint(categories)
+        with metrics.stage('categories'):
+            pairs = list(scheduler.iter_store_products(categories))
+        product_stores = [target.key for target, _ in pairs]
+        products = [product for _, product in pairs]
+    elif page_budget is not None or time_budget is not None:
+        # Весь каталог, пока не кончится бюджет; недообойденные категории - первыми в следующий раз.
+        # Страницы max_parallel категорий загружаются одновременно асинхронным клиентом, без aiohttp - по очереди
+        scheduler = parser.category_scheduler(page_budget=page_budget, time_budget=time_budget)
+
+        async def collect() -> List[ProductRef]:
+            try:
+                return [product async for product in scheduler.aiter_products()]
+            finally:
+                await parser.async_http.close()
+
+        with metrics.stage('categories'):
+            if parser.async_http is None:
+                products = list(scheduler.iter_products())
+            else:
+                products = asyncio.run(collect())
+        pprint(scheduler.report)
+    else:
+        # Только первые 3 категории
+        with metrics.stage('catalog'):
+            categories = parser.catalog_categories[:3]
+        pprint(categories)
+        # Только 2 страницы на категорию
+        with metrics.stage('categories'):
+            products = parser.category_service.fetch_multiple_products(
+                categories,
+                max_pages=5
+            )
 
     # Только первые 10 товаров
-    details = parser.product_service.fetch_multiple_details(products)
+    with metrics.stage('products'):
+        details = parser.product_service.fetch_multiple_details(products)
+
+    if profile:
+        print(metrics.report())
+    if metrics_out:
+        with open(metrics_out, 'w', encoding='utf-8') as f:
+            f.write(metrics.to_prometheus() if metrics_out.endswith('.prom') else metrics.to_json())
+    if results_out:
+        write_results(details, results_out)
+    if history_dir:
+        history = PriceHistory(history_dir)
+        if product_stores is None:
+            # Категории обходятся для магазина по умолчанию CategoryService
+            history.write_snapshot(details, store=StoreTarget(784507).key)
+        else:
+            by_store = defaultdict(list)
+            for store, product_details in zip(product_stores, details):
+                by_store[store].append(product_details)
+            for target in stores:
+                history.write_snapshot(by_store[target.key], store=target.key)
 
+    # Дописывает сохраненные для отладки страницы из очереди
+    parser.close()
     return details
 
 
 if __name__ == '__main__':
-    pprint(main())
+    args = build_arg_parser().parse_args()
+    logging.basicConfig(level=args.log_level.upper())
+    pprint(main(profile=args.profile, metrics_out=args.metrics_out, results_out=args.results_out,
+                history_dir=args.history_dir, artifact_sample_rate=args.artifact_sample_rate,
+                page_budget=args.page_budget, time_budget=args.time_budget, category_stats=args.category_stats,
+                stores=args.store, clear_cache=args.clear_cache))
@@ -0,0 +1,122 @@
+from typing import Any, Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+NUTRITION_FIELDS = ('kilocalories', 'proteins', 'fats', 'carbohydrates')
+RAW_COLUMNS = ('url', 'title', 'product_type', 'is_food_by_weight', 'weight', 'price', *NUTRITION_FIELDS)
+
+# Тот же шаблон, что \d+[.,]?\d* в TextUtils.extract_number, разбитый на целую и дробную части
+_NUMBER = r'(\d+)[.,]?(\d*)'
+# Степени десяти до 10**22 представимы в float64 точно
+_POW10 = np.array([10.0 ** i for i in range(23)])
+
+# Единицы в порядке проверки TextUtils.normalize_weight и делитель для перевода в кг
+_WEIGHT_UNITS = (
+    ('мг|миллиграмм', 1_000_000.0),
+    ('кг|килограмм', 1.0),
+    ('мл|миллилитр', 1000.0),
+    ('г|грамм', 1000.0),
+    ('л', 1.0),
+)
+_DEFAULT_DIVISOR = 1000.0  # По умолчанию граммы
+
+
+def products_frame(results: Iterable[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    DataFrame из результатов ProductService с исходными текстами веса, цены и КБЖУ.
+    Неудачные карточки (без url или с ошибкой загрузки) пропускаются
+    """
+    rows = []
+    for details in results:
+        if not details or not details.get('url') or details.get('error'):
+            continue
+        characteristics = details.get('characteristics') or {}
+        nutrition = details.get('nutrition_facts') or {}
+        rows.append((
+            details['url'],
+            details.get('title'),
+            characteristics.get('Тип продукта'),
+            bool(details.get('is_food_by_weight')),
+            characteristics.get('Вес'),
+            details.get('price'),
+            *(nutrition.get(name) for name in NUTRITION_FIELDS),
+        ))
+    return pd.DataFrame.from_records(rows, columns=list(RAW_COLUMNS))
+
+
+def _unique_texts(text: pd.Series) -> Tuple[np.ndarray, pd.Series]:
+    """
+    Коды и уникальные значения столбца. Веса, цены и КБЖУ в каталоге сильно
+    повторяются, поэтому строковые операции выполняются только над уникальными
+    """
+    codes, uniques = pd.factorize(text.astype(object))
+    return codes, pd.Series(uniques, dtype=object)
+
+
+def _take(values: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Значения для уникальных обратно на все строки; код -1 (пропуск) дает NaN"""
+    return np.append(values, np.nan)[codes]
+
+
+def _split_number(text: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Первое число из каждого текста как целая мантисса и число знаков после разделителя:
+    '12,5 г' -> (125, 1). Тексты без числа дают NaN в мантиссе
+    """
+    parts = text.str.replace(' ', '', regex=False).str.extract(_NUMBER)
+    fraction = parts[1].fillna('')
+    scale = fraction.str.len().clip(upper=len(_POW10) - 1).to_numpy(dtype=int)
+    integer = pd.to_numeric(parts[0], errors='coerce').to_numpy(dtype=float)
+    fraction_value = pd.to_numeric(fraction.replace('', '0'), errors='coerce').to_numpy(dtype=float)
+    return integer * _POW10[scale] + fraction_value, scale
+
+
+def _weight_divisor(text: pd.Series) -> np.ndarray:
+    lowered = text.str.lower()
+    conditions = [lowered.str.contains(pattern, regex=True, na=False).to_numpy() for pattern, _ in _WEIGHT_UNITS]
+    return np.select(conditions, [divisor for _, divisor in _WEIGHT_UNITS], default=_DEFAULT_DIVISOR)
+
+
+def _number_parts(column: pd.Series, keep: str = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Мантисса и знаки после разделителя для всего столбца через уникальные значения"""
+    codes, uniques = _unique_texts(column)
+    if keep is not None:
+        uniques = uniques.str.replace(keep, '', regex=True)
+    mantissa, scale = _split_number(uniques)
+    return _take(mantissa, codes), np.append(scale, 0)[codes]
+
+
+def normalize_products(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Векторная нормализация всего обхода сразу: вес в кг, цена, цена за кг и КБЖУ числами.
+
+    Результат совпадает с TextUtils/PriceUtils, примененными к каждой строке:
+    число разбирается как целая мантисса и степень десяти, а каждое значение
+    получается одним делением целых чисел, поэтому округление то же, что у
+    перевода точного Decimal во float. Пропуски - NaN вместо None
+    """
+    result = frame[['url', 'title', 'product_type', 'is_food_by_weight']].copy()
+
+    weight_mantissa, weight_scale = _number_parts(frame['weight'])
+    weight_codes, weight_uniques = _unique_texts(frame['weight'])
+    divisor = _take(_weight_divisor(weight_uniques), weight_codes)
+    result['weight_kg'] = weight_mantissa / (_POW10[weight_scale] * divisor)
+
+    # PriceUtils.extract_price сначала выбрасывает все, кроме цифр и разделителей
+    price_mantissa, price_scale = _number_parts(frame['price'], keep=r'[^\d.,]')
+    result['price'] = price_mantissa / _POW10[price_scale]
+
+    # price / weight_kg = (pm / 10**ps) / (wm / (10**ws * divisor))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price_per_kg = (price_mantissa * _POW10[weight_scale] * divisor) / (_POW10[price_scale] * weight_mantissa)
+    # Как calculate_price_per_kg: нулевая или отсутствующая цена и вес дают пропуск
+    valid = (price_mantissa > 0) & (weight_mantissa > 0)
+    result['price_per_kg'] = np.where(valid, price_per_kg, np.nan)
+
+    for name in NUTRITION_FIELDS:
+        mantissa, scale = _number_parts(frame[name])
+        result[name] = mantissa / _POW10[scale]
+
+    return result
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .parsers import CategoryParser, PRODUCT_PARSER_ENGINES, prefilter_category_page, prefilter_product_page
+from .parsers.base import PageParser
+from .schemas import ProductRef
+from ..metrics import CrawlMetrics
+
+
+# Парсеры процесса-воркера, создаются один раз в _init_worker
+_category_parser: Optional[CategoryParser] = None
+_product_parser: Optional[PageParser] = None
+
+
+def _init_worker(parser_engine: str) -> None:
+    global _category_parser, _product_parser
+    _category_parser = CategoryParser()
+    _product_parser = PRODUCT_PARSER_ENGINES[parser_engine]()
+
+
+def _parse_category(content: str) -> Tuple[List[Tuple[str, str]], float]:
+    # Между процессами передаем простые кортежи (title, href), а не объекты
+    started = time.perf_counter()
+    fields = [(product.title, product.href) for product in _category_parser.parse(content)]
+    return fields, time.perf_counter() - started
+
+
+def _parse_product(content: str) -> Tuple[Dict[str, Any], float]:
+    started = time.perf_counter()
+    details = _product_parser.parse(content)
+    return details, time.perf_counter() - started
+
+
+class ParsePool:
+    """
+    Пул процессов для разбора HTML: BeautifulSoup/lxml работа упирается в GIL,
+    поэтому страницы разбираются в workers отдельных процессах.
+    Время разбора замеряется в воркере и записывается в metrics
+    """
+
+    def __init__(self, workers: int, parser_engine: str = 'bs4', metrics: Optional[CrawlMetrics] = None):
+        if parser_engine not in PRODUCT_PARSER_ENGINES:
+            raise ValueError(f'Неизвестный движок парсера: {parser_engine}')
+        self.workers = workers
+        self.metrics = metrics
+        self._product_parser_name = PRODUCT_PARSER_ENGINES[parser_engine].__name__
+        self._executor = ProcessPoolExecutor(max_workers=workers,
+                                             initializer=_init_worker,
+                                             initargs=(parser_engine,))
+
+    # Предфильтр работает в текущем процессе: заглушки не уходят в воркер,
+    # а в воркер передается только фрагмент страницы, а не вся страница
+    def submit_category(self, content: str) -> Future:
+        page = prefilter_category_page(content)
+        if not page.is_valid:
+            return self._done([])
+        return self._unwrap(self._executor.submit(_parse_category, page.fragment), CategoryParser.__name__)
+
+    def submit_product(self, content: str) -> Future:
+        page = prefilter_product_page(content)
+        if not page.is_valid:
+            return self._done({})
+        return self._unwrap(self._executor.submit(_parse_product, page.fragment), self._product_parser_name)
+
+    @staticmethod
+    def _done(value: Any) -> Future:
+        future: Future = Future()
+        future.set_result(value)
+        return future
+
+    def _unwrap(self, timed: Future, parser_name: str) -> Future:
+        """Future с результатом разбора без времени; время уходит в metrics"""
+        result: Future = Future()
+
+        def done(future: Future) -> None:
+            try:
+                value, seconds = future.result()
+            except BaseException as e:
+                result.set_exception(e)
+                return
+            if self.metrics:
+                self.metrics.observe_parse(parser_name, seconds)
+            result.set_result(value)
+
+        timed.add_done_callback(done)
+        return result
+
+    def close(self) -> None:
+        self._executor.shutdown(cancel_futures=True)
+
+
+class PooledCategoryParser(PageParser):
+    """CategoryParser, который выполняет разбор в ParsePool"""
+
+    def __init__(self, pool: ParsePool):
+        self.pool = pool
+
+    @staticmethod
+    def _to_products(fields: List[Tuple[str, str]]) -> List[ProductRef]:
+        return [ProductRef(title, href) for title, href in fields]
+
+    def parse(self, content: str) -> List[ProductRef]:
+        return self._to_products(self.pool.submit_category(content).result())
+
+    async def aparse(self, content: str) -> List[ProductRef]:
+        return self._to_products(await asyncio.wrap_future(self.pool.submit_category(content)))
+
+
+class PooledProductParser(PageParser):
+    """Парсер карточек товара, который выполняет разбор в ParsePool"""
+
+    def __init__(self, pool: ParsePool):
+        self.pool = pool
+
+    def submit(self, content: str) -> Future:
+        return self.pool.submit_product(content)
+
+    def parse(self, content: str) -> Dict[str, Any]:
+        return self.submit(content).result()
+
+    async def aparse(self, content: str) -> Dict[str, Any]:
+        return await asyncio.wrap_future(self.submit(content))
+
+
+async def aparse_with(parser: PageParser, content: str) -> Any:
+    """Разбор из корутины: пулу - без блокировки event loop, обычному парсеру - напрямую"""
+    aparse = getattr(parser, 'aparse', None)
+    if aparse is not None:
+        return await aparse(content)
+    return parser.parse(content)
@@ -1,7 +1,19 @@
 from .categories_from_catalog import CatalogParser
 from .products_from_category import CategoryParser
 from .detailed_product_from_product import ProductDetailsParser
+from .detailed_product_from_product_lxml import LxmlProductDetailsParser
+from .prefilter import PageKind, Prefiltered, prefilter_category_page, prefilter_product_page
+from .sitemap import SitemapEntry, SitemapParser
+from .timed import TimedParser
 
-__all__ = ['CatalogParser', 'CategoryParser', 'ProductDetailsParser']
+# Движки разбора карточек товара: одинаковый результат, lxml заметно быстрее
+PRODUCT_PARSER_ENGINES = {
+    'bs4': ProductDetailsParser,
+    'lxml': LxmlProductDetailsParser,
+}
+
+__all__ = ['CatalogParser', 'CategoryParser', 'ProductDetailsParser', 'LxmlProductDetailsParser',
+           'PageKind', 'Prefiltered', 'prefilter_category_page', 'prefilter_product_page',
+           'SitemapEntry', 'SitemapParser', 'TimedParser', 'PRODUCT_PARSER_ENGINES']
 
 # устройство файла инициализатора
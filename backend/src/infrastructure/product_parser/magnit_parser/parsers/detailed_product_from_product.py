@@ -4,6 +4,7 @@ from typing import Optional, Dict, Any
 from bs4 import BeautifulSoup
 
 from .base import PageParser
+from .prefilter import prefilter_product_page
 
 
 class Selectors(Enum):
@@ -12,6 +13,7 @@ class Selectors(Enum):
     characteristics_name = 'span[data-test-id*="item-name"]'
     characteristics_value = 'span[data-test-id*="item-value"]'
     nutrition = 'section.product-details-nutrition-facts div[data-test-id="v-product-details-nutrition-fact-value"]'
+    price = 'span.product-details-price__current'
     bulk_food_weight = 'span.pl-text.product-details-price__weight[data-test-id="v-text"][data-test-id="v-product-detail-weight"]'
 
 
@@ -20,10 +22,11 @@ class ProductDetailsParser(PageParser):
         self._selectors = Selectors
 
     def parse(self, content: str) -> Dict[str, Any]:
-        if not content:
+        page = prefilter_product_page(content)
+        if not page.is_valid:
             return {}
 
-        soup = BeautifulSoup(content, 'lxml')
+        soup = BeautifulSoup(page.fragment, 'lxml')
         details = soup.select_one(self._selectors.details.value)
 
         if not details:
@@ -33,6 +36,7 @@ class ProductDetailsParser(PageParser):
             'characteristics': self._extract_characteristics(details),
             'nutrition_facts': self._extract_nutrition(details),
             'is_food_by_weight': self._extract_weight_for_check_food_is_bulk(details),
+            'price': self._extract_price(soup),
         }
 
     def _extract_characteristics(self, soup: BeautifulSoup) -> Dict[str, str]:
@@ -57,6 +61,13 @@ class ProductDetailsParser(PageParser):
             return False
         return True
 
+    def _extract_price(self, soup: BeautifulSoup) -> Optional[str]:
+        # Блок цены находится вне контейнера с характеристиками
+        price = soup.select_one(self._selectors.price.value)
+        if not price:
+            return None
+        return price.get_text(strip=True) or None
+
     def _extract_nutrition(self, soup: BeautifulSoup) -> Optional[Dict[str, str]]:
         values = soup.select(self._selectors.nutrition.value)
 
@@ -0,0 +1,112 @@
+from typing import Optional, Dict, Any, List
+
+from lxml import etree, html
+
+from .base import PageParser
+from .prefilter import prefilter_product_page
+
+
+def _has_class(name: str) -> str:
+    """XPath-аналог CSS селектора .name"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class XPaths:
+    """XPath-аналоги селекторов из detailed_product_from_product.Selectors"""
+    details = f"(//div[{_has_class('unit-product-details__details-container')}])[1]"
+    characteristics_item = f".//*[{_has_class('product-details-parameters-list__item')}]"
+    characteristics_name = "(.//span[contains(@data-test-id, 'item-name')])[1]"
+    characteristics_value = "(.//span[contains(@data-test-id, 'item-value')])[1]"
+    nutrition = (".//div[@data-test-id='v-product-details-nutrition-fact-value']"
+                 f"[ancestor::section[{_has_class('product-details-nutrition-facts')}]]")
+    price = f"(//span[{_has_class('product-details-price__current')}])[1]"
+    # Как и в CSS селекторе, data-test-id должен одновременно равняться двум значениям
+    bulk_food_weight = (f".//span[{_has_class('pl-text')} and {_has_class('product-details-price__weight')}"
+                        " and @data-test-id='v-text' and @data-test-id='v-product-detail-weight']")
+    # BeautifulSoup.get_text не учитывает содержимое script, style и template
+    text = ".//text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::template)]"
+
+
+class LxmlProductDetailsParser(PageParser):
+    """
+    Быстрый вариант ProductDetailsParser: lxml.html и XPath, скомпилированные один раз
+    при создании парсера, вместо BeautifulSoup и CSS селекторов.
+    Возвращает те же словари, что и ProductDetailsParser
+    """
+
+    def __init__(self):
+        self._html_parser = html.HTMLParser(encoding='utf-8')
+        self._details = etree.XPath(XPaths.details)
+        self._characteristics_item = etree.XPath(XPaths.characteristics_item)
+        self._characteristics_name = etree.XPath(XPaths.characteristics_name)
+        self._characteristics_value = etree.XPath(XPaths.characteristics_value)
+        self._nutrition = etree.XPath(XPaths.nutrition)
+        self._price = etree.XPath(XPaths.price)
+        self._bulk_food_weight = etree.XPath(XPaths.bulk_food_weight)
+        self._text = etree.XPath(XPaths.text, smart_strings=False)
+
+    def parse(self, content: str) -> Dict[str, Any]:
+        page = prefilter_product_page(content)
+        if not page.is_valid:
+            return {}
+
+        try:
+            root = html.document_fromstring(page.fragment.encode('utf-8'), parser=self._html_parser)
+        except etree.ParserError:  # Документ без элементов
+            return {}
+
+        found = self._details(root)
+        if not found:
+            return {}
+        details = found[0]
+
+        return {
+            'characteristics': self._extract_characteristics(details),
+            'nutrition_facts': self._extract_nutrition(details),
+            'is_food_by_weight': self._extract_weight_for_check_food_is_bulk(details),
+            'price': self._extract_price(root),
+        }
+
+    def _get_text(self, element: etree._Element) -> str:
+        """Аналог BeautifulSoup get_text(strip=True)"""
+        return ''.join(text.strip() for text in self._text(element))
+
+    def _extract_characteristics(self, details: etree._Element) -> Dict[str, str]:
+        characteristics = {}
+
+        for item in self._characteristics_item(details):
+            name = self._characteristics_name(item)
+            value = self._characteristics_value(item)
+
+            if name and value:
+                name_text = self._get_text(name[0])
+                value_text = self._get_text(value[0])
+                if name_text and value_text:
+                    characteristics[name_text] = value_text
+
+        return characteristics
+
+    def _extract_weight_for_check_food_is_bulk(self, details: etree._Element) -> bool:
+        return bool(self._bulk_food_weight(details))
+
+    def _extract_price(self, root: etree._Element) -> Optional[str]:
+        # Блок цены находится вне контейнера с характеристиками
+        price = self._price(root)
+        if not price:
+            return None
+        return self._get_text(price[0]) or None
+
+    def _extract_nutrition(self, details: etree._Element) -> Optional[Dict[str, str]]:
+        values: List[etree._Element] = self._nutrition(details)
+
+        if len(values) < 4:
+            return None
+
+        facts = {
+            'kilocalories': self._get_text(values[0]),
+            'proteins': self._get_text(values[1]),
+            'fats': self._get_text(values[2]),
+            'carbohydrates': self._get_text(values[3]),
+        }
+
+        return facts if any(facts.values()) else None
@@ -0,0 +1,97 @@
+"""
+Дешевая предварительная классификация страниц до построения DOM.
+
+Страница просматривается поиском подстрок без копирования и lower(): пустые ответы
+и заглушки (капча, Cloudflare) отсекаются сразу, а из нормальной страницы вырезается
+только фрагмент с нужными элементами. Тяжелые head со стилями и скриптами
+и разметка вокруг данных в дерево не попадают.
+"""
+from enum import Enum
+from typing import NamedTuple, Optional
+
+from ...http.rate_limiter import is_blocked_page
+
+
+class PageKind(Enum):
+    EMPTY = 'empty'  # Пустой ответ
+    BLOCKED = 'blocked'  # Капча или заглушка защиты от ботов
+    NO_DATA = 'no_data'  # Обычная страница, но без искомых элементов (например, конец пагинации)
+    VALID = 'valid'
+
+
+class Prefiltered(NamedTuple):
+    kind: PageKind
+    fragment: str = ''  # Для VALID - часть страницы, достаточная для разбора
+
+    @property
+    def is_valid(self) -> bool:
+        return self.kind is PageKind.VALID
+
+
+# Класс ссылки на товар из селектора CategoryParser
+CATEGORY_LINK_MARKER = 'pl-hover-base'
+# Контейнер характеристик и блок цены из селекторов ProductDetailsParser
+PRODUCT_DETAILS_MARKER = 'unit-product-details__details-container'
+PRODUCT_PRICE_MARKER = 'product-details-price__current'
+
+
+def _classify(content: Optional[str]) -> Optional[PageKind]:
+    if not content or content.isspace():
+        return PageKind.EMPTY
+    if is_blocked_page(content):
+        return PageKind.BLOCKED
+    return None
+
+
+def _body_start(content: str) -> int:
+    # Маркеры ищутся после <body>, чтобы не найти их в стилях head
+    index = content.find('<body')
+    return index if index >= 0 else 0
+
+
+def _tag_start(content: str, index: int, lower_bound: int) -> int:
+    """Начало тега, в атрибутах которого находится index"""
+    start = content.rfind('<', lower_bound, index)
+    return start if start >= 0 else lower_bound
+
+
+def prefilter_category_page(content: Optional[str]) -> Prefiltered:
+    """
+    Фрагмент листинга категории: от первой до последней ссылки на товар включительно.
+    Селектор CategoryParser проверяет только атрибуты самой ссылки, поэтому
+    для разбора достаточно этого отрезка
+    """
+    kind = _classify(content)
+    if kind is not None:
+        return Prefiltered(kind)
+
+    body = _body_start(content)
+    first = content.find(CATEGORY_LINK_MARKER, body)
+    if first < 0:
+        return Prefiltered(PageKind.NO_DATA)
+
+    last = content.rfind(CATEGORY_LINK_MARKER, first)
+    end = content.find('</a>', last)
+    end = len(content) if end < 0 else end + len('</a>')
+    return Prefiltered(PageKind.VALID, content[_tag_start(content, first, body):end])
+
+
+def prefilter_product_page(content: Optional[str]) -> Prefiltered:
+    """
+    Фрагмент карточки товара: от блока цены или контейнера характеристик (что раньше)
+    до конца body. Без контейнера характеристик парсер вернул бы пустой результат,
+    поэтому такая страница - NO_DATA
+    """
+    kind = _classify(content)
+    if kind is not None:
+        return Prefiltered(kind)
+
+    body = _body_start(content)
+    details = content.find(PRODUCT_DETAILS_MARKER, body)
+    if details < 0:
+        return Prefiltered(PageKind.NO_DATA)
+
+    price = content.find(PRODUCT_PRICE_MARKER, body)
+    start = _tag_start(content, min(details, price) if price >= 0 else details, body)
+    end = content.find('</body>', start)
+    return Prefiltered(PageKind.VALID, content[start:end if end >= 0 else len(content)])
@@ -5,10 +5,10 @@ from pprint import pprint
 from bs4 import BeautifulSoup
 
 from .base import PageParser
-from ..schemas.category_product import CategoryProduct
+from .prefilter import PageKind, prefilter_category_page
+from ..schemas.product_ref import ProductRef
 
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -16,31 +16,34 @@ class CategoryParser(PageParser):
     def __init__(self):
         self.selector = 'a.pl-hover-base[data-test-id*="v-app-link"]'
 
-    def parse(self, content: str) -> List[CategoryProduct]:
-        if not content:
+    def parse(self, content: str) -> List[ProductRef]:
+        # DOM строится только для фрагмента со ссылками на товары; заглушки и пустые страницы отсекаются до него
+        page = prefilter_category_page(content)
+        if page.kind is PageKind.EMPTY:
             logger.warning("Пустой контент передан в парсер")
             return []
+        if page.kind is PageKind.BLOCKED:
+            logger.warning("Страница похожа на капчу или заглушку: %s символов", len(content))
+            return []
+        if page.kind is PageKind.NO_DATA:
+            logger.debug("На странице нет ссылок на товары: %s символов", len(content))
+            logger.debug("Первые 500 символов: %s", content[:500])
+            return []
 
-        logger.debug(f"Длина контента: {len(content)} символов")
+        logger.debug("Длина контента: %s символов, фрагмент для разбора: %s", len(content), len(page.fragment))
 
-        soup = BeautifulSoup(content, 'lxml')
+        soup = BeautifulSoup(page.fragment, 'lxml')
         if not soup:
             logger.warning("При преобразовании вернулся пустой суп")
             return []
 
-        # Проверка, что это действительно HTML страница с товарами
-        if "товар" not in content.lower() and len(content) < 1000:
-            logger.warning(f"Контент слишком короткий или не содержит товаров: {len(content)} символов")
-            logger.debug(f"Первые 500 символов: {content[:500]}")
-            return []
-
         selected = soup.select(self.selector)
-        logger.info(f"Найдено элементов по селектору: {len(selected)}")
+        logger.debug("Найдено элементов по селектору: %s", len(selected))
 
         if not selected:
             # Дополнительная диагностика
             all_links = soup.find_all('a')
-            logger.warning(f"Всего ссылок на странице: {len(all_links)}")
+            logger.warning("Всего ссылок на странице: %s", len(all_links))
 
             # Проверьте другие возможные селекторы
             test_selectors = [
@@ -53,17 +56,17 @@ class CategoryParser(PageParser):
             for test_selector in test_selectors:
                 test_results = soup.select(test_selector)
                 if test_results:
-                    logger.info(f"По селектору '{test_selector}' найдено: {len(test_results)}")
+                    logger.info("По селектору '%s' найдено: %s", test_selector, len(test_results))
                     break
 
-        products: List[CategoryProduct] = []
+        products: List[ProductRef] = []
         for product in selected:
             href = product.get('href', '').strip()
             title = product.get('title', '').strip()
 
             if href and title:
-                products.append(CategoryProduct(title=title, href=href))
-                logger.debug(f"Добавлен продукт: {title[:50]}...")
+                products.append(ProductRef(title, href))
+                logger.debug("Добавлен продукт: %s...", title[:50])
 
-        logger.info(f"Итоговое количество продуктов: {len(products)}")
+        logger.debug("Итоговое количество продуктов: %s", len(products))
         return products
\ No newline at end of file
@@ -0,0 +1,83 @@
+import logging
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Union
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# По сколько символов строка подается парсеру: ее копия в байтах не создается целиком
+TEXT_CHUNK = 64 * 1024
+
+SitemapSource = Union[str, bytes, Iterable[bytes], None]
+
+
+class SitemapEntry(NamedTuple):
+    """Запись карты сайта: ссылка на вложенную карту (is_sitemap) или на страницу"""
+    loc: str
+    is_sitemap: bool = False
+    title: Optional[str] = None  # image:title, если карта размечена расширением для картинок
+
+
+class SitemapParser:
+    """
+    Потоковый разбор sitemap.xml и индекса карт (sitemapindex) через XMLPullParser.
+    source - блоки тела ответа по мере загрузки (PoliteHttpClient.stream), bytes или строка.
+    Документ целиком в памяти не собирается, а разобранные элементы сразу удаляются
+    из дерева, поэтому память не растет с размером карты (до 50 000 ссылок и 50 МБ по стандарту)
+    """
+
+    def parse(self, source: SitemapSource) -> List[SitemapEntry]:
+        return list(self.iter_entries(source))
+
+    def iter_entries(self, source: SitemapSource) -> Iterator[SitemapEntry]:
+        if not source:
+            return
+
+        parser = etree.XMLPullParser(events=('end',), recover=True, resolve_entities=False, no_network=True)
+        try:
+            for chunk in self._chunks(source):
+                parser.feed(chunk)
+                yield from self._read_entries(parser)
+            parser.close()
+            yield from self._read_entries(parser)
+        except etree.XMLSyntaxError as e:
+            logger.warning("Карта сайта не разобрана: %s", e)
+
+    @staticmethod
+    def _chunks(source: SitemapSource) -> Iterator[bytes]:
+        if isinstance(source, bytes):
+            yield source
+        elif isinstance(source, str):
+            for start in range(0, len(source), TEXT_CHUNK):
+                yield source[start:start + TEXT_CHUNK].encode('utf-8')
+        else:
+            yield from source
+
+    def _read_entries(self, parser: etree.XMLPullParser) -> Iterator[SitemapEntry]:
+        for _, element in parser.read_events():
+            name = etree.QName(element).localname
+            if name not in ('url', 'sitemap'):
+                continue
+
+            entry = self._entry(element, is_sitemap=name == 'sitemap')
+            # Освобождаем разобранный элемент и уже пройденных соседей
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+            if entry is not None:
+                yield entry
+
+    @staticmethod
+    def _entry(element, is_sitemap: bool) -> Optional[SitemapEntry]:
+        loc = None
+        title = None
+        for child in element.iter(etree.Element):  # Без комментариев и инструкций
+            name = etree.QName(child).localname
+            if name == 'loc' and loc is None and child.getparent() is element:
+                loc = (child.text or '').strip()
+            elif name == 'title' and title is None:
+                title = (child.text or '').strip() or None
+        if not loc:
+            return None
+        return SitemapEntry(loc, is_sitemap, title)
@@ -0,0 +1,21 @@
+import time
+from typing import Any
+
+from .base import PageParser
+from ...metrics import CrawlMetrics
+
+
+class TimedParser(PageParser):
+    """Обертка над парсером, которая записывает время каждого разбора в CrawlMetrics"""
+
+    def __init__(self, parser: PageParser, metrics: CrawlMetrics):
+        self.parser = parser
+        self.metrics = metrics
+        self.name = type(parser).__name__
+
+    def parse(self, content: str) -> Any:
+        started = time.perf_counter()
+        try:
+            return self.parser.parse(content)
+        finally:
+            self.metrics.observe_parse(self.name, time.perf_counter() - started)
@@ -1,7 +1,8 @@
 from .category_product import CategoryProduct
+from .product_ref import ProductRef
 from .catalog_category import CatalogCategory
 from .nutrition_facts import NutritionFacts
 from .parsed_product import FoodProduct, BulkFoodProduct, NonFoodProduct
 
 
-__all__ = ['CategoryProduct', 'CatalogCategory', 'NutritionFacts', 'FoodProduct', 'BulkFoodProduct', 'NonFoodProduct']
\ No newline at end of file
+__all__ = ['CategoryProduct', 'ProductRef', 'CatalogCategory', 'NutritionFacts', 'FoodProduct', 'BulkFoodProduct', 'NonFoodProduct']
\ No newline at end of file
@@ -3,6 +3,7 @@ from typing import Annotated
 from pydantic import Field, computed_field, HttpUrl, AfterValidator, BaseModel, ConfigDict
 
 from .base import BaseSchema
+from .. import settings
 
 
 def validate_url(url: str) -> str:
@@ -21,4 +22,4 @@ class CatalogCategory(BaseSchema):
     @computed_field(alias='catalog-url')
     @property
     def url(self) -> Annotated[str, AfterValidator(validate_url)]:
-        return f'https://magnit.ru{self.href}'
+        return f'{settings.BASE_URL}{self.href}'
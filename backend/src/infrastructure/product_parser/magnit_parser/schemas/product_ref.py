@@ -0,0 +1,51 @@
+from .category_product import CategoryProduct
+from .. import settings
+
+
+class ProductRef:
+    """
+    Легкая ссылка на товар для внутреннего конвейера обхода вместо CategoryProduct:
+    без валидации и меток времени, url собирается один раз при создании.
+    В pydantic схему переводится на границе с API и хранилищем через to_schema().
+    query - параметры магазина в url карточки (см. for_store)
+    """
+    __slots__ = ('title', 'href', 'url')
+
+    def __init__(self, title: str, href: str, query: str = ''):
+        self.title = title
+        self.href = href
+        self.url = f'{settings.BASE_URL}{href}{query}'
+
+    def for_store(self, shop_code: int, shop_type: int = 1) -> 'ProductRef':
+        """
+        Ссылка на карточку в конкретном магазине: цена на странице - цена этого магазина,
+        а url с параметрами магазина разделяет кэш ответов, журнал и отпечатки разных магазинов
+        """
+        return ProductRef(self.title, self.href, f'?shopCode={shop_code}&shopType={shop_type}')
+
+    @property
+    def key(self) -> str:
+        """href вместе с параметрами магазина, если они есть: ключ карточки в FingerprintStore"""
+        _, _, query = self.url.partition('?')
+        return f'{self.href}?{query}' if query else self.href
+
+    @classmethod
+    def from_schema(cls, product: CategoryProduct) -> 'ProductRef':
+        return cls(product.title, product.href)
+
+    def to_schema(self) -> CategoryProduct:
+        """Валидированная схема; ошибки длины title/href всплывают здесь"""
+        return CategoryProduct(title=self.title, href=self.href)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ProductRef):
+            return NotImplemented
+        return self.title == other.title and self.href == other.href and self.url == other.url
+
+    def __hash__(self) -> int:
+        return hash((self.title, self.href))
+
+    def __repr__(self) -> str:
+        _, _, query = self.url.partition('?')
+        store = f', query={"?" + query!r}' if query else ''
+        return f'ProductRef(title={self.title!r}, href={self.href!r}{store})'
@@ -44,15 +44,17 @@ class TextUtils:
         if number is None:
             return None
 
-        # Конвертируем в кг
-        if 'г' in weight_text or 'грамм' in weight_text:
-            return number / Decimal('1000')
+        # Конвертируем в кг. Порядок важен: 'г' входит в 'кг' и 'мг', а 'л' - в 'мл'
+        if 'мг' in weight_text or 'миллиграмм' in weight_text:
+            return number / Decimal('1000000')
         elif 'кг' in weight_text or 'килограмм' in weight_text:
             return number
-        elif 'мг' in weight_text or 'миллиграмм' in weight_text:
-            return number / Decimal('1000000')
-        elif 'л' in weight_text and 'г' not in weight_text:  # Литр
-            return number  # Для жидкостей считаем 1л = 1кг (грубо)
+        elif 'мл' in weight_text or 'миллилитр' in weight_text:
+            return number / Decimal('1000')  # Для жидкостей считаем 1л = 1кг (грубо)
+        elif 'г' in weight_text or 'грамм' in weight_text:
+            return number / Decimal('1000')
+        elif 'л' in weight_text:  # Литр
+            return number
         else:
             # По умолчанию считаем граммами
             return number / Decimal('1000')
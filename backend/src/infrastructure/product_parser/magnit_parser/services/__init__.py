@@ -1,6 +1,7 @@
 from .product_service import ProductService
-from .category_service import CategoryService
+from .category_service import CategoryPageError, CategoryService
 from .catalog_service import CatalogService
+from .sitemap_service import SitemapService
 
 
-__all__ = ['ProductService', 'CatalogService', 'CategoryService']
+__all__ = ['ProductService', 'CatalogService', 'CategoryPageError', 'CategoryService', 'SitemapService']
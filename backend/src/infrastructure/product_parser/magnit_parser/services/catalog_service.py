@@ -1,21 +1,35 @@
-from typing import List
+from typing import List, Optional, TYPE_CHECKING
 
 from ..parsers import CatalogParser
 from ..schemas import CatalogCategory
 from ...http import PoliteHttpClient
+from .. import settings
+
+if TYPE_CHECKING:
+    from ...http.async_client import AsyncHttpClient
 
 
 class CatalogService:
-    def __init__(self, http_client: PoliteHttpClient, parser: CatalogParser):
+    def __init__(self, http_client: PoliteHttpClient, parser: CatalogParser,
+                 async_http_client: Optional['AsyncHttpClient'] = None):
         self.http = http_client
+        self.async_http = async_http_client
         self.parser = parser
-        self.base_url = "https://magnit.ru/catalog"
+        self.base_url = f"{settings.BASE_URL}/catalog"
 
     def fetch_categories(self, shop_code: int = 784507,
                          shop_type: int = 1) -> List[CatalogCategory]:
-        params = {
+        content = self.http.get(self.base_url, self._params(shop_code, shop_type))
+        return self.parser.parse(content)
+
+    async def afetch_categories(self, shop_code: int = 784507,
+                                shop_type: int = 1) -> List[CatalogCategory]:
+        content = await self.async_http.get(self.base_url, self._params(shop_code, shop_type))
+        return self.parser.parse(content)
+
+    @staticmethod
+    def _params(shop_code: int, shop_type: int) -> dict:
+        return {
             'shopType': shop_type,
             'shopCode': shop_code,
         }
-        content = self.http.get(self.base_url, params)
-        return self.parser.parse(content)
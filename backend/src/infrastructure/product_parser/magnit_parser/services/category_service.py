@@ -1,150 +1,377 @@
+import asyncio
 import logging
-import time
-from typing import List
+from typing import AsyncIterator, Iterator, List, Optional, TYPE_CHECKING
 
 from ...http import PoliteHttpClient
+from ...http.rate_limiter import has_block_markers
+from ...http.retry import FetchResult
+from ...progress import ProgressReporter
+from ..artifacts import ArtifactWriter
+from ..checkpoints import CheckpointJournal
+from ..parse_pool import aparse_with
 from ..parsers import CategoryParser
-from ..schemas import CatalogCategory, CategoryProduct
+from ..schemas import CatalogCategory, ProductRef
+
+if TYPE_CHECKING:
+    from ...http.async_client import AsyncHttpClient
 
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class CategoryPageError(Exception):
+    """
+    Страница категории не получена и после повторов (ошибка загрузки, капча, пустая первая страница).
+    В отличие от конца пагинации, товары категории после этой страницы неизвестны
+    """
+
+    def __init__(self, category: CatalogCategory, page: int):
+        super().__init__(f"Страница {page} категории '{category.title}' не получена")
+        self.category = category
+        self.page = page
+
+
 class CategoryService:
-    def __init__(self, http_client: PoliteHttpClient, parser: CategoryParser):
+    """
+    Сервис обхода страниц категорий.
+    С journal завершенные страницы берутся из журнала, а не загружаются заново.
+    artifacts сохраняет в фоне страницы, на которых обход остановился, и выборку обычных
+    """
+
+    def __init__(self, http_client: PoliteHttpClient, parser: CategoryParser,
+                 async_http_client: Optional['AsyncHttpClient'] = None,
+                 journal: Optional[CheckpointJournal] = None,
+                 artifacts: Optional[ArtifactWriter] = None):
         self.http = http_client
+        self.async_http = async_http_client
         self.parser = parser
+        self.journal = journal
+        self.artifacts = artifacts
         self._processed_pages = set()  # Для отслеживания уже обработанных страниц
+        # Категории, не обойденные до конца с последнего clear_processed_pages
+        self.failed_categories: List[CatalogCategory] = []
 
     def fetch_category_products(self, category: CatalogCategory,
                                 shop_code: int = 784507,
                                 shop_type: int = 1,
-                                max_pages: int = 5) -> List[CategoryProduct]:
+                                max_pages: int = 5) -> List[ProductRef]:
         """
         Получает товары из категории с пагинацией
         """
-        all_products: List[CategoryProduct] = []
+        return list(self.iter_category_products(category, shop_code=shop_code,
+                                                shop_type=shop_type, max_pages=max_pages))
+
+    def iter_category_products(self, category: CatalogCategory,
+                               shop_code: int = 784507,
+                               shop_type: int = 1,
+                               max_pages: int = 5) -> Iterator[ProductRef]:
+        """
+        Отдает товары категории по мере загрузки страниц, не дожидаясь конца пагинации
+        """
+        for page_products in self.iter_category_pages(category, shop_code=shop_code,
+                                                      shop_type=shop_type, max_pages=max_pages):
+            yield from page_products
+
+    def iter_category_pages(self, category: CatalogCategory,
+                            shop_code: int = 784507,
+                            shop_type: int = 1,
+                            max_pages: int = 5) -> Iterator[List[ProductRef]]:
+        """
+        Отдает товары категории постранично; следующая страница загружается
+        только когда потребитель запросит ее.
+        Неполученная страница - CategoryPageError, а не конец пагинации
+        """
+        total = 0
         page = 0  # Начинаем с 0
 
-        logger.info(f"=== Начало парсинга категории: {category.title} ===")
+        logger.debug("Начало парсинга категории: %s (%s)", category.title, category.url)
 
         while page < max_pages:
             # Создаем уникальный ключ для страницы
-            page_key = f"{category.url}_page{page}"
+            page_key = self._page_key(category, shop_code, shop_type, page)
 
             if page_key in self._processed_pages:
-                logger.warning(f"Страница {page} уже обрабатывалась, пропускаем")
+                logger.warning("Страница %d категории '%s' уже обрабатывалась, пропускаем", page, category.title)
                 page += 1
                 continue
 
-            params = {
-                'shopCode': shop_code,
-                'shopType': shop_type,
-                'page': page
-            }
-
-            logger.info(f"  Запрос страницы {page}...")
-            logger.debug(f"    URL: {category.url}")
-            logger.debug(f"    Параметры: {params}")
-
-            # ВАЖНО: Добавим временную метку для избежания кэша
-            timestamp = int(time.time())
-            params_with_timestamp = {**params, '_t': timestamp}
-
-            content = self.http.get(url=category.url, params=params_with_timestamp)
-
-            if not content:
-                logger.warning(f"    Пустой ответ, останавливаемся")
+            page_products = self.fetch_category_page(category, shop_code, shop_type, page, max_pages)
+            if page_products is None:
+                raise CategoryPageError(category, page)
+            if not page_products:
                 break
 
-            logger.debug(f"    Получено {len(content)} символов")
-
-            # Сохраняем для отладки (первую и последнюю страницу)
-            if page == 0 or page == max_pages - 1:
-                with open(f'debug_page_{category.title}_page{page}.html', 'w', encoding='utf-8') as f:
-                    f.write(content[:5000] + "\n\n..." if len(content) > 5000 else content)
-
-            page_products = self.parser.parse(content)
+            self._processed_pages.add(page_key)  # Помечаем как обработанную
+            total += len(page_products)
+            yield page_products
 
-            if not page_products:
-                logger.info(f"    Парсер не нашел товаров на странице {page}")
+            page += 1
 
-                # Проверяем, не капча ли это
-                if "captcha" in content.lower() or "cloudflare" in content.lower():
-                    logger.error(f"    ОБНАРУЖЕНА КАПЧА ИЛИ CLOUDFLARE!")
-                    break
+        logger.debug("Категория '%s': итого %d товаров", category.title, total)
 
-                # Если первая страница пустая - что-то не так
-                if page == 0:
-                    logger.error(f"    ПЕРВАЯ СТРАНИЦА ПУСТАЯ! Проверьте селектор.")
-                    break
-                else:
-                    logger.info(f"    Вероятно, это последняя страница, останавливаемся")
-                    break
+    def fetch_category_page(self, category: CatalogCategory,
+                            shop_code: int = 784507,
+                            shop_type: int = 1,
+                            page: int = 0,
+                            max_pages: int = 5) -> Optional[List[ProductRef]]:
+        """
+        Товары одной страницы категории. Пустой список - пагинация закончилась,
+        None - страницу получить не удалось (пустой ответ, капча)
+        """
+        page_products = self._restore_page(category, shop_code, shop_type, page)
+        if page_products is not None:
+            return page_products
+
+        logger.debug("Запрос страницы %d: %s", page, category.url)
+
+        result = self.http.fetch(category.url, self._page_params(shop_code, shop_type, page))
+        page_products = self._process_page(category, page, result, max_pages)
+        self._journal_page(category, shop_code, shop_type, page, page_products)
+        return page_products
+
+    async def afetch_category_page(self, category: CatalogCategory,
+                                   shop_code: int = 784507,
+                                   shop_type: int = 1,
+                                   page: int = 0,
+                                   max_pages: int = 5) -> Optional[List[ProductRef]]:
+        """Асинхронная версия fetch_category_page"""
+        page_products = self._restore_page(category, shop_code, shop_type, page)
+        if page_products is not None:
+            return page_products
+
+        logger.debug("Запрос страницы %d: %s", page, category.url)
+
+        result = await self.async_http.fetch(category.url, self._page_params(shop_code, shop_type, page))
+        page_products = await self._aprocess_page(category, page, result, max_pages)
+        self._journal_page(category, shop_code, shop_type, page, page_products)
+        return page_products
+
+    async def afetch_category_products(self, category: CatalogCategory,
+                                       shop_code: int = 784507,
+                                       shop_type: int = 1,
+                                       max_pages: int = 5) -> List[ProductRef]:
+        """
+        Асинхронная версия fetch_category_products
+        """
+        all_products: List[ProductRef] = []
+        async for page_products in self.aiter_category_pages(category, shop_code=shop_code,
+                                                             shop_type=shop_type, max_pages=max_pages):
+            all_products.extend(page_products)
+        return all_products
 
-            logger.info(f"    На странице {page} найдено: {len(page_products)} товаров")
+    async def aiter_category_pages(self, category: CatalogCategory,
+                                   shop_code: int = 784507,
+                                   shop_type: int = 1,
+                                   max_pages: int = 5) -> AsyncIterator[List[ProductRef]]:
+        """
+        Асинхронно отдает товары категории постранично.
+        Страницы одной категории запрашиваются последовательно, так как конец пагинации
+        определяется по первой пустой странице; паузы задает AsyncHttpClient.
+        Неполученная страница - CategoryPageError, как в iter_category_pages
+        """
+        total = 0
 
-            # Логируем несколько товаров для примера
-            for i, prod in enumerate(page_products[:3]):  # Первые 3 товара
-                logger.debug(f"      Товар {i + 1}: {prod.title[:50]}...")
+        logger.debug("Начало парсинга категории: %s (%s)", category.title, category.url)
 
-            all_products.extend(page_products)
-            self._processed_pages.add(page_key)  # Помечаем как обработанную
+        for page in range(max_pages):
+            page_key = self._page_key(category, shop_code, shop_type, page)
 
-            page += 1
+            if page_key in self._processed_pages:
+                logger.warning("Страница %d категории '%s' уже обрабатывалась, пропускаем", page, category.title)
+                continue
 
-            # Пауза между запросами
-            time.sleep(0.3)
+            page_products = await self.afetch_category_page(category, shop_code, shop_type, page, max_pages)
+            if page_products is None:
+                raise CategoryPageError(category, page)
+            if not page_products:
+                break
 
-        logger.info(f"=== Категория '{category.title}': итого {len(all_products)} товаров ===\n")
-        return all_products
+            self._processed_pages.add(page_key)
+            total += len(page_products)
+            yield page_products
+
+        logger.debug("Категория '%s': итого %d товаров", category.title, total)
+
+    def _restore_page(self, category: CatalogCategory, shop_code: int, shop_type: int,
+                      page: int) -> Optional[List[ProductRef]]:
+        """Товары страницы из журнала; пустой список - на этой странице пагинация закончилась"""
+        if self.journal is None:
+            return None
+        saved = self.journal.category_page(category.url, shop_code, shop_type, page)
+        if saved is None:
+            return None
+        products, is_last = saved
+        logger.debug("Страница %d восстановлена из журнала: %d товаров", page, len(products))
+        return [] if is_last else products
+
+    def _journal_page(self, category: CatalogCategory, shop_code: int, shop_type: int,
+                      page: int, page_products: Optional[List[ProductRef]]) -> None:
+        # None - аварийная остановка (капча, ошибка сети): такую страницу нужно повторить
+        if self.journal is not None and page_products is not None:
+            self.journal.record_page(category.url, shop_code, shop_type, page, page_products,
+                                     is_last=not page_products)
+
+    @staticmethod
+    def _page_key(category: CatalogCategory, shop_code: int, shop_type: int, page: int) -> str:
+        # Ассортимент зависит от магазина, поэтому одна и та же страница разных магазинов - разные страницы
+        return f"{category.url}_{shop_code}_{shop_type}_page{page}"
+
+    @staticmethod
+    def _page_params(shop_code: int, shop_type: int, page: int) -> dict:
+        return {
+            'shopCode': shop_code,
+            'shopType': shop_type,
+            'page': page,
+        }
+
+    def _process_page(self, category: CatalogCategory, page: int,
+                      result: FetchResult, max_pages: int) -> Optional[List[ProductRef]]:
+        """
+        Разбирает загруженную страницу категории.
+        Возвращает пустой список, если пагинация закончилась, и None при аварийной остановке
+        """
+        if not self._accept_content(category, page, result, max_pages):
+            return None
+        return self._check_page_products(category, page, result.content, self.parser.parse(result.content))
+
+    async def _aprocess_page(self, category: CatalogCategory, page: int,
+                             result: FetchResult, max_pages: int) -> Optional[List[ProductRef]]:
+        """Как _process_page, но разбор в пуле процессов не блокирует event loop"""
+        if not self._accept_content(category, page, result, max_pages):
+            return None
+        return self._check_page_products(category, page, result.content,
+                                         await aparse_with(self.parser, result.content))
+
+    def _accept_content(self, category: CatalogCategory, page: int,
+                        result: FetchResult, max_pages: int) -> bool:
+        # Капча приходит с текстом: ее распознает и сохранит _check_page_products
+        content = result.content
+        if not content:
+            # Повторы уже исчерпаны; страница не попадает в журнал, и перезапуск загрузит ее снова
+            logger.warning("Страница %d категории '%s' не загружена (%s), останавливаемся",
+                           page, category.title, result.describe() if not result.ok else 'пустой ответ')
+            return False
+
+        logger.debug("Получено %d символов", len(content))
+
+        # Выборка обычных страниц для отладки; запись в фоне, обход не ждет диск
+        if self.artifacts:
+            self.artifacts.sample(self._artifact_name(category, page), content)
+
+        return True
+
+    @staticmethod
+    def _artifact_name(category: CatalogCategory, page: int) -> str:
+        return f'{category.title}_page{page}'
+
+    def _check_page_products(self, category: CatalogCategory, page: int, content: str,
+                             page_products: List[ProductRef]) -> Optional[List[ProductRef]]:
+        if not page_products:
+            logger.debug("Парсер не нашел товаров на странице %d", page)
+
+            # Проверяем, не капча ли это (поиск без регистра, без копии страницы в нижнем регистре)
+            if has_block_markers(content):
+                logger.error("Капча или Cloudflare на странице %d категории '%s'", page, category.title)
+                if self.artifacts:
+                    self.artifacts.failure('blocked', self._artifact_name(category, page), content)
+                return None
+
+            # Если первая страница пустая - что-то не так
+            if page == 0:
+                logger.error("Первая страница категории '%s' пустая, проверьте селектор", category.title)
+                if self.artifacts:
+                    self.artifacts.failure('empty_first_page', self._artifact_name(category, page), content)
+                return None
+
+            logger.debug("Вероятно, это последняя страница, останавливаемся")
+            return []
+
+        logger.debug("На странице %d найдено: %d товаров, например %s",
+                     page, len(page_products), [prod.title[:50] for prod in page_products[:3]])
+
+        return page_products
 
     def fetch_multiple_products(self, categories: List[CatalogCategory],
                                 shop_code: int = 784507,
                                 shop_type: int = 1,
-                                max_pages: int = 5) -> List[CategoryProduct]:
+                                max_pages: int = 5) -> List[ProductRef]:
         """
         Парсит товары из нескольких категорий
         """
-        results = []
-
-        # Очищаем кэш HTTP-клиента перед началом
-        logger.info("Очищаем кэш HTTP-клиента...")
-        self.http.clear_cache()
+        return list(self.iter_multiple_products(categories, shop_code=shop_code,
+                                                shop_type=shop_type, max_pages=max_pages))
 
+    def iter_multiple_products(self, categories: List[CatalogCategory],
+                               shop_code: int = 784507,
+                               shop_type: int = 1,
+                               max_pages: int = 5) -> Iterator[ProductRef]:
+        """
+        Отдает товары из нескольких категорий по одному, сразу после разбора страницы.
+        Вместо строк на каждую категорию в лог периодически уходит сводка ProgressReporter
+        """
         # Очищаем отслеживание страниц
-        self._processed_pages.clear()
-
-        for i, category in enumerate(categories, 1):
-            logger.info(f"\n{'=' * 50}")
-            logger.info(f"Обработка категории {i}/{len(categories)}")
-            logger.info(f"Категория: {category.title}")
-            logger.info(f"URL: {category.url}")
-            logger.info(f"{'=' * 50}")
-
-            try:
-                products: List[CategoryProduct] = self.fetch_category_products(
-                    category,
-                    shop_code=shop_code,
-                    shop_type=shop_type,
-                    max_pages=max_pages
-                )
-                results.extend(products)
-                logger.info(f"✓ Категория '{category.title}' обработана: {len(products)} товаров")
-
-            except Exception as e:
-                logger.error(f"✗ Ошибка обработки '{category.title}': {e}", exc_info=True)
-
-            # Увеличиваем паузу между категориями
-            time.sleep(1.0)  # 1 секунда между категориями
-
-        logger.info(f"\n{'=' * 50}")
-        logger.info(f"ВСЕГО СОБРАНО ТОВАРОВ: {len(results)}")
-        logger.info(f"{'=' * 50}")
-
+        self.clear_processed_pages()
+
+        with ProgressReporter('Категории', total=len(categories), log=logger) as progress:
+            for category in categories:
+                try:
+                    for page_products in self.iter_category_pages(category, shop_code=shop_code,
+                                                                  shop_type=shop_type, max_pages=max_pages):
+                        progress.count(pages=1, products=len(page_products))
+                        yield from page_products
+                    progress.advance()
+
+                except CategoryPageError as e:
+                    # Причина (капча, ошибка загрузки) уже в логе; товары после этой страницы потеряны
+                    logger.error("✗ %s", e)
+                    self.record_failure(category)
+                    progress.advance(errors=1)
+                except Exception as e:
+                    logger.error("✗ Ошибка обработки '%s': %s", category.title, e, exc_info=True)
+                    self.record_failure(category)
+                    progress.advance(errors=1)
+
+    async def afetch_multiple_products(self, categories: List[CatalogCategory],
+                                       shop_code: int = 784507,
+                                       shop_type: int = 1,
+                                       max_pages: int = 5) -> List[ProductRef]:
+        """
+        Асинхронно парсит товары из нескольких категорий одновременно
+        """
+        self.clear_processed_pages()
+
+        with ProgressReporter('Категории', total=len(categories), log=logger) as progress:
+            batches = await asyncio.gather(
+                *(self._afetch_category_with_progress(category, progress, shop_code=shop_code,
+                                                      shop_type=shop_type, max_pages=max_pages)
+                  for category in categories),
+                return_exceptions=True,
+            )
+
+        results: List[ProductRef] = []
+        for category, products in zip(categories, batches):
+            if isinstance(products, Exception):
+                logger.error("✗ Ошибка обработки '%s': %s", category.title, products)
+                continue
+            results.extend(products)
         return results
 
+    async def _afetch_category_with_progress(self, category: CatalogCategory, progress: ProgressReporter,
+                                             **kwargs) -> List[ProductRef]:
+        try:
+            products = await self.afetch_category_products(category, **kwargs)
+        except Exception:
+            self.record_failure(category)
+            progress.advance(errors=1)
+            raise
+        progress.advance(products=len(products))
+        return products
+
+    def record_failure(self, category: CatalogCategory) -> None:
+        """Категория обойдена не до конца: ее товары за этот обход известны не все"""
+        self.failed_categories.append(category)
+
     def clear_processed_pages(self):
-        """Очищает список обработанных страниц"""
-        self._processed_pages.clear()
\ No newline at end of file
+        """Очищает список обработанных страниц и не обойденных категорий перед новым обходом"""
+        self._processed_pages.clear()
+        self.failed_categories = []
\ No newline at end of file
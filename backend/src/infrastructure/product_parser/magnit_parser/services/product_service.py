@@ -1,29 +1,117 @@
+import asyncio
 import logging
-import time
-from typing import List, Any, Dict
+from collections import deque
+from concurrent.futures import Future
+from contextlib import nullcontext
+from typing import Deque, List, Any, Dict, Iterable, Iterator, Optional, Sized, Tuple, Union, TYPE_CHECKING
 
-from ...http import PoliteHttpClient
+from ...http import FetchResult, PoliteHttpClient
+from ...progress import ProgressReporter
+from ..checkpoints import CheckpointJournal
+from ..fingerprints import FingerprintStore, Observation
+from ..parse_pool import PooledProductParser, aparse_with
 from ..parsers import ProductDetailsParser
-from ..schemas import CategoryProduct
+from ..schemas import ProductRef
+
+if TYPE_CHECKING:
+    from ...http.async_client import AsyncHttpClient
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class ProductService:
-    """Сервис для работы с товарами"""
+    """
+    Сервис для работы с товарами.
+    С fingerprints неизмененные с прошлого запуска карточки не разбираются заново,
+    а берется сохраненный результат. С journal уже загруженные в прерванном
+    обходе карточки не загружаются повторно
+    """
 
-    def __init__(self, http_client: PoliteHttpClient, parser: ProductDetailsParser):
+    def __init__(self, http_client: PoliteHttpClient, parser: ProductDetailsParser,
+                 async_http_client: Optional['AsyncHttpClient'] = None,
+                 fingerprints: Optional[FingerprintStore] = None,
+                 journal: Optional[CheckpointJournal] = None):
         self.http = http_client
+        self.async_http = async_http_client
         self.parser = parser
+        self.fingerprints = fingerprints
+        self.journal = journal
+
+    def fingerprint_run(self, full_catalog: bool = False):
+        """
+        Контекст запуска для отчета о новых/измененных/пропавших товарах.
+        full_catalog - запуск обходит весь каталог, и не встреченные в нем товары считаются пропавшими
+        """
+        return self.fingerprints.run(full_catalog) if self.fingerprints else nullcontext()
+
+    def fetch_product_details(self, product: ProductRef) -> Dict[str, Any]:
+        restored = self._restore(product)
+        if restored is not None:
+            return restored
+
+        return self._journal_result(product, self._build_details(product, self.http.fetch(product.url)))
+
+    async def afetch_product_details(self, product: ProductRef) -> Dict[str, Any]:
+        restored = self._restore(product)
+        if restored is not None:
+            return restored
+
+        result = await self.async_http.fetch(product.url)
+        if not result.ok:
+            return self._failure_details(product, result)
+
+        content = result.content
+        observation = self._observe(product, content, self.async_http)
+        if observation and observation.previous_result is not None:
+            return self._journal_result(product, self._decorate_details(product, observation.previous_result))
+
+        details = await aparse_with(self.parser, content)
+        self._remember(observation, details)
+        return self._journal_result(product, self._decorate_details(product, details))
+
+    def _restore(self, product: ProductRef) -> Optional[Dict[str, Any]]:
+        """Результат из журнала прерванного обхода"""
+        restored = self.journal.product_result(product.url) if self.journal else None
+        if restored is not None:
+            self._mark_seen(product)
+        return restored
 
-    def fetch_product_details(self, product: CategoryProduct) -> Dict[str, Any]:
-        content = self.http.get(product.url)
+    def _mark_seen(self, product: ProductRef) -> None:
+        # Товар есть в каталоге, хотя страница в этом запуске не сверялась
+        if self.fingerprints is not None:
+            self.fingerprints.mark_seen(product.key)
 
-        if not content:
-            return {}
+    def _journal_result(self, product: ProductRef, result: Dict[str, Any]) -> Dict[str, Any]:
+        # Ошибку загрузки или разбора при перезапуске нужно повторить, поэтому в журнал она не попадает
+        if self.journal is not None and result and 'error' not in result:
+            self.journal.record_product(product.url, result)
+        return result
+
+    def _build_details(self, product: ProductRef, result: FetchResult) -> Dict[str, Any]:
+        if not result.ok:
+            return self._failure_details(product, result)
+
+        content = result.content
+        observation = self._observe(product, content, self.http)
+        if observation and observation.previous_result is not None:
+            return self._decorate_details(product, observation.previous_result)
 
         details = self.parser.parse(content)
+        self._remember(observation, details)
+        return self._decorate_details(product, details)
+
+    def _observe(self, product: ProductRef, content: str, client: Any) -> Optional[Observation]:
+        if self.fingerprints is None:
+            return None
+        cached = client.cached_response(product.url)
+        return self.fingerprints.observe(product.key, content, cached.etag if cached else None)
+
+    def _remember(self, observation: Optional[Observation], details: Dict[str, Any]) -> None:
+        if observation is not None:
+            self.fingerprints.save(observation, details)
+
+    @staticmethod
+    def _decorate_details(product: ProductRef, details: Dict[str, Any]) -> Dict[str, Any]:
         details.update({
             'title': product.title,
             'url': product.url,
@@ -34,24 +122,150 @@ class ProductService:
 
         return details
 
-    def fetch_multiple_details(self, products: List[CategoryProduct]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
+    def _error_details(self, product: ProductRef, error: Exception) -> Dict[str, Any]:
+        self._mark_seen(product)
+        return {
+            'title': product.title,
+            'url': product.url,
+            'error': str(error),
+            'success': False
+        }
+
+    def _failure_details(self, product: ProductRef, result: FetchResult) -> Dict[str, Any]:
+        """Карточка не загружена и после повторов: вид ошибки сохраняется для отчета и повторного обхода"""
+        self._mark_seen(product)
+        logger.warning("Карточка %s не загружена: %s", product.url, result.describe())
+        return {
+            'title': product.title,
+            'url': product.url,
+            'error': result.describe(),
+            'failure': result.failure.value,
+            'status': result.status,
+            'success': False
+        }
+
+    def fetch_multiple_details(self, products: List[ProductRef], full_catalog: bool = False) -> List[Dict[str, Any]]:
+        return list(self.iter_multiple_details(products, full_catalog))
 
-        for i, product in enumerate(products, 1):
-            logger.info(f"Processing product {i}/{len(products)}")
+    def iter_multiple_details(self, products: Iterable[ProductRef],
+                              full_catalog: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Отдает карточки товаров по мере загрузки.
+        products может быть генератором (например, CategoryService.iter_multiple_products),
+        тогда каждый найденный товар сразу уходит на загрузку карточки.
+        Ход загрузки периодически сводкой пишет ProgressReporter.
+        full_catalog - products это весь каталог (см. fingerprint_run)
+        """
+        total = len(products) if isinstance(products, Sized) else None
+        with self.fingerprint_run(full_catalog), ProgressReporter('Товары', total=total, log=logger) as progress:
+            if isinstance(self.parser, PooledProductParser):
+                details = self._iter_pooled_details(products)
+            else:
+                details = self._iter_details(products)
+            for result in details:
+                self._track(progress, result)
+                yield result
 
+    @staticmethod
+    def _track(progress: ProgressReporter, result: Dict[str, Any]) -> None:
+        if 'failure' in result:
+            progress.advance(**{f"failed_{result['failure']}": 1})
+        elif 'error' in result:
+            progress.advance(errors=1)
+        else:
+            progress.advance()
+
+    def _iter_details(self, products: Iterable[ProductRef]) -> Iterator[Dict[str, Any]]:
+        for product in products:
             try:
-                result = self.fetch_product_details(product)
-                results.append(result)
+                yield self.fetch_product_details(product)
             except Exception as e:
-                logger.error(f"Error processing {product.title}: {e}")
-                results.append({
-                    'title': product.title,
-                    'url': product.url,
-                    'error': str(e),
-                    'success': False
-                })
+                logger.error("Error processing %s: %s", product.title, e)
+                yield self._error_details(product, e)
+
+    def _iter_pooled_details(self, products: Iterable[ProductRef]) -> Iterator[Dict[str, Any]]:
+        """
+        Конвейер для пула процессов: пока воркеры разбирают загруженные страницы,
+        загружаются следующие. Порядок результатов сохраняется, в работе не больше
+        двух страниц на воркер
+        """
+        window: Deque[Tuple[ProductRef, Union[Future, Dict[str, Any]], Optional[Observation]]] = deque()
+        limit = self.parser.pool.workers * 2
+
+        for product in products:
+            try:
+                window.append(self._submit_pooled(product))
+            except Exception as e:
+                logger.error("Error processing %s: %s", product.title, e)
+                window.append((product, self._error_details(product, e), None))
+
+            while len(window) > limit:
+                yield self._resolve_pooled(*window.popleft())
+
+        while window:
+            yield self._resolve_pooled(*window.popleft())
+
+    def _submit_pooled(self, product: ProductRef
+                       ) -> Tuple[ProductRef, Union[Future, Dict[str, Any]], Optional[Observation]]:
+        """Загружает карточку и отправляет ее в пул, если результат нельзя взять готовым"""
+        restored = self._restore(product)
+        if restored is not None:
+            return product, restored, None
+
+        result = self.http.fetch(product.url)
+        if not result.ok:
+            return product, self._failure_details(product, result), None
+
+        content = result.content
+        observation = self._observe(product, content, self.http)
+        if observation and observation.previous_result is not None:
+            previous = self._decorate_details(product, observation.previous_result)
+            return product, self._journal_result(product, previous), None
+
+        return product, self.parser.submit(content), observation
+
+    def _resolve_pooled(self, product: ProductRef,
+                        pending: Union[Future, Dict[str, Any]],
+                        observation: Optional[Observation]) -> Dict[str, Any]:
+        if not isinstance(pending, Future):
+            return pending
+        try:
+            details = pending.result()
+            self._remember(observation, details)
+            return self._journal_result(product, self._decorate_details(product, details))
+        except Exception as e:
+            logger.error("Error processing %s: %s", product.title, e)
+            return self._error_details(product, e)
+
+    async def afetch_details_or_error(self, product: ProductRef) -> Dict[str, Any]:
+        """Как afetch_product_details, но ошибка возвращается словарем, а не исключением"""
+        try:
+            return await self.afetch_product_details(product)
+        except Exception as e:
+            logger.error("Error processing %s: %s", product.title, e)
+            return self._error_details(product, e)
+
+    async def afetch_multiple_details(self, products: List[ProductRef],
+                                      progress: Optional[ProgressReporter] = None,
+                                      full_catalog: bool = False) -> List[Dict[str, Any]]:
+        """
+        Асинхронно загружает карточки товаров; порядок результатов совпадает с порядком products.
+        progress - общая сводка нескольких вызовов (например, по категориям), ее завершает вызывающий.
+        full_catalog - products это весь каталог (см. fingerprint_run)
+        """
+        if progress is not None:
+            progress.add_total(len(products))
+            return await self._afetch_all(products, progress, full_catalog)
+        with ProgressReporter('Товары', total=len(products), log=logger) as progress:
+            return await self._afetch_all(products, progress, full_catalog)
 
-            time.sleep(0.1)
+    async def _afetch_all(self, products: List[ProductRef], progress: ProgressReporter,
+                          full_catalog: bool) -> List[Dict[str, Any]]:
+        with self.fingerprint_run(full_catalog):
+            return list(await asyncio.gather(*(self.afetch_tracked(product, progress) for product in products)))
 
-        return results
+    async def afetch_tracked(self, product: ProductRef, progress: ProgressReporter) -> Dict[str, Any]:
+        """afetch_details_or_error с отметкой результата в сводке progress"""
+        result = await self.afetch_details_or_error(product)
+        self._track(progress, result)
+        return result
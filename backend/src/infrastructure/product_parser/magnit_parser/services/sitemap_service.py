@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlsplit
+
+from ...http import PoliteHttpClient, TransportError
+from ..parsers import SitemapEntry, SitemapParser
+from ..schemas import ProductRef
+from .. import settings
+
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_PATHS = ('/product/', '/promo-product/')
+
+
+class SitemapService:
+    """
+    Поиск товаров по карте сайта вместо постраничного обхода HTML листингов.
+    Индекс карт обходится в ширину, из вложенных карт берутся ссылки на карточки товаров.
+    Карта не привязана к магазину и категориям: она дает весь ассортимент сайта.
+    Если карта недоступна или в ней нет товаров, iter_products ничего не отдает,
+    и вызывающий код возвращается к обходу категорий (CategoryService).
+    Карты загружаются потоково (PoliteHttpClient.stream) и разбираются по мере чтения:
+    XML карты целиком в памяти не держится, остаются только найденные ссылки.
+    max_sitemaps - предел числа загружаемых карт на случай зацикленного индекса
+    """
+
+    def __init__(self, http_client: PoliteHttpClient, parser: SitemapParser, max_sitemaps: int = 200):
+        self.http = http_client
+        self.parser = parser
+        self.max_sitemaps = max_sitemaps
+        self.sitemap_url = f"{settings.BASE_URL}/sitemap.xml"
+        # Карты последнего обхода, загруженные не полностью или недоступные: товары из них могли не попасть
+        self.failed_sitemaps = 0
+        self._failures_lock = threading.Lock()  # Карты читаются и в потоках (afetch_products)
+
+    def iter_products(self) -> Iterator[ProductRef]:
+        """Товары из карты сайта по мере загрузки вложенных карт"""
+        queue, seen_sitemaps, seen_products = self._start()
+        while queue:
+            url = queue.popleft()
+            # Карта дочитывается до того, как товары уйдут потребителю: соединение
+            # не остается открытым, пока загружаются карточки
+            yield from self._process(url, self._read_entries(url), queue, seen_sitemaps, seen_products)
+        self._finish(seen_sitemaps, seen_products)
+
+    async def afetch_products(self) -> List[ProductRef]:
+        """
+        Асинхронная версия iter_products: вложенные карты одного уровня загружаются параллельно
+        в потоках через тот же потоковый клиент, лимит запросов у них общий с асинхронным
+        """
+        queue, seen_sitemaps, seen_products = self._start()
+        products: List[ProductRef] = []
+        while queue:
+            level = list(queue)
+            queue.clear()
+            entries = await asyncio.gather(*(asyncio.to_thread(self._read_entries, url) for url in level))
+            for url, map_entries in zip(level, entries):
+                products.extend(self._process(url, map_entries, queue, seen_sitemaps, seen_products))
+        self._finish(seen_sitemaps, seen_products)
+        return products
+
+    def _read_entries(self, url: str) -> Optional[List[SitemapEntry]]:
+        """Записи карты, разобранные по мере загрузки; None - карта недоступна"""
+        entries: List[SitemapEntry] = []
+        with self.http.stream(url) as (result, chunks):
+            if not result.ok:
+                logger.warning("  Карта %s недоступна: %s", url, result.describe())
+                self._record_failure()
+                return None
+            try:
+                entries.extend(self.parser.iter_entries(chunks))
+            except TransportError as e:
+                logger.warning("  Карта %s загружена не полностью (%s записей): %s", url, len(entries), e)
+                self._record_failure()
+        return entries
+
+    def _record_failure(self) -> None:
+        with self._failures_lock:
+            self.failed_sitemaps += 1
+
+    def _start(self) -> Tuple[Deque[str], Set[str], Set[str]]:
+        logger.info("=== Поиск товаров по карте сайта: %s ===", self.sitemap_url)
+        self.failed_sitemaps = 0
+        return deque([self.sitemap_url]), {self.sitemap_url}, set()
+
+    def _process(self, url: str, entries: Optional[Iterable[SitemapEntry]], queue: Deque[str],
+                 seen_sitemaps: Set[str], seen_products: Set[str]) -> Iterator[ProductRef]:
+        if entries is None:
+            return
+
+        found = 0
+        for entry in entries:
+            if entry.is_sitemap:
+                if entry.loc not in seen_sitemaps and len(seen_sitemaps) < self.max_sitemaps:
+                    seen_sitemaps.add(entry.loc)
+                    queue.append(entry.loc)
+                continue
+
+            product = self._product(entry)
+            if product is not None and product.href not in seen_products:
+                seen_products.add(product.href)
+                found += 1
+                yield product
+
+        logger.info("  Карта %s: %s товаров", url, found)
+
+    @staticmethod
+    def _finish(seen_sitemaps: Set[str], seen_products: Set[str]) -> None:
+        logger.info("=== Карта сайта: %s карт, %s товаров ===", len(seen_sitemaps), len(seen_products))
+
+    @staticmethod
+    def _product(entry: SitemapEntry) -> Optional[ProductRef]:
+        """Ссылка на товар; путь берется без хоста, чтобы url собирался от settings.BASE_URL"""
+        parts = urlsplit(entry.loc)
+        if not parts.path.startswith(PRODUCT_PATHS):
+            return None
+        href = parts.path + (f'?{parts.query}' if parts.query else '')
+        # В карте нет названия товара, если она не размечена image:title - берем его из адреса
+        title = entry.title or unquote(parts.path.rstrip('/').rsplit('/', 1)[-1])
+        return ProductRef(title, href)
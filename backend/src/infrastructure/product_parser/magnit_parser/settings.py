@@ -0,0 +1,6 @@
+import os
+
+
+# Адрес сайта. Читается в момент использования (settings.BASE_URL), поэтому его можно
+# подменить до создания MagnitParser, например на локальный стенд из benchmarks/mock_server.py
+BASE_URL = os.environ.get('MAGNIT_BASE_URL', 'https://magnit.ru')
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from .schemas import CatalogCategory, ProductRef
+
+if TYPE_CHECKING:
+    from .facade import MagnitParser
+
+
+logger = logging.getLogger(__name__)
+
+
+class StoreTarget(NamedTuple):
+    """Магазин, для которого собирается ассортимент (параметры shopCode и shopType)"""
+    shop_code: int
+    shop_type: int = 1
+
+    @property
+    def key(self) -> str:
+        """Ключ магазина в истории цен, в том же формате, что --store: 784507:1"""
+        return f'{self.shop_code}:{self.shop_type}'
+
+
+def parse_store(value: str) -> StoreTarget:
+    """784507 или 784507:1"""
+    shop_code, _, shop_type = value.partition(':')
+    return StoreTarget(int(shop_code), int(shop_type or 1))
+
+
+StorePage = Tuple[StoreTarget, CatalogCategory, List[ProductRef]]
+
+
+class MultiStoreScheduler:
+    """
+    Обход ассортимента нескольких магазинов одним MagnitParser.
+
+    Все магазины делят пул соединений, кэш и ограничитель скорости парсера.
+    Структура каталога загружается один раз (для первого магазина) и переиспользуется,
+    по каждому магазину запрашиваются только его страницы категорий.
+    Магазины обслуживаются по кругу по одной странице, поэтому каждый получает
+    равную долю общего лимита запросов, а не ждет, пока обойдут предыдущий.
+    Товары отдаются ссылками на карточку в своем магазине (ProductRef.for_store):
+    карточка загружается с параметрами магазина, и цены в ней - цены этого магазина,
+    а кэш ответов у разных магазинов не общий
+    """
+
+    def __init__(self, parser: 'MagnitParser', targets: Sequence[StoreTarget], max_pages: int = 5):
+        if not targets:
+            raise ValueError("Не задано ни одного магазина")
+        self.parser = parser
+        self.targets = [StoreTarget(*target) for target in targets]
+        self.max_pages = max_pages
+        self._categories: Optional[List[CatalogCategory]] = None
+
+    @property
+    def categories(self) -> List[CatalogCategory]:
+        """Категории каталога, общие для всех магазинов"""
+        if self._categories is None:
+            first = self.targets[0]
+            self._categories = self.parser.catalog_service.fetch_categories(first.shop_code, first.shop_type)
+        return self._categories
+
+    def iter_store_pages(self, categories: Optional[List[CatalogCategory]] = None) -> Iterator[StorePage]:
+        """Страницы категорий всех магазинов вперемешку: по одной странице на магазин за круг"""
+        categories = categories if categories is not None else self.categories
+        self.parser.category_service.clear_processed_pages()
+
+        queue: Deque[Tuple[StoreTarget, Iterator[StorePage]]] = deque(
+            (target, self._store_pages(target, categories)) for target in self.targets
+        )
+        while queue:
+            target, pages = queue.popleft()
+            page = next(pages, None)
+            if page is None:
+                logger.info("Магазин %s/%s обработан", target.shop_code, target.shop_type)
+                continue
+            yield page
+            queue.append((target, pages))
+
+    def iter_store_products(self, categories: Optional[List[CatalogCategory]] = None
+                            ) -> Iterator[Tuple[StoreTarget, ProductRef]]:
+        """Товары всех магазинов в паре с магазином, в котором они найдены"""
+        for target, _, page_products in self.iter_store_pages(categories):
+            for product in page_products:
+                yield target, product
+
+    def _store_pages(self, target: StoreTarget, categories: List[CatalogCategory]) -> Iterator[StorePage]:
+        for category in categories:
+            try:
+                for page_products in self.parser.category_service.iter_category_pages(
+                    category,
+                    shop_code=target.shop_code,
+                    shop_type=target.shop_type,
+                    max_pages=self.max_pages
+                ):
+                    yield target, category, self._for_store(target, page_products)
+            except Exception as e:
+                logger.error("✗ Ошибка обработки '%s' в магазине %s: %s", category.title, target.shop_code, e)
+                self.parser.category_service.record_failure(category)
+
+    @staticmethod
+    def _for_store(target: StoreTarget, page_products: List[ProductRef]) -> List[ProductRef]:
+        return [product.for_store(target.shop_code, target.shop_type) for product in page_products]
+
+    async def aiter_store_pages(self, categories: Optional[List[CatalogCategory]] = None,
+                                max_concurrent_stores: int = 10) -> AsyncIterator[StorePage]:
+        """
+        Асинхронная версия iter_store_pages: одновременно обходятся до max_concurrent_stores
+        магазинов, у каждого в работе не больше одной страницы, поэтому магазины
+        продвигаются с одинаковой скоростью
+        """
+        categories = categories if categories is not None else self.categories
+        self.parser.category_service.clear_processed_pages()
+
+        waiting = deque(self.targets)
+        running: Dict[asyncio.Task, AsyncIterator[StorePage]] = {}
+
+        def start(pages: AsyncIterator[StorePage]) -> None:
+            running[asyncio.ensure_future(pages.__anext__())] = pages
+
+        try:
+            while waiting or running:
+                while waiting and len(running) < max_concurrent_stores:
+                    start(self._astore_pages(waiting.popleft(), categories))
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pages = running.pop(task)
+                    try:
+                        page = task.result()
+                    except StopAsyncIteration:
+                        continue
+                    start(pages)
+                    yield page
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            await self.parser.async_http.close()
+
+    async def _astore_pages(self, target: StoreTarget, categories: List[CatalogCategory]
+                            ) -> AsyncIterator[StorePage]:
+        for category in categories:
+            try:
+                async for page_products in self.parser.category_service.aiter_category_pages(
+                    category,
+                    shop_code=target.shop_code,
+                    shop_type=target.shop_type,
+                    max_pages=self.max_pages
+                ):
+                    yield target, category, self._for_store(target, page_products)
+            except Exception as e:
+                logger.error("✗ Ошибка обработки '%s' в магазине %s: %s", category.title, target.shop_code, e)
+                self.parser.category_service.record_failure(category)
+        logger.info("Магазин %s/%s обработан", target.shop_code, target.shop_type)
@@ -0,0 +1,276 @@
+import bisect
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def stage_for_url(url: str) -> str:
+    """Этап обхода по URL: карта сайта, каталог, страница категории или карточка товара"""
+    path = urlsplit(url).path.rstrip('/')
+    if 'sitemap' in path and path.endswith('.xml'):
+        return 'sitemap'
+    if '/product/' in path or '/promo-product/' in path:
+        return 'product'
+    if path.endswith('/catalog'):
+        return 'catalog'
+    if '/catalog/' in path:
+        return 'category'
+    return 'other'
+
+
+def host_for_url(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин, как в Prometheus"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Последняя корзина - +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оценка квантиля: верхняя граница корзины, в которую он попал"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'buckets': dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], self.counts)),
+            'sum': self.sum,
+            'count': self.count,
+            'p50': _bound_label(self.quantile(0.5)),
+            'p95': _bound_label(self.quantile(0.95)),
+        }
+
+
+class CrawlMetrics:
+    """
+    Метрики обхода по этапам (catalog, category, product) и хостам:
+    задержки запросов, скачанные байты, коды ответов, попадания в кэш,
+    время разбора по классам парсеров, события (капча, 429/503, повторы)
+    и время этапов. Снимок выгружается в JSON или текстовом формате Prometheus
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._bytes: Counter = Counter()
+        self._waits: Counter = Counter()
+        self._responses: Counter = Counter()
+        self._cache: Counter = Counter()
+        self._parse: Dict[str, Histogram] = {}
+        self._events: Counter = Counter()
+        self._stages: Counter = Counter()
+
+    def observe_request(self, url: str, seconds: float, status: Optional[int], size: int = 0,
+                        waited: float = 0.0) -> None:
+        """
+        Реальный запрос к сайту; 304 считается попаданием в кэш после проверки ETag.
+        waited - сколько запрос ждал ограничителя скорости до отправки
+        """
+        key = (stage_for_url(url), host_for_url(url))
+        with self._lock:
+            self._waits[key] += waited
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+            self._latency[key].observe(seconds)
+            self._bytes[key] += size
+            self._responses[key + (str(status) if status is not None else 'error',)] += 1
+            self._cache[key + ('revalidated' if status == 304 else 'miss',)] += 1
+
+    def cache_hit(self, url: str) -> None:
+        """Свежий ответ из кэша без запроса"""
+        with self._lock:
+            self._cache[(stage_for_url(url), host_for_url(url), 'hit')] += 1
+
+    def event(self, name: str, url: str) -> None:
+        """Событие обхода: captcha, throttled, retry, ..."""
+        with self._lock:
+            self._events[(name, stage_for_url(url), host_for_url(url))] += 1
+
+    def observe_parse(self, parser: str, seconds: float) -> None:
+        with self._lock:
+            if parser not in self._parse:
+                self._parse[parser] = Histogram(PARSE_BUCKETS)
+            self._parse[parser].observe(seconds)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Замер времени этапа, например обхода категорий целиком"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stages[name] += time.perf_counter() - started
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = self.elapsed
+        with self._lock:
+            http = []
+            # Этапы, которые целиком обслужил кэш, есть только в _cache
+            keys = set(self._latency) | {(stage, host) for stage, host, _ in self._cache}
+            for stage, host in sorted(keys):
+                histogram = self._latency.get((stage, host)) or Histogram(LATENCY_BUCKETS)
+                hits = self._cache[(stage, host, 'hit')]
+                revalidated = self._cache[(stage, host, 'revalidated')]
+                lookups = hits + revalidated + self._cache[(stage, host, 'miss')]
+                http.append({
+                    'stage': stage,
+                    'host': host,
+                    'latency': histogram.as_dict(),
+                    'bytes': self._bytes[(stage, host)],
+                    'rate_limit_wait_seconds': self._waits[(stage, host)],
+                    'responses': {status: count for (s, h, status), count in self._responses.items()
+                                  if (s, h) == (stage, host)},
+                    'cache': {'hit': hits, 'revalidated': revalidated,
+                              'hit_ratio': (hits + revalidated) / lookups if lookups else None},
+                })
+
+            parse = [{
+                'parser': parser,
+                'duration': histogram.as_dict(),
+                'items_per_second': histogram.count / elapsed if elapsed else None,
+            } for parser, histogram in sorted(self._parse.items())]
+
+            return {
+                'started_at': self.started_at,
+                'elapsed_seconds': elapsed,
+                'http': http,
+                'parse': parse,
+                'events': [{'event': name, 'stage': stage, 'host': host, 'count': count}
+                           for (name, stage, host), count in sorted(self._events.items())],
+                'stages': dict(self._stages),
+            }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=indent)
+
+    def to_prometheus(self, prefix: str = 'magnit') -> str:
+        """Снимок в текстовом формате экспозиции Prometheus"""
+        lines: List[str] = []
+        with self._lock:
+            lines.append(f'# TYPE {prefix}_http_request_duration_seconds histogram')
+            for (stage, host), histogram in sorted(self._latency.items()):
+                lines.extend(_histogram_lines(f'{prefix}_http_request_duration_seconds',
+                                              {'stage': stage, 'host': host}, histogram))
+
+            lines.append(f'# TYPE {prefix}_http_response_bytes_total counter')
+            for (stage, host), size in sorted(self._bytes.items()):
+                lines.append(f'{prefix}_http_response_bytes_total{_labels(stage=stage, host=host)} {size}')
+
+            lines.append(f'# TYPE {prefix}_rate_limit_wait_seconds_total counter')
+            for (stage, host), waited in sorted(self._waits.items()):
+                lines.append(f'{prefix}_rate_limit_wait_seconds_total{_labels(stage=stage, host=host)} {waited:.6f}')
+
+            lines.append(f'# TYPE {prefix}_http_responses_total counter')
+            for (stage, host, status), count in sorted(self._responses.items()):
+                lines.append(f'{prefix}_http_responses_total{_labels(stage=stage, host=host, status=status)} {count}')
+
+            lines.append(f'# TYPE {prefix}_http_cache_total counter')
+            for (stage, host, outcome), count in sorted(self._cache.items()):
+                lines.append(f'{prefix}_http_cache_total{_labels(stage=stage, host=host, outcome=outcome)} {count}')
+
+            lines.append(f'# TYPE {prefix}_parse_duration_seconds histogram')
+            for parser, histogram in sorted(self._parse.items()):
+                lines.extend(_histogram_lines(f'{prefix}_parse_duration_seconds', {'parser': parser}, histogram))
+
+            lines.append(f'# TYPE {prefix}_events_total counter')
+            for (name, stage, host), count in sorted(self._events.items()):
+                lines.append(f'{prefix}_events_total{_labels(event=name, stage=stage, host=host)} {count}')
+
+            lines.append(f'# TYPE {prefix}_stage_seconds_total counter')
+            for name, seconds in sorted(self._stages.items()):
+                lines.append(f'{prefix}_stage_seconds_total{_labels(stage=name)} {seconds:.6f}')
+
+        lines.append(f'# TYPE {prefix}_elapsed_seconds gauge')
+        lines.append(f'{prefix}_elapsed_seconds {self.elapsed:.6f}')
+        return '\n'.join(lines) + '\n'
+
+    def report(self) -> str:
+        """Таблица по этапам для вывода в конце запуска"""
+        snapshot = self.snapshot()
+        lines = [f"Время работы: {snapshot['elapsed_seconds']:.1f} с"]
+
+        for name, seconds in snapshot['stages'].items():
+            lines.append(f"  этап {name}: {seconds:.2f} с")
+
+        lines.append(f"{'HTTP этап':<10} {'хост':<20} {'запросов':>9} {'p50, с':>7} {'p95, с':>7} "
+                     f"{'сумма, с':>9} {'лимит, с':>9} {'МБ':>7} {'кэш':>6}")
+        for row in snapshot['http']:
+            latency, cache = row['latency'], row['cache']
+            ratio = f"{cache['hit_ratio']:.0%}" if cache['hit_ratio'] is not None else '-'
+            lines.append(f"{row['stage']:<10} {row['host'][:20]:<20} {latency['count']:>9} "
+                         f"{_format_bound(latency['p50']):>7} {_format_bound(latency['p95']):>7} "
+                         f"{latency['sum']:>9.2f} {row['rate_limit_wait_seconds']:>9.2f} "
+                         f"{row['bytes'] / 1024 / 1024:>7.2f} {ratio:>6}")
+
+        lines.append(f"{'Парсер':<32} {'страниц':>8} {'сумма, с':>9} {'мс/стр':>7} {'стр/с':>7}")
+        for row in snapshot['parse']:
+            duration = row['duration']
+            mean_ms = duration['sum'] / duration['count'] * 1000 if duration['count'] else 0.0
+            lines.append(f"{row['parser'][:32]:<32} {duration['count']:>8} {duration['sum']:>9.2f} "
+                         f"{mean_ms:>7.2f} {row['items_per_second']:>7.1f}")
+
+        for row in snapshot['events']:
+            lines.append(f"событие {row['event']} ({row['stage']}, {row['host']}): {row['count']}")
+        return '\n'.join(lines)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels: Any) -> str:
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram_lines(name: str, labels: Dict[str, str], histogram: Histogram) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip([str(bound) for bound in histogram.buckets] + ['+Inf'], histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}')
+    lines.append(f'{name}_sum{_labels(**labels)} {histogram.sum:.6f}')
+    lines.append(f'{name}_count{_labels(**labels)} {histogram.count}')
+    return lines
+
+
+def _bound_label(value: Optional[float]) -> Any:
+    # JSON не поддерживает бесконечность
+    return '+Inf' if value == float('inf') else value
+
+
+def _format_bound(value: Any) -> str:
+    if value is None:
+        return '-'
+    return value if isinstance(value, str) else f'{value:g}'
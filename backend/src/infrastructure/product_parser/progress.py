@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '?'
+    seconds = int(seconds)
+    if seconds < 60:
+        return f'{seconds}с'
+    if seconds < 3600:
+        return f'{seconds // 60}м{seconds % 60:02d}с'
+    return f'{seconds // 3600}ч{seconds % 3600 // 60:02d}м'
+
+
+class ProgressReporter:
+    """
+    Ход этапа обхода одной строкой раз в interval секунд вместо строки на каждый элемент:
+    сделано/всего, скорость, оценка оставшегося времени и счетчики (ошибки, пропуски...).
+    Строка собирается только когда уходит в лог, а снимок счетчиков передается
+    в extra={'progress': ...}, чтобы JSON-обработчики писали его полями, а не текстом.
+    total можно не знать заранее (товары из генератора) и наращивать через add_total
+    """
+
+    def __init__(self, name: str, total: Optional[int] = None, interval: float = 10.0,
+                 log: Optional[logging.Logger] = None, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.counters: Counter = Counter()
+        self._log = log or logger
+        self._clock = clock
+        self._started = clock()
+        self._next_report = self._started + interval
+        self._lock = threading.Lock()
+        self._finished = False
+
+    def add_total(self, count: int) -> None:
+        with self._lock:
+            self.total = (self.total or 0) + count
+
+    def advance(self, count: int = 1, **counters: int) -> None:
+        """Отмечает count готовых элементов и увеличивает именованные счетчики"""
+        with self._lock:
+            self.done += count
+            for key, value in counters.items():
+                self.counters[key] += value
+            now = self._clock()
+            if now < self._next_report:
+                return
+            self._next_report = now + self.interval
+        self.report()
+
+    def count(self, **counters: int) -> None:
+        """Счетчики без продвижения, например повторный запрос того же элемента"""
+        self.advance(0, **counters)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = self._clock() - self._started
+            done, total, counters = self.done, self.total, dict(self.counters)
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remaining = None
+        if total is not None and rate > 0:
+            remaining = max(total - done, 0) / rate
+        return {
+            'stage': self.name,
+            'done': done,
+            'total': total,
+            'elapsed': round(elapsed, 3),
+            'rate': round(rate, 3),
+            'eta': round(remaining, 1) if remaining is not None else None,
+            **counters,
+        }
+
+    def report(self, final: bool = False) -> None:
+        if not self._log.isEnabledFor(logging.INFO):
+            return
+        progress = self.snapshot()
+        counters = ', '.join(f'{key} {progress[key]}' for key in sorted(self.counters))
+        if final:
+            self._log.info('%s: готово %d за %s (%.1f/с)%s%s',
+                           self.name, progress['done'], format_duration(progress['elapsed']), progress['rate'],
+                           ', ' if counters else '', counters, extra={'progress': progress})
+        else:
+            self._log.info('%s: %d/%s, %.1f/с, осталось ~%s%s%s',
+                           self.name, progress['done'], '?' if progress['total'] is None else progress['total'],
+                           progress['rate'], format_duration(progress['eta']),
+                           ', ' if counters else '', counters, extra={'progress': progress})
+
+    def finish(self) -> None:
+        """Итоговая строка; повторный вызов ничего не делает"""
+        if self._finished:
+            return
+        self._finished = True
+        self.report(final=True)
+
+    def __enter__(self) -> 'ProgressReporter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.finish()
@@ -0,0 +1,4 @@
+from .app import ResultsWatcher, create_app
+
+
+__all__ = ['ResultsWatcher', 'create_app']
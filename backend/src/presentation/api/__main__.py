@@ -0,0 +1,43 @@
+"""
+API запросов к товарам последнего обхода.
+
+Обход сохраняет карточки в JSON Lines:
+    python -m backend.src.infrastructure.product_parser.magnit_parser.main --results-out products.jsonl
+API читает файл и перестраивает индексы, когда обход его перезаписывает:
+    python -m backend.src.presentation.api --results products.jsonl --search-dir search_index
+История цен - каталог, в который обход добавляет снимки (main.py --history-dir):
+    python -m backend.src.presentation.api --results products.jsonl --history-dir history
+"""
+import argparse
+import logging
+
+import uvicorn
+
+from ...application.services import PriceHistory, SearchIndex
+from .app import create_app
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--results', required=True, help='файл результатов обхода (JSON Lines)')
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8000)
+    arg_parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='как часто проверять, не обновился ли файл, секунд')
+    arg_parser.add_argument('--search-dir', default=None,
+                            help='каталог поискового индекса; без него индекс строится в памяти при каждом запуске')
+    arg_parser.add_argument('--history-dir', default=None, help='каталог истории цен')
+    return arg_parser
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    args = build_arg_parser().parse_args()
+    search = SearchIndex.open(args.search_dir) if args.search_dir else None
+    history = PriceHistory(args.history_dir) if args.history_dir else None
+    app = create_app(results_path=args.results, poll_interval=args.poll_interval, search=search, history=history)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Query, Request
+
+from ...application.services import IndexUpdate, PriceHistory, ProductIndex, RangeFilter, SearchIndex
+from ...application.services.product_index import NUMERIC_FIELDS
+from ...infrastructure.product_parser.magnit_parser.crawl_results import read_results
+from ...infrastructure.product_parser.magnit_parser.normalization import NUTRITION_FIELDS
+
+logger = logging.getLogger(__name__)
+
+MAX_LIMIT = 500
+
+
+class ResultsWatcher:
+    """
+    Следит за файлом результатов обхода (JSON Lines из main.py --results-out)
+    и обновляет индексы, когда обход записал новую версию.
+    Файл подменяется целиком, поэтому достаточно сравнивать время изменения и размер
+    """
+
+    def __init__(self, index: ProductIndex, path: str, interval: float = 5.0,
+                 search: Optional[SearchIndex] = None):
+        self.index = index
+        self.search = search
+        self.path = path
+        self.interval = interval
+        self._seen: Optional[Tuple[int, int]] = None
+
+    def poll(self) -> Optional[IndexUpdate]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version == self._seen:
+            return None
+
+        self._seen = version
+        results = list(read_results(self.path))
+        update = self.index.update(results, replace=True)
+        logger.info("Индекс обновлен из %s: %s", self.path, update)
+        if self.search is not None:
+            search_update = self.search.update(results, replace=True)
+            if self.search.directory is not None:
+                self.search.save()
+            logger.info("Поисковый индекс обновлен: %s", search_update)
+        return update
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.poll)
+            except Exception as e:
+                logger.error("Не удалось обновить индекс из %s: %s", self.path, e)
+            await asyncio.sleep(self.interval)
+
+
+def _range_filters(request: Request) -> List[RangeFilter]:
+    """Диапазоны из параметров min_<поле> и max_<поле>, например min_proteins=10&max_price_per_kg=500"""
+    bounds: Dict[str, Dict[str, float]] = {}
+    for key, value in request.query_params.items():
+        bound, _, field = key.partition('_')
+        if bound not in ('min', 'max') or not field:
+            continue
+        if field not in NUMERIC_FIELDS:
+            raise HTTPException(status_code=400, detail=f'Неизвестное поле: {field}')
+        try:
+            bounds.setdefault(field, {})[bound] = float(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f'{key} должно быть числом')
+    return [RangeFilter(field, low=values.get('min'), high=values.get('max')) for field, values in bounds.items()]
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    return value.timestamp() if value is not None else None
+
+
+def create_app(index: Optional[ProductIndex] = None, results_path: Optional[str] = None,
+               poll_interval: float = 5.0, search: Optional[SearchIndex] = None,
+               history: Optional[PriceHistory] = None) -> FastAPI:
+    """
+    API запросов к товарам последнего обхода.
+    Если указан results_path, индексы загружаются из файла при старте и обновляются,
+    когда обход перезаписывает файл. history - история цен, которую пишет обход (main.py --history-dir)
+    """
+    index = ProductIndex() if index is None else index
+    search = SearchIndex() if search is None else search
+    watcher = ResultsWatcher(index, results_path, poll_interval, search) if results_path else None
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        task = None
+        if watcher is not None:
+            await asyncio.to_thread(watcher.poll)
+            task = asyncio.create_task(watcher.run())
+        yield
+        if task is not None:
+            task.cancel()
+
+    app = FastAPI(title='Shopping helper', lifespan=lifespan)
+    app.state.index = index
+    app.state.search = search
+    app.state.history = history
+
+    @app.get('/products/lookup')
+    def lookup(href: str = Query(..., description='путь товара или полный url')) -> Dict[str, Any]:
+        product = index.get(href)
+        if product is None:
+            raise HTTPException(status_code=404, detail='Товар не найден')
+        return product
+
+    @app.get('/products/search')
+    def search_products(q: str = Query(..., min_length=1, description='слова из названия или характеристик'),
+                        prefix: bool = Query(False, description='последнее слово - начало слова (подсказки при вводе)'),
+                        limit: int = Query(20, ge=1, le=MAX_LIMIT),
+                        offset: int = Query(0, ge=0)) -> Dict[str, Any]:
+        """Полнотекстовый поиск с ранжированием BM25; к найденному добавляются цены и КБЖУ из индекса"""
+        total, hits = search.search(q, limit=limit, offset=offset, prefix=prefix)
+        items = []
+        for hit in hits:
+            product = index.get(hit['href']) or {'href': hit['href'], 'title': hit['title']}
+            items.append({**product, 'score': hit['score']})
+        return {'total': total, 'items': items}
+
+    @app.get('/products')
+    def products(request: Request,
+                 category: Optional[str] = None,
+                 by_weight: Optional[bool] = None,
+                 sort: Optional[str] = Query(None, description='числовое поле, с "-" - по убыванию'),
+                 limit: int = Query(50, ge=1, le=MAX_LIMIT),
+                 offset: int = Query(0, ge=0)) -> Dict[str, Any]:
+        """Фильтры по категории, весовым товарам и диапазонам min_<поле>/max_<поле>"""
+        descending = bool(sort) and sort.startswith('-')
+        try:
+            total, items = index.query(category=category, by_weight=by_weight, ranges=_range_filters(request),
+                                       sort=sort.lstrip('-') if sort else None, descending=descending,
+                                       limit=limit, offset=offset)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {'total': total, 'items': items}
+
+    @app.get('/products/best-value')
+    def best_value(request: Request,
+                   nutrient: str = Query('proteins', description=f'одно из: {", ".join(NUTRITION_FIELDS)}'),
+                   category: Optional[str] = None,
+                   by_weight: Optional[bool] = None,
+                   limit: int = Query(20, ge=1, le=MAX_LIMIT),
+                   offset: int = Query(0, ge=0)) -> Dict[str, Any]:
+        """Больше всего нутриента на рубль: например, самый дешевый белок"""
+        if nutrient not in NUTRITION_FIELDS:
+            raise HTTPException(status_code=400, detail=f'Неизвестный нутриент: {nutrient}')
+        total, items = index.query(category=category, by_weight=by_weight, ranges=_range_filters(request),
+                                   sort=f'{nutrient}_per_ruble', descending=True, limit=limit, offset=offset)
+        return {'total': total, 'items': items}
+
+    def require_history() -> PriceHistory:
+        if history is None:
+            raise HTTPException(status_code=404, detail='История цен не ведется')
+        return history
+
+    @app.get('/products/history')
+    def price_history(href: str = Query(..., description='путь товара или полный url'),
+                      store: Optional[str] = Query(None, description='магазин shopCode:shopType'),
+                      start: Optional[datetime] = None,
+                      end: Optional[datetime] = None,
+                      every: Optional[str] = Query(None, description='период прореживания: 1h, 1D, 1W'),
+                      how: str = Query('last', description='агрегат цены за период: last, mean, min, max')
+                      ) -> List[Dict[str, Any]]:
+        """Цена и наличие товара по снимкам обходов, при every - по одной точке на период"""
+        store_history = require_history()
+        if every is None:
+            return store_history.history(href, store, _timestamp(start), _timestamp(end))
+        try:
+            return store_history.downsample(href, every, how, store, _timestamp(start), _timestamp(end))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @app.get('/price-changes')
+    def price_changes(store: Optional[str] = Query(None, description='магазин shopCode:shopType'),
+                      limit: int = Query(20, ge=1, le=MAX_LIMIT)) -> Dict[str, Any]:
+        """Самые большие изменения цен с предыдущего снимка"""
+        return require_history().changes(store, limit)
+
+    @app.get('/categories')
+    def categories() -> List[Dict[str, Any]]:
+        return index.categories()
+
+    @app.get('/stats')
+    def stats() -> Dict[str, Any]:
+        return {**index.stats(), 'search': search.stats()}
+
+    return app
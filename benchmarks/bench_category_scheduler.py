@@ -0,0 +1,105 @@
+"""
+Обход страниц категорий на локальном стенде (benchmarks.mock_server):
+последовательный CategoryService.iter_multiple_products против CategoryScheduler
+с разным числом параллельных категорий и с общим бюджетом страниц.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_category_scheduler --categories 20 --pages 5 --latency 0.05 --save
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from backend.src.infrastructure.product_parser.magnit_parser import MagnitParser, settings
+
+from .mock_server import MockConfig, MockMagnitServer
+from .results import save_results
+
+
+def new_parser(rps: float, concurrency: int) -> MagnitParser:
+    return MagnitParser(requests_per_second=rps, burst=concurrency, max_concurrent=concurrency,
+                        per_host_limit=concurrency, artifacts=None)
+
+
+def run_sequential(server: MockMagnitServer, rps: float, max_pages: int) -> Dict[str, Any]:
+    parser = new_parser(rps, 1)
+    server.stats.clear()
+    started = time.perf_counter()
+    try:
+        categories = parser.catalog_categories
+        products = sum(1 for _ in parser.category_service.iter_multiple_products(categories, max_pages=max_pages))
+    finally:
+        parser.close()
+    return {'mode': 'sequential', 'parallel': 1, 'budget': None, 'seconds': time.perf_counter() - started,
+            'products': products, 'requests': server.stats['requests'], 'partial': False}
+
+
+def run_scheduler(server: MockMagnitServer, rps: float, max_pages: int, parallel: int,
+                  budget: Optional[int]) -> Dict[str, Any]:
+    parser = new_parser(rps, parallel)
+    scheduler = parser.category_scheduler(max_parallel=parallel, max_pages=max_pages, page_budget=budget,
+                                          priority='catalog')
+
+    async def crawl() -> int:
+        try:
+            return sum([1 async for _ in scheduler.aiter_products()])
+        finally:
+            await parser.async_http.close()
+
+    server.stats.clear()
+    started = time.perf_counter()
+    try:
+        products = asyncio.run(crawl())
+    finally:
+        parser.close()
+    return {'mode': 'scheduler', 'parallel': parallel, 'budget': budget, 'seconds': time.perf_counter() - started,
+            'products': products, 'requests': server.stats['requests'], 'partial': scheduler.report.partial}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--categories', type=int, default=20)
+    arg_parser.add_argument('--pages', type=int, default=5)
+    arg_parser.add_argument('--products', type=int, default=24)
+    arg_parser.add_argument('--latency', type=float, default=0.05)
+    arg_parser.add_argument('--rps', type=float, default=1000.0, help='лимит запросов в секунду')
+    arg_parser.add_argument('--parallel', type=int, nargs='+', default=[1, 4, 16])
+    arg_parser.add_argument('--budget', type=int, default=None,
+                            help='дополнительно прогнать планировщик с таким бюджетом страниц')
+    arg_parser.add_argument('--save', action='store_true', help='сохранить результат в benchmarks/results')
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    config = MockConfig(categories=args.categories, pages=args.pages, products=args.products,
+                        latency=args.latency, sitemap=False)
+    max_pages = args.pages + 1
+
+    rows: List[Dict[str, Any]] = []
+    base_url = settings.BASE_URL
+    with MockMagnitServer(config) as server:
+        settings.BASE_URL = server.url
+        try:
+            rows.append(run_sequential(server, args.rps, max_pages))
+            for parallel in args.parallel:
+                rows.append(run_scheduler(server, args.rps, max_pages, parallel, None))
+            if args.budget is not None:
+                rows.append(run_scheduler(server, args.rps, max_pages, max(args.parallel), args.budget))
+        finally:
+            settings.BASE_URL = base_url
+
+    print(f'Стенд: {config.categories} категорий x {config.pages} стр. x {config.products} товаров, '
+          f'задержка {config.latency * 1000:.0f} мс')
+    print(f"{'mode':<11} {'K':>3} {'budget':>7} {'s':>7} {'products':>9} {'requests':>9} {'partial':>8}")
+    for row in rows:
+        budget = row['budget'] if row['budget'] is not None else '-'
+        print(f"{row['mode']:<11} {row['parallel']:>3} {budget:>7} {row['seconds']:>7.2f} "
+              f"{row['products']:>9} {row['requests']:>9} {str(row['partial']):>8}")
+
+    if args.save:
+        print(f"Сохранено: {save_results('category_scheduler', {'config': vars(config), 'rows': rows})}")
+
+
+if __name__ == '__main__':
+    main()
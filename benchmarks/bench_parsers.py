@@ -0,0 +1,109 @@
+"""
+Время разбора страниц каждым парсером по отдельности, без сети:
+CatalogParser на каталоге, CategoryParser на листингах категорий
+(синтетических и сохраненных benchmarks/fixtures/debug_page_*.html),
+ProductDetailsParser и LxmlProductDetailsParser на карточках товаров.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_parsers --repeat 20 --save
+"""
+import argparse
+import glob
+import logging
+import os
+import time
+from typing import Callable, Dict, List
+
+from backend.src.infrastructure.product_parser.magnit_parser.parsers import (
+    CatalogParser,
+    CategoryParser,
+    ProductDetailsParser,
+    LxmlProductDetailsParser,
+)
+
+from .results import save_results
+from .synthetic import catalog_page, category_page, product_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_recorded(pattern: str = 'debug_page_*.html') -> Dict[str, str]:
+    """Сохраненные страницы сайта из benchmarks/fixtures"""
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, pattern))):
+        with open(path, encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def cases() -> List[Dict[str, object]]:
+    """Пары (парсер, страница) для замера"""
+    catalog = {f'/catalog/{i}-category': f'Категория {i}' for i in range(200)}
+    cases = [
+        {'parser': 'CatalogParser', 'page': 'synthetic_catalog_200', 'parse': CatalogParser().parse,
+         'content': catalog_page(catalog)},
+    ]
+
+    category_parser = CategoryParser()
+    category_pages = {f'synthetic_category_{n}': category_page('bench', 0, n) for n in (24, 96)}
+    category_pages.update(load_recorded())
+    for name, content in category_pages.items():
+        cases.append({'parser': 'CategoryParser', 'page': name, 'parse': category_parser.parse, 'content': content})
+
+    product_pages = {
+        'synthetic_product': product_page(0),
+        'synthetic_product_noise': product_page(100, characteristics=12, noise=True),
+        'synthetic_product_large': product_page(102, characteristics=40, head_weight=200),
+    }
+    for parser in (ProductDetailsParser(), LxmlProductDetailsParser()):
+        for name, content in product_pages.items():
+            cases.append({'parser': type(parser).__name__, 'page': name, 'parse': parser.parse, 'content': content})
+    return cases
+
+
+def best_time(parse: Callable[[str], object], content: str, repeat: int) -> float:
+    """Лучшее время одного разбора из repeat попыток, в секундах"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse(content)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(repeat: int) -> List[Dict[str, object]]:
+    rows = []
+    for case in cases():
+        parse, content = case['parse'], case['content']
+        items = parse(content)
+        rows.append({
+            'parser': case['parser'],
+            'page': case['page'],
+            'size_kb': len(content) / 1024,
+            'items': len(items),
+            'best_ms': best_time(parse, content, repeat) * 1000,
+        })
+    return rows
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    arg_parser.add_argument('--save', action='store_true', help='сохранить результат в benchmarks/results')
+    args = arg_parser.parse_args()
+
+    # CategoryParser пишет в лог каждую страницу, в том числе пустую
+    logging.disable(logging.WARNING)
+    rows = run(args.repeat)
+
+    print(f"{'parser':<26} {'page':<44} {'KB':>7} {'items':>6} {'ms':>8}")
+    for row in rows:
+        print(f"{row['parser']:<26} {row['page'][:44]:<44} {row['size_kb']:>7.1f} "
+              f"{row['items']:>6} {row['best_ms']:>8.3f}")
+
+    if args.save:
+        print(f"Сохранено: {save_results('parsers', {'repeat': args.repeat, 'rows': rows})}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Полный конвейер MagnitParser против локального стенда (benchmarks.mock_server):
+каталог -> страницы категорий -> карточки товаров в синхронном (iter_products)
+и асинхронных (aparse_products, aiter_products) режимах.
+
+Каждый режим запускается на новом MagnitParser с пустым кэшем. Лимит запросов
+задается --rps, по умолчанию высокий, чтобы мерить сам парсер, а не ограничитель.
+--discovery sitemap берет ссылки на товары из карты сайта вместо страниц категорий.
+--error-rate задает долю ответов 500: сколько карточек теряется без повторов (--max-attempts 1)
+и сколько повторов и времени нужно, чтобы собрать все.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_pipeline --categories 5 --pages 3 --products 24 --latency 0.02 --save
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List
+
+from backend.src.infrastructure.product_parser.http import RetryPolicy
+from backend.src.infrastructure.product_parser.magnit_parser import MagnitParser, settings
+
+from .mock_server import MockConfig, MockMagnitServer
+from .results import save_results
+
+
+def run_sync(parser: MagnitParser, max_pages: int) -> List[Dict[str, Any]]:
+    return list(parser.iter_products(max_pages=max_pages))
+
+
+def run_async(parser: MagnitParser, max_pages: int) -> List[Dict[str, Any]]:
+    return asyncio.run(parser.aparse_products(max_pages=max_pages))
+
+
+def run_async_stream(parser: MagnitParser, max_pages: int) -> List[Dict[str, Any]]:
+    async def collect() -> List[Dict[str, Any]]:
+        return [result async for result in parser.aiter_products(max_pages=max_pages)]
+    return asyncio.run(collect())
+
+
+MODES: Dict[str, Callable[[MagnitParser, int], List[Dict[str, Any]]]] = {
+    'sync': run_sync,
+    'async': run_async,
+    'async_stream': run_async_stream,
+}
+
+
+def run_mode(server: MockMagnitServer, mode: str, rps: float, max_concurrent: int,
+             parser_engine: str, discovery: str = 'html',
+             retry_policy: RetryPolicy = RetryPolicy()) -> Dict[str, Any]:
+    parser = MagnitParser(requests_per_second=rps, burst=max_concurrent, max_concurrent=max_concurrent,
+                          per_host_limit=max_concurrent, parser_engine=parser_engine, discovery=discovery,
+                          retry_policy=retry_policy)
+    server.stats.clear()
+    started = time.perf_counter()
+    try:
+        results = MODES[mode](parser, server.config.pages + 1)
+    finally:
+        parser.close()
+    elapsed = time.perf_counter() - started
+
+    products = sum(1 for result in results if 'error' not in result)
+    return {
+        'mode': mode,
+        'seconds': elapsed,
+        'products': products,
+        'errors': len(results) - products,
+        'products_per_second': products / elapsed if elapsed else None,
+        'requests': server.stats['requests'],
+        'retries': sum(event['count'] for event in parser.metrics.snapshot()['events'] if event['event'] == 'retry'),
+        'metrics': parser.metrics.snapshot(),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--categories', type=int, default=5)
+    arg_parser.add_argument('--pages', type=int, default=3)
+    arg_parser.add_argument('--products', type=int, default=24)
+    arg_parser.add_argument('--latency', type=float, default=0.02)
+    arg_parser.add_argument('--rps', type=float, default=1000.0, help='лимит запросов в секунду')
+    arg_parser.add_argument('--concurrency', type=int, default=10)
+    arg_parser.add_argument('--engine', default='lxml', help='движок разбора карточек: bs4 или lxml')
+    arg_parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    arg_parser.add_argument('--discovery', default='html', choices=['html', 'sitemap'])
+    arg_parser.add_argument('--error-rate', type=float, default=0.0, help='доля ответов 500 на стенде')
+    arg_parser.add_argument('--max-attempts', type=int, default=RetryPolicy.max_attempts,
+                            help='попыток на запрос, 1 - без повторов')
+    arg_parser.add_argument('--retry-delay', type=float, default=RetryPolicy.base_delay,
+                            help='базовая пауза перед повтором, секунд')
+    arg_parser.add_argument('--save', action='store_true', help='сохранить результат в benchmarks/results')
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    config = MockConfig(categories=args.categories, pages=args.pages, products=args.products, latency=args.latency,
+                        error_rate=args.error_rate)
+    retry_policy = RetryPolicy(max_attempts=args.max_attempts, base_delay=args.retry_delay)
+
+    rows = []
+    base_url = settings.BASE_URL
+    with MockMagnitServer(config) as server:
+        settings.BASE_URL = server.url
+        try:
+            for mode in args.modes:
+                rows.append(run_mode(server, mode, args.rps, args.concurrency, args.engine, args.discovery,
+                                     retry_policy))
+        finally:
+            settings.BASE_URL = base_url
+
+    print(f'Стенд: {config.categories} категорий x {config.pages} стр. x {config.products} товаров, '
+          f'задержка {config.latency * 1000:.0f} мс')
+    print(f"{'mode':<14} {'s':>8} {'products':>9} {'errors':>7} {'prod/s':>8} {'requests':>9} {'retries':>8}")
+    for row in rows:
+        print(f"{row['mode']:<14} {row['seconds']:>8.2f} {row['products']:>9} {row['errors']:>7} "
+              f"{row['products_per_second']:>8.1f} {row['requests']:>9} {row['retries']:>8}")
+        if row['products'] != config.total_products:
+            print(f"  ожидалось {config.total_products} товаров")
+
+    if args.save:
+        results = {'config': vars(config), 'rps': args.rps, 'concurrency': args.concurrency,
+                   'engine': args.engine, 'discovery': args.discovery, 'max_attempts': args.max_attempts,
+                   'retry_delay': args.retry_delay, 'rows': rows}
+        print(f"Сохранено: {save_results('pipeline', results)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Задержка запросов к ProductIndex и время его обновления на синтетическом каталоге:
+полная загрузка, затем инкрементальное обновление (часть товаров изменилась, часть добавилась).
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_product_index --products 200000 --save
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+from backend.src.application.services import ProductIndex, RangeFilter
+
+from .results import save_results
+
+PRODUCT_TYPES = ('Молоко', 'Сыр', 'Крупа', 'Мясо', 'Хлеб', 'Рыба', 'Овощи', 'Фрукты')
+
+
+def crawl_result(i: int, rng: random.Random) -> Dict[str, Any]:
+    """Карточка в формате ProductService.fetch_product_details"""
+    by_weight = i % 7 == 0
+    characteristics = {'Тип продукта': PRODUCT_TYPES[i % len(PRODUCT_TYPES)]}
+    if not by_weight:
+        characteristics['Вес'] = f'{rng.choice((100, 250, 500, 900))} г'
+    return {
+        'success': True,
+        'url': f'https://magnit.ru/product/{i}-bench',
+        'title': f'Товар {i}',
+        'is_food_by_weight': by_weight,
+        'price': f'{rng.randint(30, 900)},99 ₽',
+        'characteristics': characteristics,
+        'nutrition_facts': {
+            'kilocalories': str(rng.randint(20, 600)),
+            'proteins': f'{rng.randint(0, 30)},{rng.randint(0, 9)}',
+            'fats': f'{rng.randint(0, 40)},{rng.randint(0, 9)}',
+            'carbohydrates': f'{rng.randint(0, 70)},{rng.randint(0, 9)}',
+        },
+    }
+
+
+QUERIES = {
+    'lookup': lambda index: index.get('/product/12345-bench'),
+    'category_page': lambda index: index.query(category='сыр', limit=50),
+    'range': lambda index: index.query(ranges=[RangeFilter('proteins', 10, 20)], limit=50),
+    'best_protein': lambda index: index.query(sort='proteins_per_ruble', descending=True, limit=20),
+    'best_protein_filtered': lambda index: index.query(
+        category='Мясо', by_weight=False, ranges=[RangeFilter('price_per_kg', None, 1500)],
+        sort='proteins_per_ruble', descending=True, limit=20),
+}
+
+
+def percentiles(index: ProductIndex, query, repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        query(index)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'p99_ms': timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000,
+    }
+
+
+def run(products: int, changed: float, repeat: int) -> Dict[str, Any]:
+    rng = random.Random(0)
+    results = [crawl_result(i, rng) for i in range(products)]
+    index = ProductIndex()
+    full = index.update(results)
+
+    rows: List[Dict[str, Any]] = [{'query': name, **percentiles(index, query, repeat)}
+                                  for name, query in QUERIES.items()]
+
+    delta = int(products * changed)
+    incremental = index.update([crawl_result(i, rng) for i in range(delta)]
+                               + [crawl_result(i, rng) for i in range(products, products + delta // 2)])
+    return {'products': products, 'full_update': full._asdict(), 'incremental_update': incremental._asdict(),
+            'rows': rows}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--products', type=int, default=200000)
+    arg_parser.add_argument('--changed', type=float, default=0.01, help='доля измененных товаров при обновлении')
+    arg_parser.add_argument('--repeat', type=int, default=1000)
+    arg_parser.add_argument('--save', action='store_true', help='сохранить результат в benchmarks/results')
+    args = arg_parser.parse_args()
+
+    result = run(args.products, args.changed, args.repeat)
+    print(f"Полная загрузка: {result['full_update']['seconds']:.2f} с, "
+          f"инкрементальное обновление: {result['incremental_update']['seconds']:.3f} с")
+    print(f"{'query':<24} {'p50 ms':>8} {'p99 ms':>8}")
+    for row in result['rows']:
+        print(f"{row['query']:<24} {row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f}")
+
+    if args.save:
+        print(f"Сохранено: {save_results('product_index', result)}")
+
+
+if __name__ == '__main__':
+    main()
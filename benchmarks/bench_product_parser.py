@@ -0,0 +1,87 @@
+"""
+Сравнение движков разбора карточки товара: BeautifulSoup (ProductDetailsParser)
+и lxml + XPath (LxmlProductDetailsParser).
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_product_parser --repeat 200
+"""
+import argparse
+import glob
+import os
+import time
+from typing import Callable, Dict, List
+
+from backend.src.infrastructure.product_parser.magnit_parser.parsers import (
+    ProductDetailsParser,
+    LxmlProductDetailsParser,
+)
+
+from .synthetic import product_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixtures() -> Dict[str, str]:
+    """Сохраненные страницы из benchmarks/fixtures и синтетические карточки товаров"""
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'debug_page_*.html'))):
+        with open(path, encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+
+    for seed in range(5):
+        pages[f'synthetic_{seed}'] = product_page(seed)
+    pages['synthetic_noise'] = product_page(100, characteristics=12, noise=True)
+    pages['synthetic_no_nutrition'] = product_page(101, with_nutrition=False)
+    pages['synthetic_large'] = product_page(102, characteristics=40, head_weight=200)
+    return pages
+
+
+def best_time(parse: Callable[[str], object], content: str, repeat: int) -> float:
+    """Лучшее время одного разбора из repeat попыток, в секундах"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse(content)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(repeat: int) -> List[Dict[str, object]]:
+    bs4_parser = ProductDetailsParser()
+    lxml_parser = LxmlProductDetailsParser()
+    rows = []
+
+    for name, content in load_fixtures().items():
+        expected = bs4_parser.parse(content)
+        actual = lxml_parser.parse(content)
+        if expected != actual:
+            raise AssertionError(f'{name}: результаты движков различаются\n{expected}\n{actual}')
+
+        bs4_time = best_time(bs4_parser.parse, content, repeat)
+        lxml_time = best_time(lxml_parser.parse, content, repeat)
+        rows.append({
+            'page': name,
+            'size_kb': len(content) / 1024,
+            'bs4_ms': bs4_time * 1000,
+            'lxml_ms': lxml_time * 1000,
+            'speedup': bs4_time / lxml_time,
+        })
+
+    return rows
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--repeat', type=int, default=50)
+    args = arg_parser.parse_args()
+
+    rows = run(args.repeat)
+    print(f"{'page':<50} {'KB':>8} {'bs4, ms':>9} {'lxml, ms':>9} {'x':>6}")
+    for row in rows:
+        print(f"{row['page'][:50]:<50} {row['size_kb']:>8.1f} {row['bs4_ms']:>9.3f} "
+              f"{row['lxml_ms']:>9.3f} {row['speedup']:>6.1f}")
+    print('Результаты движков совпадают на всех страницах')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Стоимость записи о товаре в конвейере обхода: pydantic CategoryProduct
+против ProductRef со __slots__.
+
+Для каждого варианта измеряется создание записей из пар (title, href),
+трехкратное обращение к url (как в сервисах и логах) и память под записи.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_product_ref --count 200000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from backend.src.infrastructure.product_parser.magnit_parser.schemas import CategoryProduct, ProductRef
+
+
+def make_fields(count: int) -> List[Tuple[str, str]]:
+    return [(f'Молоко пастеризованное 3,2% {i}', f'/product/{1000000 + i}-moloko-pasterizovannoe')
+            for i in range(count)]
+
+
+def build_schema(fields: List[Tuple[str, str]]) -> list:
+    return [CategoryProduct(title=title, href=href) for title, href in fields]
+
+
+def build_ref(fields: List[Tuple[str, str]]) -> list:
+    return [ProductRef(title, href) for title, href in fields]
+
+
+def touch_urls(products: list) -> int:
+    total = 0
+    for product in products:
+        total += len(product.url) + len(product.url) + len(product.url)
+    return total
+
+
+def measure(build: Callable[[List[Tuple[str, str]]], list], fields: List[Tuple[str, str]]) -> Dict[str, float]:
+    gc.collect()
+    started = time.perf_counter()
+    products = build(fields)
+    construct = time.perf_counter() - started
+
+    started = time.perf_counter()
+    touch_urls(products)
+    url_access = time.perf_counter() - started
+    del products
+
+    gc.collect()
+    tracemalloc.start()
+    products = build(fields)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del products
+
+    return {'construct_s': construct, 'url_access_s': url_access, 'memory_mb': memory / 1024 / 1024}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--count', type=int, default=100000)
+    args = arg_parser.parse_args()
+
+    fields = make_fields(args.count)
+    if [ref.to_schema().url for ref in build_ref(fields[:100])] != [p.url for p in build_schema(fields[:100])]:
+        raise AssertionError('ProductRef и CategoryProduct дают разные url')
+
+    rows = {'CategoryProduct': measure(build_schema, fields), 'ProductRef': measure(build_ref, fields)}
+
+    print(f'{args.count} записей')
+    print(f"{'':<16} {'создание, с':>12} {'url x3, с':>10} {'память, МБ':>11}")
+    for name, row in rows.items():
+        print(f"{name:<16} {row['construct_s']:>12.3f} {row['url_access_s']:>10.3f} {row['memory_mb']:>11.1f}")
+
+    schema, ref = rows['CategoryProduct'], rows['ProductRef']
+    print(f"ProductRef: создание в {schema['construct_s'] / ref['construct_s']:.1f} раз быстрее, "
+          f"память в {schema['memory_mb'] / ref['memory_mb']:.1f} раз меньше")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Сравнение двух сохраненных прогонов одного бенчмарка.
+
+    python -m benchmarks.compare benchmarks/results/parsers-abc123-....json benchmarks/results/parsers-def456-....json
+
+Для каждого числового значения печатаются оба результата и отношение новый/старый.
+"""
+import argparse
+from typing import Any, Dict, Iterator, Tuple
+
+from .results import load_results
+
+
+def flatten(value: Any, prefix: str = '') -> Iterator[Tuple[str, float]]:
+    """Числовые листья вложенной структуры с путем вида rows[case=catalog].best_ms"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f'{prefix}.{key}' if prefix else str(key))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            # Строки таблиц подписываем строковыми полями, а не индексом: состав строк может меняться
+            label = ','.join(f'{k}={v}' for k, v in item.items() if isinstance(v, str)) \
+                if isinstance(item, dict) else ''
+            yield from flatten(item, f'{prefix}[{label or i}]')
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, float(value)
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> Iterator[Tuple[str, float, float]]:
+    old_values = dict(flatten(old['results']))
+    for key, new_value in flatten(new['results']):
+        if key in old_values:
+            yield key, old_values[key], new_value
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('old')
+    arg_parser.add_argument('new')
+    args = arg_parser.parse_args()
+
+    old, new = load_results(args.old), load_results(args.new)
+    print(f"{old['environment']['git']} -> {new['environment']['git']}")
+    for key, old_value, new_value in compare(old, new):
+        ratio = f'{new_value / old_value:.2f}x' if old_value else '-'
+        print(f'{key:<70} {old_value:>12.4f} {new_value:>12.4f} {ratio:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Локальный стенд magnit.ru для бенчмарков: каталог, страницы категорий с пагинацией,
+карта сайта и карточки товаров из шаблонов synthetic.py (той же структуры, что debug_page_*.html).
+
+Отвечает с ETag и поддерживает If-None-Match (304), как настоящий сайт за CDN.
+Парсер направляется на стенд через settings.BASE_URL или переменную MAGNIT_BASE_URL.
+
+Отдельный запуск:
+    python -m benchmarks.mock_server --port 8080 --categories 10 --pages 3 --products 24
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from .synthetic import catalog_page, category_page, product_page, sitemap_index, sitemap_urlset
+
+
+@dataclass
+class MockConfig:
+    categories: int = 5  # Категорий в каталоге
+    pages: int = 3  # Непустых страниц в каждой категории
+    products: int = 24  # Товаров на странице
+    latency: float = 0.02  # Задержка ответа, секунды
+    head_weight: int = 20  # Объем стилей и скриптов в head, как у реальных страниц
+    sitemap: bool = True  # Отдавать /sitemap.xml: индекс и по карте товаров на категорию
+    error_rate: float = 0.0  # Доля запросов, на которые стенд отвечает 500, как при сбоях сайта
+
+    def category_hrefs(self) -> Dict[str, str]:
+        return {f'/catalog/{i}-category': f'Категория {i}' for i in range(self.categories)}
+
+    @property
+    def total_products(self) -> int:
+        return self.categories * self.pages * self.products
+
+
+class MockMagnitServer:
+    """
+    Стенд в фоновом потоке. Используется как контекстный менеджер:
+
+        with MockMagnitServer(MockConfig(categories=3)) as server:
+            settings.BASE_URL = server.url
+    """
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or MockConfig()
+        self.stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+        self._pages: Dict[str, bytes] = {}
+        self._pages_lock = threading.Lock()
+        self._random = random.Random(0)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'MockMagnitServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Обслуживание в текущем потоке, до Ctrl+C"""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'MockMagnitServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def should_fail(self) -> bool:
+        if not self.config.error_rate:
+            return False
+        with self._stats_lock:
+            return self._random.random() < self.config.error_rate
+
+    def product_hrefs(self, category: str) -> List[str]:
+        """Товары категории со всех ее страниц, те же, что в листингах"""
+        return [f'/product/{category}-{page}-{i}'
+                for page in range(self.config.pages) for i in range(self.config.products)]
+
+    def render(self, path: str, page: int, shop_code: str = '') -> Optional[bytes]:
+        """
+        Тело страницы; одинаковые запросы отдают одинаковые байты, поэтому ETag стабилен.
+        Карточка товара зависит от магазина shop_code, как цены на magnit.ru
+        """
+        key = f'{path}?page={page}&shopCode={shop_code}'
+        with self._pages_lock:
+            if key in self._pages:
+                return self._pages[key]
+
+        config = self.config
+        if path == '/catalog':
+            body = catalog_page(config.category_hrefs(), head_weight=config.head_weight)
+        elif path.startswith('/catalog/') and path in config.category_hrefs():
+            category = path.rsplit('/', 1)[-1]
+            # За последней страницей - пустая, по ней CategoryService понимает, что пагинация закончилась
+            products = config.products if page < config.pages else 0
+            body = category_page(category, page, products, head_weight=config.head_weight)
+        elif config.sitemap and path == '/sitemap.xml':
+            body = sitemap_index([f'{self.url}/sitemap-products-{i}.xml' for i in range(config.categories)])
+        elif config.sitemap and path.startswith('/sitemap-products-'):
+            category = f"{path[len('/sitemap-products-'):-len('.xml')]}-category"
+            if f'/catalog/{category}' not in config.category_hrefs():
+                return None
+            body = sitemap_urlset([f'{self.url}{href}' for href in self.product_hrefs(category)])
+        elif path.startswith('/product/'):
+            seed = int(hashlib.blake2b(f'{path}{shop_code}'.encode(), digest_size=4).hexdigest(), 16)
+            body = product_page(seed, head_weight=config.head_weight)
+        else:
+            return None
+
+        encoded = body.encode('utf-8')
+        with self._pages_lock:
+            self._pages[key] = encoded
+        return encoded
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if server.config.latency:
+                    time.sleep(server.config.latency)
+
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                page = int(query.get('page', ['0'])[0])
+                # shopCode есть и у страниц категорий, но ассортимент стенда от магазина не зависит
+                shop_code = query.get('shopCode', [''])[0] if parts.path.startswith('/product/') else ''
+                body = server.render(parts.path, page, shop_code)
+                if body is None:
+                    server.count('404')
+                    self._reply(404, b'')
+                    return
+
+                server.count('requests')
+                if server.should_fail():
+                    server.count('500')
+                    self._reply(500, b'')
+                    return
+
+                etag = '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    server.count('304')
+                    self._reply(304, b'', etag)
+                    return
+                self._reply(200, body, etag, 'application/xml' if parts.path.endswith('.xml') else 'text/html')
+
+            def _reply(self, status: int, body: bytes, etag: Optional[str] = None,
+                       content_type: str = 'text/html') -> None:
+                self.send_response(status)
+                if etag:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+        return Handler
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--port', type=int, default=8080)
+    arg_parser.add_argument('--categories', type=int, default=5)
+    arg_parser.add_argument('--pages', type=int, default=3)
+    arg_parser.add_argument('--products', type=int, default=24)
+    arg_parser.add_argument('--latency', type=float, default=0.02)
+    arg_parser.add_argument('--no-sitemap', action='store_true', help='не отдавать карту сайта')
+    arg_parser.add_argument('--error-rate', type=float, default=0.0, help='доля ответов 500')
+    args = arg_parser.parse_args()
+
+    config = MockConfig(categories=args.categories, pages=args.pages, products=args.products, latency=args.latency,
+                        sitemap=not args.no_sitemap, error_rate=args.error_rate)
+    server = MockMagnitServer(config, port=args.port)
+    print(f'Стенд на {server.url}: {config.total_products} товаров. MAGNIT_BASE_URL={server.url}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
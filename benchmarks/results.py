@@ -0,0 +1,45 @@
+"""Хранение результатов бенчмарков в JSON для сравнения между коммитами"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def save_results(name: str, results: Any, directory: str = RESULTS_DIR) -> str:
+    """Сохраняет результаты в <directory>/<name>-<коммит>-<время>.json и возвращает путь"""
+    os.makedirs(directory, exist_ok=True)
+    env = environment()
+    path = os.path.join(directory, f"{name}-{env['git'] or 'nogit'}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'benchmark': name, 'environment': env, 'argv': sys.argv[1:], 'results': results},
+                  f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
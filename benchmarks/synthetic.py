@@ -0,0 +1,111 @@
+"""Генераторы синтетических страниц magnit.ru для бенчмарков"""
+import random
+from typing import Dict, List, Optional
+
+# Реальные страницы тяжелые в основном из-за inline стилей и скриптов в head
+_HEAD_STYLE = '.pl-list-item[data-v-1a2b3c]{display:flex;align-items:center;padding:var(--pl-unit-x2)}' * 40
+_HEAD_SCRIPT = 'window.__NUXT__=(function(a,b,c){return {data:[{}],state:{a:a,b:b,c:c}}}(1,2,3));' * 40
+
+CHARACTERISTIC_NAMES = [
+    'Тип продукта', 'Бренд', 'Страна производства', 'Вес', 'Жирность', 'Упаковка',
+    'Срок годности', 'Условия хранения', 'Состав', 'Производитель',
+]
+
+
+def page_head(title: str, weight: int = 20) -> str:
+    styles = ''.join(f'<style>{_HEAD_STYLE}</style>' for _ in range(weight))
+    scripts = ''.join(f'<script>{_HEAD_SCRIPT}</script>' for _ in range(weight))
+    return (f'<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8"><title>{title}</title>'
+            f'{styles}{scripts}</head>')
+
+
+def product_page(seed: int,
+                 characteristics: int = 8,
+                 with_nutrition: bool = True,
+                 head_weight: int = 20,
+                 noise: bool = False) -> str:
+    """
+    Страница товара той же структуры, что разбирает ProductDetailsParser.
+    noise добавляет комментарии, вложенные теги, nbsp и скрипты внутри значений
+    """
+    rnd = random.Random(seed)
+    items = []
+    for i in range(characteristics):
+        name = CHARACTERISTIC_NAMES[i % len(CHARACTERISTIC_NAMES)]
+        value = f'{rnd.randint(1, 999)} {rnd.choice(["г", "кг", "мл", "шт"])}'
+        if noise:
+            value = (f'<b> {value}</b><!-- comment -->\xa0<script>track({i})</script>'
+                     f'<span class="unit"> ед.</span>')
+        items.append(
+            '<li class="product-details-parameters-list__item">'
+            f'<span class="pl-text" data-test-id="v-product-details-item-name">{name}</span>'
+            f'<span class="pl-text" data-test-id="v-product-details-item-value">{value}</span>'
+            '</li>'
+        )
+    if noise:
+        # Элемент без значения и пустое имя не должны попадать в результат
+        items.append('<li class="product-details-parameters-list__item">'
+                     '<span data-test-id="v-item-name">Без значения</span></li>')
+        items.append('<li class="product-details-parameters-list__item">'
+                     '<span data-test-id="v-item-name">  </span><span data-test-id="v-item-value">x</span></li>')
+
+    nutrition = ''
+    if with_nutrition:
+        facts = ''.join(
+            f'<div class="fact"><div data-test-id="v-product-details-nutrition-fact-value">'
+            f'{rnd.randint(1, 99)},{rnd.randint(0, 9)}</div></div>'
+            for _ in range(4)
+        )
+        nutrition = f'<section class="product-details-nutrition-facts">{facts}</section>'
+
+    weight = ('<span class="pl-text product-details-price__weight" '
+              'data-test-id="v-product-detail-weight">за 1 кг</span>') if seed % 3 == 0 else ''
+
+    return (page_head(f'Товар {seed}', head_weight)
+            + '<body><div id="app"><header>Магнит</header>'
+            + '<div class="product-details-price">'
+            + f'<span class="product-details-price__current">{rnd.randint(50, 999)},99 ₽</span>{weight}</div>'
+            + '<div class="unit-product-details__details-container">'
+            + f'<ul class="product-details-parameters-list">{"".join(items)}</ul>'
+            + nutrition
+            + '</div></div></body></html>')
+
+
+def category_page(category: str, page: int, products: int, head_weight: int = 20,
+                  hrefs: Optional[List[str]] = None) -> str:
+    """Страница листинга категории со ссылками на товары"""
+    hrefs = hrefs or [f'/product/{category}-{page}-{i}' for i in range(products)]
+    links = ''.join(
+        f'<article class="unit-catalog-product-preview"><a class="pl-hover-base" data-test-id="v-app-link" '
+        f'href="{href}" title="Товар {href.rsplit("/", 1)[-1]}"><div class="pl-text">Товар</div></a></article>'
+        for href in hrefs
+    )
+    return (page_head(f'Категория {category}', head_weight)
+            + f'<body><div id="app"><h1>{category}: {len(hrefs)} товаров</h1>'
+            + f'<div class="unit-catalog-product-list">{links}</div></div></body></html>')
+
+
+def catalog_page(categories: Dict[str, str], head_weight: int = 20) -> str:
+    """Главная страница каталога; categories - {href: название}"""
+    items = ''.join(
+        '<div class="pl-list-item pl-list-item_primary pl-list-item_hoverable pl-list-item_icon_m header-catalog-item">'
+        '<div class="pl-list-item-content"><div class="pl-list-item-content-left"><div class="pl-list-item__title">'
+        f'<a class="header-catalog-item__subitem" href="{href}">{title}</a>'
+        '</div></div></div></div>'
+        for href, title in categories.items()
+    )
+    return page_head('Каталог', head_weight) + f'<body><nav>{items}</nav></body></html>'
+
+
+def sitemap_index(locs: List[str]) -> str:
+    """Индекс карт сайта со ссылками на вложенные карты"""
+    items = ''.join(f'<sitemap><loc>{loc}</loc></sitemap>' for loc in locs)
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{items}</sitemapindex>')
+
+
+def sitemap_urlset(locs: List[str]) -> str:
+    """Карта сайта со ссылками на страницы"""
+    items = ''.join(f'<url><loc>{loc}</loc><changefreq>daily</changefreq></url>' for loc in locs)
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{items}</urlset>')
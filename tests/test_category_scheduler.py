@@ -0,0 +1,114 @@
+import asyncio
+from types import SimpleNamespace
+from typing import List, Optional
+
+import pytest
+
+from backend.src.infrastructure.product_parser.magnit_parser.category_scheduler import CategoryScheduler, CrawlBudget
+from backend.src.infrastructure.product_parser.magnit_parser.schemas import CatalogCategory, ProductRef
+
+
+class FakeCategoryService:
+    """pages - число непустых страниц каждой категории по два товара; None - категория не загружается"""
+
+    def __init__(self, pages: dict):
+        self.pages = pages
+        self.requests = 0
+        self.failed_categories: List[CatalogCategory] = []
+
+    def record_failure(self, category: CatalogCategory) -> None:
+        self.failed_categories.append(category)
+
+    def fetch_category_page(self, category: CatalogCategory, shop_code: int, shop_type: int, page: int,
+                            max_pages: int) -> Optional[List[ProductRef]]:
+        self.requests += 1
+        pages = self.pages[category.title]
+        if pages is None:
+            return None
+        if page >= pages:
+            return []
+        return [ProductRef(f'{category.title}-{page}-{i}', f'/product/{category.title}-{page}-{i}') for i in range(2)]
+
+    async def afetch_category_page(self, *args) -> Optional[List[ProductRef]]:
+        await asyncio.sleep(0)
+        return self.fetch_category_page(*args)
+
+
+class FakeAsyncHttp:
+    closed = False
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def scheduler(pages: dict, **kwargs) -> CategoryScheduler:
+    categories = [CatalogCategory(title=title, href=f'/catalog/{title}') for title in pages]
+    parser = SimpleNamespace(category_service=FakeCategoryService(pages), catalog_categories=categories,
+                             async_http=FakeAsyncHttp())
+    return CategoryScheduler(parser, priority='catalog', **kwargs)
+
+
+def crawl_async(category_scheduler: CategoryScheduler) -> List[ProductRef]:
+    async def collect() -> List[ProductRef]:
+        return [product async for product in category_scheduler.aiter_products(
+            category_scheduler.parser.catalog_categories)]
+    return asyncio.run(collect())
+
+
+def titles(categories: List[CatalogCategory]) -> List[str]:
+    return sorted(category.title for category in categories)
+
+
+@pytest.mark.parametrize('crawl', ['sync', 'async'])
+def test_without_budget_all_categories_are_completed(crawl):
+    pages = {'сыры': 1, 'хлеб': 3, 'broken': None, 'молоко': 2}
+    category_scheduler = scheduler(pages, max_parallel=2, max_pages=5)
+    products = list(category_scheduler.iter_products()) if crawl == 'sync' else crawl_async(category_scheduler)
+
+    assert len(products) == 2 * (1 + 3 + 2)
+    report = category_scheduler.report
+    assert titles(report.completed) == ['молоко', 'сыры', 'хлеб']
+    assert titles(report.failed) == ['broken']
+    assert titles(category_scheduler.parser.category_service.failed_categories) == ['broken']
+    assert not report.partial and report.stopped_by is None
+    assert report.products == len(products)
+
+
+@pytest.mark.parametrize('crawl', ['sync', 'async'])
+def test_page_budget_stops_crawl_and_reports_the_rest(crawl):
+    pages = {'сыры': 3, 'хлеб': 3, 'молоко': 3, 'мясо': 3}
+    category_scheduler = scheduler(pages, max_parallel=2, max_pages=5, page_budget=4)
+    products = list(category_scheduler.iter_products()) if crawl == 'sync' else crawl_async(category_scheduler)
+
+    assert category_scheduler.parser.category_service.requests == 4
+    assert len(products) == 8
+    report = category_scheduler.report
+    assert report.stopped_by == 'pages' and report.pages == 4
+    assert titles(report.unfinished) == ['сыры', 'хлеб']
+    assert titles(report.skipped) == ['молоко', 'мясо']
+
+
+@pytest.mark.parametrize('crawl', ['sync', 'async'])
+def test_products_are_linked_to_the_target_store(crawl):
+    category_scheduler = scheduler({'сыры': 1}, target=(42, 2))
+    products = list(category_scheduler.iter_products()) if crawl == 'sync' else crawl_async(category_scheduler)
+
+    assert {product.url.partition('?')[2] for product in products} == {'shopCode=42&shopType=2'}
+    # Асинхронным клиентом распоряжается владелец парсера
+    assert not category_scheduler.parser.async_http.closed
+
+
+def test_max_pages_limits_each_category():
+    category_scheduler = scheduler({'сыры': 10}, max_pages=3)
+    assert len(list(category_scheduler.iter_products())) == 6
+    assert titles(category_scheduler.report.completed) == ['сыры']
+
+
+def test_crawl_budget_by_time():
+    now = [0.0]
+    budget = CrawlBudget(max_seconds=10, clock=lambda: now[0])
+    assert budget.take_page() and budget.exhausted is None
+    now[0] = 10
+    assert budget.exhausted == 'time'
+    assert not budget.take_page()
+    assert budget.pages == 1
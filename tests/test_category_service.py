@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import pytest
+
+from backend.src.infrastructure.product_parser.http.retry import FailureKind, FetchResult
+from backend.src.infrastructure.product_parser.magnit_parser.schemas import CatalogCategory, ProductRef
+from backend.src.infrastructure.product_parser.magnit_parser.services import CategoryPageError, CategoryService
+
+
+class FakeHttp:
+    """pages - сколько страниц с товарами у категории; None - страница 0 не загружается после повторов"""
+
+    def __init__(self, pages: Dict[str, Optional[int]]):
+        self.pages = pages
+
+    def fetch(self, url: str, params: Optional[dict] = None) -> FetchResult:
+        pages = self.pages[url.rsplit('/', 1)[-1]]
+        if pages is None:
+            return FetchResult(url, status=503, failure=FailureKind.THROTTLED, attempts=4)
+        page = params['page']
+        return FetchResult(url, content=f'{url}|{page if page < pages else "end"}', status=200)
+
+    async def afetch(self, url: str, params: Optional[dict] = None) -> FetchResult:
+        return self.fetch(url, params)
+
+
+class FakeParser:
+    def parse(self, content: str) -> List[ProductRef]:
+        url, page = content.split('|')
+        if page == 'end':
+            return []
+        return [ProductRef(f'Товар {page}-{i}', f"/product/{url.rsplit('/', 1)[-1]}-{page}-{i}") for i in range(2)]
+
+
+def category(name: str) -> CatalogCategory:
+    return CatalogCategory(title=f'Категория {name}', href=f'/catalog/{name}')
+
+
+def service(pages: Dict[str, Optional[int]]) -> CategoryService:
+    http = FakeHttp(pages)
+    return CategoryService(http, FakeParser(), async_http_client=SimpleNamespace(fetch=http.afetch))
+
+
+def test_failed_page_raises_instead_of_ending_pagination():
+    with pytest.raises(CategoryPageError) as error:
+        list(service({'milk': None}).iter_category_pages(category('milk')))
+    assert error.value.page == 0
+
+    with pytest.raises(CategoryPageError):
+        asyncio.run(service({'milk': None}).afetch_category_products(category('milk')))
+
+
+def test_end_of_pagination_is_not_a_failure():
+    products = service({'milk': 2}).fetch_category_products(category('milk'))
+    assert len(products) == 4
+
+
+def test_failed_category_is_counted_as_error(caplog):
+    caplog.set_level(logging.INFO)
+    categories = [category('milk'), category('bread'), category('cheese')]
+    products = service({'milk': 1, 'bread': None, 'cheese': 2}).fetch_multiple_products(categories)
+
+    assert len(products) == 6
+    assert "Категория bread" in caplog.text
+    summary = [record.progress for record in caplog.records if hasattr(record, 'progress')][-1]
+    assert (summary['done'], summary['errors'], summary['pages']) == (3, 1, 3)
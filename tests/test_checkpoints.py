@@ -0,0 +1,61 @@
+import pytest
+
+from backend.src.infrastructure.product_parser.magnit_parser import checkpoints
+from backend.src.infrastructure.product_parser.magnit_parser.checkpoints import CheckpointJournal
+from backend.src.infrastructure.product_parser.magnit_parser.schemas import ProductRef
+
+CATEGORY = 'https://magnit.ru/catalog/1-milk'
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'journal.db')
+
+
+def test_pages_and_products_survive_reopening(path):
+    journal = CheckpointJournal(path)
+    journal.record_page(CATEGORY, 784507, 1, 0, [ProductRef('Молоко', '/product/1-milk')])
+    journal.record_page(CATEGORY, 784507, 1, 1, [], is_last=True)
+    journal.record_product('https://magnit.ru/product/1-milk', {'title': 'Молоко', 'price': '89,99 ₽'})
+    journal.close()
+
+    journal = CheckpointJournal(path)
+    products, is_last = journal.category_page(CATEGORY, 784507, 1, 0)
+    assert products == [ProductRef('Молоко', '/product/1-milk')] and not is_last
+    assert journal.category_page(CATEGORY, 784507, 1, 1) == ([], True)
+    # Страницы разных магазинов - разные записи
+    assert journal.category_page(CATEGORY, 1, 1, 0) is None
+    assert journal.product_result('https://magnit.ru/product/1-milk')['price'] == '89,99 ₽'
+    assert journal.stats() == {'category_pages': 2, 'products': 1}
+    journal.close()
+
+
+def test_complete_clears_journal(path):
+    journal = CheckpointJournal(path)
+    journal.record_product('https://magnit.ru/product/1-milk', {'title': 'Молоко'})
+    journal.complete()
+    assert journal.stats() == {'category_pages': 0, 'products': 0}
+    assert journal.product_result('https://magnit.ru/product/1-milk') is None
+    journal.close()
+
+
+def test_stale_records_expire_on_open(path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(checkpoints.time, 'time', lambda: now[0])
+    journal = CheckpointJournal(path, max_age=60)
+    journal.record_product('https://magnit.ru/product/old', {})
+    now[0] += 50
+    journal.record_product('https://magnit.ru/product/new', {})
+    journal.close()
+
+    now[0] += 30
+    journal = CheckpointJournal(path, max_age=60)
+    assert journal.product_result('https://magnit.ru/product/old') is None
+    assert journal.product_result('https://magnit.ru/product/new') == {}
+    journal.close()
+
+    # Без max_age записи не устаревают
+    now[0] += 1000
+    journal = CheckpointJournal(path, max_age=None)
+    assert journal.stats()['products'] == 1
+    journal.close()
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+from backend.src.infrastructure.product_parser.magnit_parser.fill_bd import ProductWriter, fill_database
+
+
+def details(n: int, by_weight: bool = False, title: str = None) -> dict:
+    return {'url': f'/product/{n}', 'title': title or f'Товар {n}', 'success': True,
+            'is_food_by_weight': by_weight, 'characteristics': {'Бренд': 'Магнит', 'Вес': '500 г'},
+            'nutrition_facts': {'kilocalories': '250 ккал'}}
+
+
+def rows(path: str, table: str) -> dict:
+    connection = sqlite3.connect(path)
+    try:
+        return dict(connection.execute(f'SELECT url, title FROM {table}').fetchall())
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def writer(tmp_path):
+    connection = sqlite3.connect(str(tmp_path / 'products.db'))
+    writer = ProductWriter(connection, batch_size=3)
+    writer.create_tables()
+    yield writer
+    connection.close()
+
+
+def test_rows_are_flushed_in_batches(tmp_path):
+    path = str(tmp_path / 'products.db')
+    stats = fill_database([details(n, by_weight=n % 2 == 0) for n in range(7)], path, batch_size=3)
+
+    assert (stats.written, stats.batches, stats.skipped) == (7, 3, 0)
+    assert sorted(rows(path, 'bulk_products')) == ['/product/0', '/product/2', '/product/4', '/product/6']
+    assert sorted(rows(path, 'fixed_weight_products')) == ['/product/1', '/product/3', '/product/5']
+
+
+def test_failed_cards_are_skipped(tmp_path):
+    path = str(tmp_path / 'products.db')
+    failed = {'url': '/product/9', 'error': 'timeout', 'success': False}
+    stats = fill_database([details(1), failed, {}, details(2)], path)
+
+    assert (stats.written, stats.skipped) == (2, 2)
+    assert sorted(rows(path, 'fixed_weight_products')) == ['/product/1', '/product/2']
+
+
+def test_repeated_url_updates_the_row(tmp_path):
+    path = str(tmp_path / 'products.db')
+    fill_database([details(1), details(2)], path)
+    fill_database([details(1, title='Новое название')], path)
+
+    assert rows(path, 'fixed_weight_products') == {'/product/1': 'Новое название', '/product/2': 'Товар 2'}
+
+
+@pytest.mark.parametrize('same_batch', [True, False])
+def test_product_moved_to_another_table_leaves_no_stale_row(writer, same_batch):
+    writer.add(details(1))
+    if not same_batch:
+        writer.flush()
+    writer.add(details(1, by_weight=True))
+    writer.flush()
+
+    tables = {table: writer.connection.execute(f'SELECT url FROM {table}').fetchall()
+              for table in ('bulk_products', 'fixed_weight_products')}
+    assert tables == {'bulk_products': [('/product/1',)], 'fixed_weight_products': []}
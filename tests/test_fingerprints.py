@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from backend.src.infrastructure.product_parser.magnit_parser import MagnitParser, settings
+from backend.src.infrastructure.product_parser.magnit_parser.fingerprints import (
+    ChangeStatus, FingerprintStore, content_fingerprint,
+)
+from benchmarks.mock_server import MockConfig, MockMagnitServer
+
+PAGE = ('<html><head><script>var t = {t}</script></head><body><header>{header}</header>'
+        '<div class="product-details-price">{price} ₽</div>'
+        '<div class="unit-product-details__details-container">Вес 500 г</div><footer>{t}</footer></body></html>')
+
+
+def page(price: int = 100, t: int = 0, header: str = 'Магнит') -> str:
+    return PAGE.format(price=price, t=t, header=header)
+
+
+def test_fingerprint_ignores_everything_outside_price_and_details():
+    assert content_fingerprint(page(t=1, header='Акция')) == content_fingerprint(page(t=2))
+    assert content_fingerprint(page(price=100)) != content_fingerprint(page(price=120))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FingerprintStore(str(tmp_path / 'fingerprints.db'))
+    yield store
+    store.close()
+
+
+def crawl(store: FingerprintStore, prices: dict, full_catalog: bool = True, incomplete: bool = False):
+    with store.run(full_catalog) as report:
+        for href, price in prices.items():
+            observation = store.observe(href, page(price))
+            if observation.status != ChangeStatus.unchanged:
+                store.save(observation, {'price': price})
+        if incomplete:
+            store.mark_incomplete()
+    return report
+
+
+def test_full_catalog_run_marks_unseen_products_removed(store):
+    assert crawl(store, {'/product/1': 100, '/product/2': 200}).new == 2
+    report = crawl(store, {'/product/1': 100})
+    assert (report.unchanged, report.removed) == (1, 1)
+    # Вернувшийся товар снова новый
+    assert crawl(store, {'/product/1': 100, '/product/2': 200}).new == 1
+
+
+def test_partial_or_incomplete_run_does_not_mark_removed(store):
+    crawl(store, {'/product/1': 100, '/product/2': 200})
+    assert crawl(store, {'/product/1': 100}, full_catalog=False).removed == 0
+    assert crawl(store, {'/product/1': 100}, incomplete=True).removed == 0
+    # Отметка действует только на один запуск
+    assert crawl(store, {'/product/1': 110}).removed == 1
+
+
+def test_incomplete_mark_before_run_applies_to_next_run(store):
+    crawl(store, {'/product/1': 100, '/product/2': 200})
+    store.mark_incomplete()  # Поиск товаров шел до начала запуска
+    assert crawl(store, {'/product/1': 100}).removed == 0
+
+
+def full_crawl(tmp_path, monkeypatch, server: MockMagnitServer, asynchronous: bool, discovery: str = 'html'):
+    monkeypatch.setattr(settings, 'BASE_URL', server.url)
+    parser = MagnitParser(requests_per_second=1000, burst=10, artifacts=None, discovery=discovery,
+                          fingerprints_path=str(tmp_path / 'fingerprints.db'))
+    try:
+        if asynchronous:
+            asyncio.run(parser.aparse_products(full_catalog=True))
+        else:
+            parser.parse_products(full_catalog=True)
+        return parser.crawl_report
+    finally:
+        parser.close()
+
+
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_failed_category_does_not_remove_its_products(tmp_path, monkeypatch, asynchronous):
+    config = MockConfig(categories=3, pages=1, products=5, latency=0, sitemap=False)
+    with MockMagnitServer(config) as server:
+        assert full_crawl(tmp_path, monkeypatch, server, asynchronous).new == 15
+
+        render = server.render
+        monkeypatch.setattr(server, 'render',
+                            lambda path, *args: None if path == '/catalog/2-category' else render(path, *args))
+        report = full_crawl(tmp_path, monkeypatch, server, asynchronous)
+        assert (report.unchanged, report.removed) == (10, 0)
+
+    # Категория действительно пропала из каталога
+    with MockMagnitServer(MockConfig(categories=2, pages=1, products=5, latency=0, sitemap=False)) as server:
+        report = full_crawl(tmp_path, monkeypatch, server, asynchronous)
+        assert (report.unchanged, report.removed) == (10, 5)
+
+
+@pytest.mark.parametrize('asynchronous', [False, True])
+def test_failed_sitemap_does_not_remove_its_products(tmp_path, monkeypatch, asynchronous):
+    config = MockConfig(categories=3, pages=1, products=5, latency=0)
+    with MockMagnitServer(config) as server:
+        assert full_crawl(tmp_path, monkeypatch, server, asynchronous, 'sitemap').new == 15
+
+        render = server.render
+        monkeypatch.setattr(server, 'render',
+                            lambda path, *args: None if path == '/sitemap-products-2.xml' else render(path, *args))
+        report = full_crawl(tmp_path, monkeypatch, server, asynchronous, 'sitemap')
+        assert (report.unchanged, report.removed) == (10, 0)
+
+    # Без карты сайта каталог обходится по категориям, и этот обход полный
+    with MockMagnitServer(MockConfig(categories=2, pages=1, products=5, latency=0, sitemap=False)) as server:
+        report = full_crawl(tmp_path, monkeypatch, server, asynchronous, 'sitemap')
+        assert (report.unchanged, report.removed) == (10, 5)
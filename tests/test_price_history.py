@@ -0,0 +1,97 @@
+from typing import Any, Dict, Optional
+
+import pytest
+
+from backend.src.application.services import PriceHistory
+
+STORE = '784507:1'
+
+
+def card(i: int, price: Optional[str] = '100,00 ₽', weight: str = '500 г') -> Dict[str, Any]:
+    """Карточка в формате ProductService.fetch_product_details; price=None - нет в наличии"""
+    return {'url': f'https://magnit.ru/product/{i}-test', 'title': f'Товар {i}', 'price': price,
+            'characteristics': {'Вес': weight}, 'success': True}
+
+
+def failed(i: int) -> Dict[str, Any]:
+    return {'url': f'https://magnit.ru/product/{i}-test', 'title': f'Товар {i}',
+            'error': 'timeout', 'failure': 'timeout', 'status': None, 'success': False}
+
+
+@pytest.fixture
+def history(tmp_path):
+    return PriceHistory(str(tmp_path))
+
+
+def test_write_and_history(history, tmp_path):
+    info = history.write_snapshot([card(1), card(2, price=None)], STORE, taken_at=100)
+    assert (info.products, info.available, info.unknown) == (2, 1, 0)
+    history.write_snapshot([card(1, price='120,50 ₽'), card(2)], STORE, taken_at=200)
+
+    assert history.history('/product/1-test') == [
+        {'taken_at': 100, 'store': STORE, 'available': True, 'price': 100.0, 'price_per_kg': 200.0},
+        {'taken_at': 200, 'store': STORE, 'available': True, 'price': 120.5, 'price_per_kg': 241.0},
+    ]
+    assert [point['available'] for point in history.history('https://magnit.ru/product/2-test')] == [False, True]
+    assert [point['taken_at'] for point in history.history('/product/1-test', start=150)] == [200]
+    assert history.history('/product/404-test') == []
+
+    # Другой процесс видит те же данные
+    reopened = PriceHistory(str(tmp_path))
+    assert reopened.history('/product/1-test') == history.history('/product/1-test')
+
+
+def test_failed_and_missing_cards_are_unknown_not_unavailable(history):
+    history.write_snapshot([card(1), card(2), card(3)], STORE, taken_at=100)
+    info = history.write_snapshot([failed(1), card(2, price=None)], STORE, taken_at=200)
+    assert (info.products, info.available, info.unknown) == (2, 0, 1)
+
+    assert [point['taken_at'] for point in history.history('/product/1-test')] == [100]
+    assert [point['available'] for point in history.history('/product/2-test')] == [True, False]
+    assert [point['taken_at'] for point in history.history('/product/3-test')] == [100]
+
+    summary, = history.changes(STORE)['stores']
+    assert (summary['appeared'], summary['disappeared'], summary['changed']) == (0, 1, 0)
+
+
+def test_successful_card_wins_over_failed_attempt(history):
+    info = history.write_snapshot([card(1), failed(1)], STORE, taken_at=100)
+    assert (info.products, info.available, info.unknown) == (1, 1, 0)
+
+
+def test_changes_between_last_two_snapshots(history):
+    history.write_snapshot([card(1), card(2), card(3, price=None)], STORE, taken_at=100)
+    history.write_snapshot([card(1, price='150,00 ₽'), card(2, price='90,00 ₽'), card(3)], STORE, taken_at=200)
+    history.write_snapshot([card(1)], '1:1', taken_at=150)
+
+    result = history.changes(STORE)
+    summary, = result['stores']
+    assert (summary['from'], summary['to']) == (100, 200)
+    assert (summary['changed'], summary['appeared'], summary['disappeared']) == (2, 1, 0)
+    assert [(item['href'], item['change_pct']) for item in result['items']] == [
+        ('/product/1-test', 50.0), ('/product/2-test', -10.0)]
+    # У второго магазина один снимок - сравнивать не с чем
+    assert [summary['store'] for summary in history.changes()['stores']] == [STORE]
+
+
+def test_compact_keeps_last_snapshot_per_interval(history, tmp_path):
+    for taken_at in (10, 20, 110, 120, 210):
+        history.write_snapshot([card(1, price=f'{taken_at},00 ₽')], STORE, taken_at=taken_at)
+
+    assert history.compact(every=100, before=200) == 2
+    assert [snapshot.taken_at for snapshot in history.snapshots()] == [20, 120, 210]
+    assert [point['price'] for point in history.history('/product/1-test')] == [20.0, 120.0, 210.0]
+    assert len(list(tmp_path.glob('snapshot-*.npz'))) == 3
+
+
+def test_empty_first_snapshot_can_be_reopened(history, tmp_path):
+    info = history.write_snapshot([failed(1)], STORE, taken_at=100)
+    assert (info.products, info.unknown) == (1, 1)
+    empty = PriceHistory(str(tmp_path / 'empty'))
+    empty.write_snapshot([], STORE, taken_at=100)
+
+    assert PriceHistory(str(tmp_path)).history('/product/1-test') == []
+    reopened = PriceHistory(str(tmp_path / 'empty'))
+    assert len(reopened.snapshots()) == 1
+    reopened.write_snapshot([card(1)], STORE, taken_at=200)
+    assert [point['price'] for point in PriceHistory(str(tmp_path / 'empty')).history('/product/1-test')] == [100.0]
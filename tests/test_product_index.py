@@ -0,0 +1,129 @@
+import math
+import random
+from typing import Any, Dict, List
+
+import pytest
+
+from backend.src.application.services import ProductIndex, RangeFilter
+
+PRODUCT_TYPES = ('Молоко', 'Сыр', 'Крупа', 'Мясо', None)
+
+
+def crawl_result(i: int, rng: random.Random) -> Dict[str, Any]:
+    """Карточка в формате ProductService.fetch_product_details"""
+    by_weight = rng.random() < 0.2
+    characteristics = {}
+    product_type = rng.choice(PRODUCT_TYPES)
+    if product_type is not None:
+        characteristics['Тип продукта'] = product_type
+    if not by_weight and rng.random() < 0.9:
+        characteristics['Вес'] = rng.choice(('100 г', '250 г', '0,5 кг', '900 мл', '1 л'))
+    return {
+        'success': True,
+        'url': f'https://magnit.ru/product/{i}-test',
+        'title': f'Товар {i}',
+        'is_food_by_weight': by_weight,
+        'price': rng.choice((f'{rng.randint(30, 900)},99 ₽', None)),
+        'characteristics': characteristics,
+        'nutrition_facts': {
+            'kilocalories': str(rng.randint(20, 600)),
+            'proteins': f'{rng.randint(0, 30)},{rng.randint(0, 9)}',
+        },
+    }
+
+
+def normalized(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """NaN != NaN, поэтому для сравнения строк пропуски заменяются на None"""
+    return [{key: None if isinstance(value, float) and math.isnan(value) else value
+             for key, value in row.items()} for row in rows]
+
+
+def by_url(rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return {row['url']: row for row in normalized(rows)}
+
+
+def assert_same(index: ProductIndex, expected: ProductIndex) -> None:
+    assert index.stats()['products'] == expected.stats()['products']
+    assert index.stats()['by_weight'] == expected.stats()['by_weight']
+    assert sorted(index.categories(), key=str) == sorted(expected.categories(), key=str)
+
+    # Порядок строк у инкрементального индекса другой, поэтому без сортировки сравниваются множества
+    filters = [{}, {'category': 'сыр'}, {'category': 'Мясо', 'by_weight': False}, {'by_weight': True},
+               {'ranges': [RangeFilter('proteins', 5, 20)]},
+               {'category': 'Молоко', 'ranges': [RangeFilter('price_per_kg', None, 1500)]}]
+    for query in filters:
+        total, rows = index.query(limit=10_000, **query)
+        expected_total, expected_rows = expected.query(limit=10_000, **query)
+        assert total == expected_total
+        assert by_url(rows) == by_url(expected_rows)
+
+    # С сортировкой совпадает последовательность значений; при равных значениях порядок может отличаться
+    for sort in ('price', 'proteins_per_ruble', 'kilocalories'):
+        for query in ({}, {'category': 'Сыр'}):
+            for descending in (False, True):
+                total, rows = index.query(sort=sort, descending=descending, limit=10_000, **query)
+                expected_total, expected_rows = expected.query(sort=sort, descending=descending, limit=10_000,
+                                                               **query)
+                assert total == expected_total
+                assert [row[sort] for row in rows] == [row[sort] for row in expected_rows]
+                assert by_url(rows) == by_url(expected_rows)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_updates_match_full_rebuild(seed):
+    rng = random.Random(seed)
+    catalog = {i: crawl_result(i, rng) for i in range(200)}
+    index = ProductIndex()
+    index.update(list(catalog.values()))
+
+    next_id = len(catalog)
+    for _ in range(6):
+        batch = []
+        for i in rng.sample(sorted(catalog), 30):  # Изменившиеся карточки
+            catalog[i] = crawl_result(i, rng)
+            batch.append(catalog[i])
+        for _ in range(rng.randint(0, 20)):  # Новые товары
+            catalog[next_id] = crawl_result(next_id, rng)
+            batch.append(catalog[next_id])
+            next_id += 1
+        batch += rng.sample(list(catalog.values()), 10)  # Неизменившиеся карточки
+
+        if rng.random() < 0.5:
+            for i in rng.sample(sorted(catalog), rng.randint(1, 15)):
+                del catalog[i]
+            index.update(list(catalog.values()), replace=True)
+        else:
+            index.update(batch)
+
+        expected = ProductIndex()
+        expected.update(list(catalog.values()), replace=True)
+        assert_same(index, expected)
+        for i in rng.sample(sorted(catalog), 5):
+            assert normalized([index.get(f'/product/{i}-test')]) == normalized([expected.get(f'/product/{i}-test')])
+
+
+def test_update_reports_added_changed_removed():
+    rng = random.Random(0)
+    results = [crawl_result(i, rng) for i in range(10)]
+    index = ProductIndex()
+    first = index.update(results)
+    assert (first.added, first.changed, first.removed, first.total) == (10, 0, 0, 10)
+
+    changed = dict(results[0], title='Другое название')
+    second = index.update([changed] + results[1:8], replace=True)
+    assert (second.added, second.changed, second.removed, second.total) == (0, 1, 2, 8)
+    assert index.get(results[9]['url']) is None
+    assert index.get('/product/0-test')['title'] == 'Другое название'
+
+
+def test_failed_cards_are_skipped_and_store_params_share_one_product():
+    rng = random.Random(0)
+    result = crawl_result(1, rng)
+    index = ProductIndex()
+    index.update([result, {'url': 'https://magnit.ru/product/2-test', 'error': 'timeout', 'success': False}])
+    assert index.stats()['products'] == 1
+
+    store_result = dict(result, url=result['url'] + '?shopCode=1&shopType=1', title='В магазине')
+    update = index.update([store_result])
+    assert (update.added, update.total) == (0, 1)
+    assert index.get(result['url'])['title'] == 'В магазине'
@@ -0,0 +1,121 @@
+import random
+
+import pytest
+
+from backend.src.infrastructure.product_parser.http.retry import (
+    CircuitBreaker, FailureKind, FetchResult, RetryEngine, RetryPolicy, classify_status,
+)
+
+URL = 'https://magnit.ru/catalog/1'
+HOST = 'magnit.ru'
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def failure(kind: FailureKind = FailureKind.TIMEOUT, attempts: int = 1, url: str = URL) -> FetchResult:
+    return FetchResult(url, failure=kind, attempts=attempts)
+
+
+@pytest.mark.parametrize('status, blocked, expected', [
+    (200, False, None),
+    (200, True, FailureKind.BLOCKED),
+    (404, False, FailureKind.CLIENT_ERROR),
+    (429, False, FailureKind.THROTTLED),
+    (503, False, FailureKind.THROTTLED),
+    (500, False, FailureKind.SERVER_ERROR),
+])
+def test_classify_status(status, blocked, expected):
+    assert classify_status(status, blocked) is expected
+
+
+def test_breaker_opens_after_threshold_and_probes_once():
+    clock = FakeClock()
+    breaker = CircuitBreaker(threshold=3, cooldown=60, clock=clock)
+    assert not breaker.record_failure(HOST)
+    assert not breaker.record_failure(HOST)
+    assert breaker.state(HOST) == 'closed' and breaker.allow(HOST)
+
+    assert breaker.record_failure(HOST)
+    assert breaker.state(HOST) == 'open' and not breaker.allow(HOST)
+    assert breaker.allow('other.host')
+
+    clock.now += 60
+    assert breaker.state(HOST) == 'half-open'
+    assert breaker.allow(HOST)
+    assert not breaker.allow(HOST)  # Пробный запрос один
+
+    breaker.record_success(HOST)
+    assert breaker.state(HOST) == 'closed' and breaker.allow(HOST)
+
+
+def test_failed_probe_reopens_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(threshold=1, cooldown=60, clock=clock)
+    assert breaker.record_failure(HOST)
+    clock.now += 61
+    assert breaker.allow(HOST)
+
+    assert breaker.record_failure(HOST)
+    assert breaker.state(HOST) == 'open'
+    clock.now += 59
+    assert not breaker.allow(HOST)
+    clock.now += 1
+    assert breaker.allow(HOST)
+
+
+def test_disabled_breaker_never_opens():
+    breaker = CircuitBreaker(threshold=0, cooldown=60)
+    for _ in range(10):
+        assert not breaker.record_failure(HOST)
+    assert breaker.allow(HOST)
+
+
+def test_backoff_uses_full_jitter_up_to_max_attempts():
+    engine = RetryEngine(RetryPolicy(max_attempts=3, base_delay=1, max_delay=1.5), rng=random.Random(0))
+    assert engine.allow(URL, 1) is None
+    assert 0 <= engine.backoff(failure(attempts=1)) <= 1
+    assert 0 <= engine.backoff(failure(attempts=2)) <= 1.5
+    assert engine.backoff(failure(attempts=3)) is None
+
+
+def test_backoff_does_not_retry_success_or_non_retryable():
+    engine = RetryEngine(RetryPolicy(breaker_threshold=1), rng=random.Random(0))
+    assert engine.backoff(FetchResult(URL, content='ok', status=200)) is None
+    assert engine.backoff(failure(FailureKind.CLIENT_ERROR)) is None
+    assert engine.backoff(failure(FailureKind.TOO_LARGE)) is None
+    # Ответ с ошибкой клиента - хост жив, предохранитель не открывается
+    assert engine.breaker.state(HOST) == 'closed'
+
+
+def test_retry_budget_limits_retries_per_request():
+    engine = RetryEngine(RetryPolicy(budget_ratio=0.5, min_budget=1, breaker_threshold=0), rng=random.Random(0))
+    for i in range(4):
+        assert engine.allow(f'{URL}/{i}', 1) is None
+    # 1 + 0.5 * 4 = 3 повтора на весь запуск
+    delays = [engine.backoff(failure(url=f'{URL}/{i}')) for i in range(4)]
+    assert [delay is not None for delay in delays] == [True, True, True, False]
+    # Повторные попытки не увеличивают бюджет
+    assert engine.allow(URL, 2) is None
+    assert engine.backoff(failure(url=URL)) is None
+
+
+def test_open_breaker_stops_retries_and_rejects_requests():
+    clock = FakeClock()
+    engine = RetryEngine(RetryPolicy(breaker_threshold=2, breaker_cooldown=30), rng=random.Random(0), clock=clock)
+    assert engine.backoff(failure(FailureKind.SERVER_ERROR)) is not None
+    assert engine.backoff(failure(FailureKind.SERVER_ERROR, attempts=2)) is None
+
+    rejected = engine.allow(URL, 3)
+    assert rejected.failure is FailureKind.CIRCUIT_OPEN and rejected.attempts == 2
+    assert not rejected.ok
+
+    clock.now += 30
+    assert engine.allow(URL, 1) is None
+    assert engine.backoff(FetchResult(URL, content='ok', status=200)) is None
+    assert engine.breaker.state(HOST) == 'closed'
@@ -0,0 +1,102 @@
+import random
+from typing import Any, Dict, List
+
+import pytest
+
+from backend.src.application.services import SearchIndex
+
+WORDS = ('сыр', 'молоко', 'йогурт', 'хлеб', 'ламбер', 'простоквашино', 'ржаной', 'сливочный', 'творог')
+BRANDS = ('Ламбер', 'Домик в деревне', 'Магнит', None)
+
+
+def card(i: int, title: str, brand: str = None) -> Dict[str, Any]:
+    return {'url': f'https://magnit.ru/product/{i}-test', 'title': title,
+            'characteristics': {'Бренд': brand} if brand else {}}
+
+
+def random_card(i: int, rng: random.Random) -> Dict[str, Any]:
+    title = ' '.join(rng.sample(WORDS, rng.randint(1, 3)))
+    return card(i, f'{title} {i}', rng.choice(BRANDS))
+
+
+def hits(index: SearchIndex, query: str, **kwargs) -> Dict[str, float]:
+    total, rows = index.search(query, limit=10_000, **kwargs)
+    assert total == len(rows)
+    return {row['href']: row['score'] for row in rows}
+
+
+def test_search_after_update_counts_only_live_documents():
+    index = SearchIndex()
+    index.update([card(i, f'Сыр Ламбер {i}') for i in range(3)])
+    assert len(hits(index, 'сыр')) == 3
+
+    update = index.update([card(0, 'Сыр Ламбер сливочный 0')])
+    assert (update.added, update.changed) == (0, 1)
+    found = hits(index, 'сыр')
+    assert set(found) == {f'/product/{i}-test' for i in range(3)}
+    assert all(score > 0 for score in found.values())
+
+
+def test_replace_removes_missing_products():
+    index = SearchIndex()
+    index.update([card(1, 'Молоко'), card(2, 'Молоко топленое')])
+    update = index.update([card(2, 'Молоко топленое')], replace=True)
+    assert (update.removed, update.total) == (1, 1)
+    assert set(hits(index, 'молоко')) == {'/product/2-test'}
+    assert hits(index, 'молоко', prefix=True) == hits(index, 'моло', prefix=True)
+
+
+def test_save_and_open_keep_results(tmp_path):
+    rng = random.Random(0)
+    index = SearchIndex(str(tmp_path))
+    index.update([random_card(i, rng) for i in range(50)])
+    index.update([random_card(i, rng) for i in range(10)])
+    index.save()
+
+    opened = SearchIndex.open(str(tmp_path))
+    assert len(opened) == len(index)
+    assert opened.stats() == index.stats()
+    for word in WORDS:
+        assert hits(opened, word) == pytest.approx(hits(index, word))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_updates_match_fresh_index(seed):
+    rng = random.Random(seed)
+    catalog = {i: random_card(i, rng) for i in range(100)}
+    index = SearchIndex(max_segments=4)
+    index.update(list(catalog.values()))
+
+    next_id = len(catalog)
+    for _ in range(8):
+        batch: List[Dict[str, Any]] = []
+        for i in rng.sample(sorted(catalog), 15):
+            catalog[i] = random_card(i, rng)
+            batch.append(catalog[i])
+        for _ in range(rng.randint(0, 5)):
+            catalog[next_id] = random_card(next_id, rng)
+            batch.append(catalog[next_id])
+            next_id += 1
+        if rng.random() < 0.3:
+            for i in rng.sample(sorted(catalog), 5):
+                del catalog[i]
+            index.update(list(catalog.values()), replace=True)
+        else:
+            index.update(batch)
+
+        fresh = SearchIndex()
+        fresh.update(list(catalog.values()))
+        assert len(index) == len(fresh)
+        for query in (*WORDS, 'сыр ламбер', 'деревне'):
+            assert hits(index, query) == pytest.approx(hits(fresh, query))
+        assert hits(index, 'сл', prefix=True) == pytest.approx(hits(fresh, 'сл', prefix=True))
+
+
+def test_merge_drops_deleted_documents():
+    index = SearchIndex(max_segments=2)
+    for version in range(4):
+        index.update([card(i, f'Хлеб ржаной {version}') for i in range(5)])
+    stats = index.stats()
+    assert stats['segments'] <= 2
+    assert stats['products'] == 5
+    assert set(hits(index, 'хлеб')) == {f'/product/{i}-test' for i in range(5)}
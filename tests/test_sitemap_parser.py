@@ -0,0 +1,33 @@
+from benchmarks.synthetic import sitemap_index, sitemap_urlset
+
+from backend.src.infrastructure.product_parser.magnit_parser.parsers import SitemapEntry, SitemapParser
+
+
+def chunked(data: bytes, size: int):
+    return (data[start:start + size] for start in range(0, len(data), size))
+
+
+def test_chunked_stream_matches_whole_document():
+    urls = [f'https://magnit.ru/product/{i}-товар' for i in range(500)]
+    document = sitemap_urlset(urls)
+    parser = SitemapParser()
+
+    whole = parser.parse(document)
+    # Границы блоков попадают внутрь тегов и многобайтных символов
+    streamed = parser.parse(chunked(document.encode('utf-8'), 7))
+
+    assert [entry.loc for entry in whole] == urls
+    assert streamed == whole
+
+
+def test_sitemap_index_entries():
+    entries = SitemapParser().parse(sitemap_index(['https://magnit.ru/sitemap-1.xml']).encode('utf-8'))
+    assert entries == [SitemapEntry('https://magnit.ru/sitemap-1.xml', is_sitemap=True)]
+
+
+def test_empty_and_broken_documents():
+    parser = SitemapParser()
+    assert parser.parse(None) == []
+    assert parser.parse('') == []
+    assert parser.parse(b'<urlset><url><loc>https://magnit.ru/product/1</loc></url><url><lo') == \
+        [SitemapEntry('https://magnit.ru/product/1')]
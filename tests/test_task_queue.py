@@ -0,0 +1,142 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend.src.infrastructure.product_parser.magnit_parser.distributed import task_queue
+from backend.src.infrastructure.product_parser.magnit_parser import StoreTarget
+from backend.src.infrastructure.product_parser.magnit_parser.distributed.coordinator import (
+    CATEGORY_PAGE, PRODUCT, Coordinator,
+)
+from backend.src.infrastructure.product_parser.magnit_parser.distributed.redis_queue import RedisTaskQueue
+from backend.src.infrastructure.product_parser.magnit_parser.distributed.task_queue import SqliteTaskQueue
+from backend.src.infrastructure.product_parser.magnit_parser.distributed.worker import Worker
+from backend.src.infrastructure.product_parser.magnit_parser.schemas import CatalogCategory
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(task_queue.time, 'time', fake)
+    return fake
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def queue(request, tmp_path, clock):
+    if request.param == 'sqlite':
+        queue = SqliteTaskQueue(str(tmp_path / 'queue.db'), max_attempts=2)
+    else:
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')  # Lua-скрипты в fakeredis
+        queue = RedisTaskQueue(client=fakeredis.FakeRedis(decode_responses=True), max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def test_put_many_ignores_duplicate_keys(queue):
+    assert queue.put_many('product', [('a', {'n': 1}), ('b', {'n': 2})]) == 2
+    assert queue.put_many('product', [('a', {'n': 3}), ('c', {'n': 4})]) == 1
+    assert queue.counts()['pending'] == 3
+
+
+def test_leased_task_is_not_given_to_another_worker(queue):
+    queue.put('product', 'a', {})
+    assert [task.key for task in queue.lease('w1')] == ['a']
+    assert queue.lease('w2') == []
+
+
+def test_expired_lease_returns_task_and_drops_late_result(queue, clock):
+    queue.put('product', 'a', {})
+    first, = queue.lease('w1', lease_seconds=10)
+
+    clock.now += 11
+    second, = queue.lease('w2', lease_seconds=10)
+    assert second.key == 'a' and second.attempts == 2
+
+    # Результат первого воркера пришел после истечения аренды
+    assert not queue.complete(first, 'w1', {'late': True})
+    assert queue.complete(second, 'w2', {'ok': True})
+    assert list(queue.results('product')) == [('a', {'ok': True})]
+
+
+def test_expired_lease_counts_towards_max_attempts(queue, clock):
+    queue.put('product', 'a', {})
+    queue.lease('w1', lease_seconds=10)
+    clock.now += 11
+    queue.lease('w1', lease_seconds=10)
+    clock.now += 11
+
+    assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 0, 'failed': 1}
+    assert queue.failed() == [('a', 'lease expired')]
+
+
+def test_fail_retries_until_max_attempts(queue):
+    queue.put('product', 'a', {})
+    task, = queue.lease('w1')
+    assert queue.fail(task, 'w1', 'timeout')
+    assert queue.counts()['pending'] == 1
+
+    task, = queue.lease('w1')
+    assert task.attempts == 2
+    assert queue.fail(task, 'w1', 'timeout again')
+    assert queue.lease('w1') == []
+    assert queue.failed(['product']) == [('a', 'timeout again')]
+
+
+def test_collect_returns_each_result_once(queue):
+    queue.put_many('page', [('a', {}), ('b', {})])
+    for task in queue.lease('w1', limit=2):
+        queue.complete(task, 'w1', {'key': task.key})
+
+    assert [result for _, result in queue.collect('page')] == [{'key': 'a'}, {'key': 'b'}]
+    assert queue.collect('page') == []
+
+
+def test_redis_queues_with_different_prefixes_are_independent():
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    client = fakeredis.FakeRedis(decode_responses=True)
+    first, second = RedisTaskQueue(client=client, prefix='a'), RedisTaskQueue(client=client, prefix='b')
+    first.put('product', 'x', {})
+    assert second.put('product', 'x', {})
+    assert [task.key for task in first.lease('w1')] == ['x']
+    assert second.counts()['pending'] == 1
+
+
+def test_worker_retries_product_failed_as_result(queue):
+    """ProductService возвращает ошибку загрузки словарем - задача не должна считаться выполненной"""
+    failures = iter([{'url': 'u', 'error': 'timeout: попыток 4', 'failure': 'timeout', 'success': False}])
+    product_service = SimpleNamespace(
+        fetch_product_details=lambda product: next(failures, {'url': product.url, 'success': True}))
+    worker = Worker(queue, SimpleNamespace(product_service=product_service), worker_id='w1')
+    queue.put(PRODUCT, '/product/1', {'title': 'Товар', 'href': '/product/1', 'shop_code': 1, 'shop_type': 1})
+
+    assert worker.run_once() == 1
+    assert queue.counts()['pending'] == 1
+    assert worker.run_once() == 1
+    assert [result['success'] for _, result in queue.results(PRODUCT)] == [True]
+
+
+def test_coordinator_queues_product_cards_per_store(queue):
+    coordinator = Coordinator(queue, max_pages=1)
+    coordinator.seed([CatalogCategory(title='Молоко', href='/catalog/1-milk')], [StoreTarget(1), StoreTarget(2, 2)])
+    for task in queue.lease('w1', limit=2):
+        assert task.kind == CATEGORY_PAGE
+        queue.complete(task, 'w1', {'products': [('Товар', '/product/1'), ('Товар', '/product/1')]})
+    # Один товар в двух магазинах - две карточки со своими ценами
+    assert coordinator.expand() == 2
+
+    fetched = []
+    product_service = SimpleNamespace(
+        fetch_product_details=lambda product: fetched.append(product.url) or {'url': product.url, 'success': True})
+    worker = Worker(queue, SimpleNamespace(product_service=product_service), worker_id='w1')
+    assert worker.run_once() == 2
+    assert sorted(url.partition('?')[2] for url in fetched) == ['shopCode=1&shopType=1', 'shopCode=2&shopType=2']
+    assert sorted(details['url'] for details in coordinator.iter_results()) == sorted(fetched)